@@ -37,6 +37,15 @@ else
 fi
 echo ""
 
+# Check Celery media worker
+echo -e "${YELLOW}🎬 Celery Media Service:${NC}"
+if sudo systemctl is-active --quiet xtremand-celery-media.service; then
+    echo -e "   ${GREEN}✅ RUNNING${NC}"
+else
+    echo -e "   ${RED}❌ NOT RUNNING${NC}"
+fi
+echo ""
+
 # Check MongoDB
 echo -e "${YELLOW}🗄️  MongoDB:${NC}"
 if sudo systemctl is-active --quiet mongodb; then
@@ -117,6 +117,7 @@ step_install_dependencies() {
         ffmpeg \
         libmagic1 \
         libreoffice \
+        python3-uno \
         supervisor \
         nano
     
@@ -243,8 +244,73 @@ MONGODB_URI=mongodb://localhost:27017/xtremand_db
 
 # Whisper Model Configuration
 WHISPER_MODEL=tiny
+# Transcription profiles (default/fast/accurate): chosen per object by the
+# x-amz-meta-transcription-profile metadata or by key prefix; x-amz-meta-language skips detection
+WHISPER_PROFILE=default
+WHISPER_FAST_MODEL=tiny
+WHISPER_ACCURATE_MODEL=small
+WHISPER_PROFILE_PREFIXES=backlog/=fast,priority/=accurate
+XTR_PRELOAD_PROFILES=default
 FFMPEG_PATH=/usr/bin/ffmpeg
 FFPROBE_PATH=/usr/bin/ffprobe
+
+# Metrics (Prometheus): Django serves /metrics/, the Celery worker serves :9808
+PROMETHEUS_MULTIPROC_DIR=/var/tmp/xtremand-metrics
+XTR_WORKER_METRICS_PORT=9808
+
+# Tracing: per-file spans (OTLP/JSON lines); inspect with `manage.py trace_file <name>`
+XTR_TRACE_FILE=/var/log/xtremand/traces.jsonl
+
+# Objects up to this size (MB) are parsed in memory instead of via temp files
+XTR_IN_MEMORY_MB=8
+
+# Scratch space: tmpfs for documents, a large volume for audio/video.
+# Tasks reserve the object size before downloading and are re-queued when it doesn't fit.
+XTR_SCRATCH_DIR=/dev/shm/xtremand
+XTR_MEDIA_SCRATCH_DIR=/var/tmp/xtremand-scratch
+XTR_SCRATCH_HEADROOM_MB=512
+
+# Audio/video at or above XTR_PARALLEL_DOWNLOAD_MB are fetched with parallel ranged GETs
+XTR_PARALLEL_DOWNLOAD_MB=64
+XTR_DOWNLOAD_PART_MB=16
+XTR_DOWNLOAD_CONCURRENCY=4
+
+# Whisper transcript cache (MongoDB 'transcript_cache'), LRU-evicted past these bounds
+XTR_TRANSCRIPT_CACHE=1
+XTR_TRANSCRIPT_CACHE_MAX_ENTRIES=20000
+XTR_TRANSCRIPT_CACHE_MAX_MB=1024
+
+# Results are written to MongoDB in batches: at this many, or after this many seconds
+XTR_WRITE_BUFFER_SIZE=50
+XTR_WRITE_BUFFER_SECONDS=1.0
+
+# Extracted content above this size is stored compressed in MINIO_RESULTS_BUCKET (created on first use)
+MINIO_RESULTS_BUCKET=results
+XTR_CONTENT_OFFLOAD_MB=1
+
+# Inline content is zstd-compressed with per-type dictionaries; existing records
+# are migrated (and dictionaries trained) with: manage.py compress_content --train
+XTR_COMPRESS_CONTENT=1
+XTR_COMPRESS_MIN_BYTES=256
+
+# Full-text search (/search/): extracted text is indexed as each file completes;
+# existing records are indexed with: manage.py search_index
+XTR_SEARCH_INDEX=1
+XTR_SEARCH_MAX_CHARS=100000
+
+# "File processed" events for /events/ (server-sent events), kept in a Redis stream
+XTR_FEED=1
+XTR_FEED_STREAM=xtr:processed
+XTR_FEED_MAX_EVENTS=100000
+# Open /events/ streams per web process, and how long each lasts before the client reconnects
+XTR_FEED_MAX_STREAMS=16
+XTR_FEED_STREAM_SECONDS=300
+
+# Resident headless LibreOffice pool for .doc/.rtf/.ppt (ports XTR_SOFFICE_PORT..+POOL-1)
+XTR_SOFFICE_POOL=2
+XTR_SOFFICE_PORT=2002
+XTR_SOFFICE_TIMEOUT=120
+XTR_SOFFICE_RETRY_SECONDS=30
 EOF
     
     chown $USER:$GROUP $ENV_FILE
@@ -309,6 +375,9 @@ User=$USER
 WorkingDirectory=$PROJECT_DIR
 Environment="PATH=$VENV_DIR/bin"
 EnvironmentFile=$PROJECT_DIR/.env
+ExecStartPre=/bin/mkdir -p /var/tmp/xtremand-metrics
+# Span exports (XTR_TRACE_FILE); "+" runs this step as root, since /var/log is root-owned
+ExecStartPre=+/usr/bin/install -d -o $USER -g $GROUP $LOG_DIR
 ExecStart=$VENV_DIR/bin/python manage.py runserver 0.0.0.0:8000
 Restart=always
 RestartSec=10
@@ -319,7 +388,7 @@ StandardError=journal
 WantedBy=multi-user.target
 EOF
     
-    # Celery Service
+    # Celery Service (documents & structured files: many small tasks, 1 GB per child)
     print_info "Creating Celery service..."
     cat > /etc/systemd/system/xtremand-celery.service << EOF
 [Unit]
@@ -332,7 +401,60 @@ User=$USER
 WorkingDirectory=$PROJECT_DIR
 Environment="PATH=$VENV_DIR/bin"
 EnvironmentFile=$PROJECT_DIR/.env
-ExecStart=$VENV_DIR/bin/celery -A web_project worker --loglevel=info --concurrency=4
+ExecStartPre=/bin/mkdir -p /var/tmp/xtremand-metrics
+# Span exports (XTR_TRACE_FILE); "+" runs this step as root, since /var/log is root-owned
+ExecStartPre=+/usr/bin/install -d -o $USER -g $GROUP $LOG_DIR
+ExecStart=$VENV_DIR/bin/celery -A web_project worker -Q celery -n docs@%%h --loglevel=info --concurrency=4 --max-memory-per-child=1048576
+Restart=always
+RestartSec=10
+StandardOutput=journal
+StandardError=journal
+
+[Install]
+WantedBy=multi-user.target
+EOF
+    
+    # Celery Media Service (audio/video: few long tasks, Whisper model resident, 4 GB per child)
+    print_info "Creating Celery media service..."
+    cat > /etc/systemd/system/xtremand-celery-media.service << EOF
+[Unit]
+Description=Xtremand Celery Media Worker
+After=network.target redis-server.service
+
+[Service]
+Type=simple
+User=$USER
+WorkingDirectory=$PROJECT_DIR
+Environment="PATH=$VENV_DIR/bin"
+EnvironmentFile=$PROJECT_DIR/.env
+ExecStartPre=/bin/mkdir -p /var/tmp/xtremand-metrics
+# Span exports (XTR_TRACE_FILE); "+" runs this step as root, since /var/log is root-owned
+ExecStartPre=+/usr/bin/install -d -o $USER -g $GROUP $LOG_DIR
+ExecStart=/usr/bin/env XTR_WORKER_METRICS_PORT=9809 $VENV_DIR/bin/celery -A web_project worker -Q media,media_large -n media@%%h --loglevel=info --concurrency=2 --max-memory-per-child=4194304
+Restart=always
+RestartSec=10
+StandardOutput=journal
+StandardError=journal
+
+[Install]
+WantedBy=multi-user.target
+EOF
+    
+    # Celery Beat Service (periodic jobs: stuck-job reaper)
+    print_info "Creating Celery beat service..."
+    cat > /etc/systemd/system/xtremand-celery-beat.service << EOF
+[Unit]
+Description=Xtremand Celery Beat
+After=network.target redis-server.service
+
+[Service]
+Type=simple
+User=$USER
+WorkingDirectory=$PROJECT_DIR
+Environment="PATH=$VENV_DIR/bin"
+EnvironmentFile=$PROJECT_DIR/.env
+ExecStartPre=+/usr/bin/install -d -o $USER -g $GROUP $LOG_DIR
+ExecStart=$VENV_DIR/bin/celery -A web_project beat --loglevel=info
 Restart=always
 RestartSec=10
 StandardOutput=journal
@@ -358,6 +480,8 @@ step_start_services() {
     print_info "Enabling services..."
     systemctl enable xtremand-django.service
     systemctl enable xtremand-celery.service
+    systemctl enable xtremand-celery-media.service
+    systemctl enable xtremand-celery-beat.service
     
     print_info "Starting Django service..."
     systemctl start xtremand-django.service
@@ -365,8 +489,13 @@ step_start_services() {
     
     print_info "Starting Celery service..."
     systemctl start xtremand-celery.service
+    systemctl start xtremand-celery-media.service
     sleep 3
     
+    print_info "Starting Celery beat service..."
+    systemctl start xtremand-celery-beat.service
+    sleep 1
+    
     print_success "Services started"
 }
 
@@ -392,6 +521,18 @@ step_verify() {
         print_error "Celery service is NOT running"
     fi
     
+    if systemctl is-active --quiet xtremand-celery-media.service; then
+        print_success "Celery media service is RUNNING"
+    else
+        print_error "Celery media service is NOT running"
+    fi
+    
+    if systemctl is-active --quiet xtremand-celery-beat.service; then
+        print_success "Celery beat service is RUNNING"
+    else
+        print_error "Celery beat service is NOT running"
+    fi
+    
     if systemctl is-active --quiet mongodb; then
         print_success "MongoDB is RUNNING"
     else
@@ -449,8 +590,8 @@ main() {
     echo -e "   - Set correct MinIO credentials if different"
     echo ""
     echo -e "${YELLOW}📊 SERVICE MANAGEMENT:${NC}"
-    echo -e "  Start services:   ${BLUE}systemctl start xtremand-django.service xtremand-celery.service${NC}"
-    echo -e "  Stop services:    ${BLUE}systemctl stop xtremand-django.service xtremand-celery.service${NC}"
+    echo -e "  Start services:   ${BLUE}systemctl start xtremand-django.service xtremand-celery.service xtremand-celery-media.service xtremand-celery-beat.service${NC}"
+    echo -e "  Stop services:    ${BLUE}systemctl stop xtremand-django.service xtremand-celery.service xtremand-celery-media.service xtremand-celery-beat.service${NC}"
     echo -e "  View status:      ${BLUE}systemctl status xtremand-django.service${NC}"
     echo -e "  View logs:        ${BLUE}journalctl -u xtremand-django.service -f${NC}"
     echo ""
@@ -26,6 +26,8 @@ fi
 echo -e "${YELLOW}🛑 Stopping services...${NC}"
 sudo systemctl stop xtremand-django.service
 sudo systemctl stop xtremand-celery.service
+sudo systemctl stop xtremand-celery-media.service
+sudo systemctl stop xtremand-celery-beat.service
 sleep 2
 echo -e "${GREEN}✅ Services stopped${NC}"
 echo ""
@@ -35,6 +37,8 @@ echo -e "${YELLOW}🚀 Starting services...${NC}"
 sudo systemctl start xtremand-django.service
 sleep 2
 sudo systemctl start xtremand-celery.service
+sudo systemctl start xtremand-celery-media.service
+sudo systemctl start xtremand-celery-beat.service
 sleep 2
 echo -e "${GREEN}✅ Services started${NC}"
 echo ""
@@ -55,6 +59,12 @@ else
     echo -e "   ❌ Celery service is NOT running"
 fi
 
+if sudo systemctl is-active --quiet xtremand-celery-media.service; then
+    echo -e "   ${GREEN}✅ Celery media service is RUNNING${NC}"
+else
+    echo -e "   ❌ Celery media service is NOT running"
+fi
+
 echo ""
 echo -e "${BLUE}════════════════════════════════════════════════════════════${NC}"
 echo -e "${GREEN}✅ Services restarted successfully!${NC}"
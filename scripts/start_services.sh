@@ -23,14 +23,21 @@ sleep 2
 
 echo "Starting Celery service..."
 sudo systemctl start xtremand-celery.service
+sudo systemctl start xtremand-celery-media.service
 sleep 2
 
+echo "Starting Celery beat service..."
+sudo systemctl start xtremand-celery-beat.service
+sleep 1
+
 # Verify
 echo ""
 echo "✅ Checking service status..."
 sudo systemctl status xtremand-django.service --no-pager
 echo ""
 sudo systemctl status xtremand-celery.service --no-pager
+echo ""
+sudo systemctl status xtremand-celery-media.service --no-pager
 
 echo ""
 echo "✅ All services started successfully!"
@@ -16,6 +16,12 @@ sleep 1
 # Stop Celery
 echo "Stopping Celery service..."
 sudo systemctl stop xtremand-celery.service
+sudo systemctl stop xtremand-celery-media.service
+sleep 1
+
+# Stop Celery beat
+echo "Stopping Celery beat service..."
+sudo systemctl stop xtremand-celery-beat.service
 sleep 1
 
 # Verify
@@ -23,6 +29,7 @@ echo ""
 echo "✅ Checking service status..."
 sudo systemctl status xtremand-django.service --no-pager
 sudo systemctl status xtremand-celery.service --no-pager
+sudo systemctl status xtremand-celery-media.service --no-pager
 
 echo ""
 echo "✅ All services stopped successfully!"
@@ -1,7 +1,10 @@
 # web_project/celery.py
 import os
 from celery import Celery
-from celery.signals import worker_process_init, worker_process_shutdown
+from celery.signals import (
+    worker_init, worker_process_init, worker_process_shutdown,
+    before_task_publish, task_prerun, task_postrun,
+)
 import mongoengine
 from mongoengine.connection import get_connection
 
@@ -74,11 +77,75 @@ def celery_worker_init(**kwargs):
     mongoengine.connect(**connect_kwargs)
     logger.info("✅ MongoEngine connected in Celery worker process (env=%s)", getattr(settings, "DB_ENV", "local"))
 
+# --- Whisper preload: media workers load and warm the model before taking tasks ---
+MEDIA_QUEUES = {"media", "media_large"}
+
+def _consumes_media():
+    preload = os.environ.get("XTR_PRELOAD_WHISPER", "auto")
+    if preload in ("0", "1"):
+        return preload == "1"
+    # Queues selected with -Q are set up in the parent and inherited by each child
+    queues = set(app.amqp.queues.consume_from or ())
+    return bool(queues & MEDIA_QUEUES)
+
+@worker_process_init.connect
+def celery_preload_models(**kwargs):
+    if not _consumes_media():
+        return
+    from xtr.tasks import warm_up_whisper
+    from xtr.transcription import DEFAULT_PROFILE
+    for profile in os.environ.get("XTR_PRELOAD_PROFILES", DEFAULT_PROFILE).split(","):
+        try:
+            warm_up_whisper(profile.strip())
+        except Exception as e:
+            # Not fatal: the first media task loads the model again and reports the error
+            logger.error("❌ Whisper preload failed for profile %s: %s", profile, e)
+
 @worker_process_shutdown.connect
-def celery_worker_shutdown(**kwargs):
+def celery_worker_shutdown(pid=None, **kwargs):
     """Disconnect Mongo cleanly when Celery worker stops."""
+    try:
+        # Buffered results must reach Mongo before the connection goes away
+        from xtr.write_buffer import flush
+        flush()
+    except Exception as e:
+        logger.error("❌ Could not flush buffered results: %s", e)
     try:
         mongoengine.disconnect(alias="default")
         logger.warning("🛑 MongoEngine disconnected from Celery worker process")
     except Exception:
         pass
+
+    from xtr.metrics import mark_process_dead
+    mark_process_dead(pid or os.getpid())
+
+# --- Metrics exporter in the worker main process ---
+@worker_init.connect
+def celery_worker_metrics(**kwargs):
+    from xtr.metrics import start_worker_exporter
+    try:
+        start_worker_exporter()
+    except Exception as e:
+        logger.error("❌ Could not start worker metrics exporter: %s", e)
+
+
+# --- Tracing: carry the per-file trace context through every task ---
+@before_task_publish.connect
+def celery_trace_publish(headers=None, **kwargs):
+    from xtr import tracing
+    tracing.inject(headers)
+
+@task_prerun.connect
+def celery_trace_prerun(task_id=None, task=None, args=None, **kwargs):
+    from xtr import tracing
+    tracing.task_started(task_id, task, args)
+
+@task_postrun.connect
+def celery_trace_postrun(task_id=None, state=None, **kwargs):
+    from xtr import tracing
+    tracing.task_finished(task_id, state)
+
+@task_postrun.connect
+def celery_release_task_resources(**kwargs):
+    from xtr.claims import discard_usage
+    discard_usage()
@@ -62,6 +62,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 
+# Small files are dispatched with a higher priority than large ones (see xtr/scheduling.py).
+# Redis emulates priorities with one list per step; 0 is served first.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+# Don't let a worker prefetch a backlog of big jobs ahead of higher-priority ones
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.environ.get('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
+
+# Recycle a prefork child once its RSS passes this many KiB (checked after each task),
+# so one outlier file doesn't leave a bloated heap behind. Tuned per queue by running
+# separate workers (see scripts/deploy.sh): document queue vs. media queues.
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = int(os.environ.get('CELERY_WORKER_MAX_MEMORY_PER_CHILD', '1048576'))
+CELERY_WORKER_MAX_TASKS_PER_CHILD = int(os.environ.get('CELERY_WORKER_MAX_TASKS_PER_CHILD', '500'))
+# Media workers load and warm up Whisper in worker_process_init (web_project/celery.py);
+# a child that isn't up within Celery's default 4 s would be killed and restarted.
+CELERY_WORKER_PROC_ALIVE_TIMEOUT = float(os.environ.get('CELERY_WORKER_PROC_ALIVE_TIMEOUT', '300'))
+
+# Periodic jobs (run by `celery -A web_project beat`)
+CELERY_BEAT_SCHEDULE = {
+    'reap-expired-leases': {
+        'task': 'xtr.tasks.reap_expired_leases',
+        'schedule': float(os.environ.get('XTR_REAPER_INTERVAL_SECONDS', '60')),
+    },
+}
+
 # ===============================
 # MongoDB Configuration
 # ===============================
@@ -6,4 +6,9 @@ urlpatterns = [
     path('', views.home, name='home'),  # ✅ Welcome page
     path('process/', views.start_auto_processing, name='process'),  # ✅ Correct task trigger
     path('minio_event_webhook/', minio_event_webhook, name='minio_event_webhook'),
+    path('metrics/', views.metrics, name='metrics'),  # ✅ Prometheus scrape endpoint
+    path('search/', views.search, name='search'),  # ✅ Full-text search over extracted content
+    path('api/files/<str:file_type>/', views.list_files, name='list_files'),  # ✅ Keyset-paged read API
+    path('api/files/<str:file_type>/<path:filename>', views.file_detail, name='file_detail'),
+    path('events/', views.events, name='events'),  # ✅ SSE feed of finished files
 ]
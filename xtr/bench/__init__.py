@@ -0,0 +1,2 @@
+# xtr/bench: benchmark harness (synthetic corpus, local stand-ins, runners).
+# Entry point: `python manage.py bench --help`
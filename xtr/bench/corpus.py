@@ -0,0 +1,378 @@
+# xtr/bench/corpus.py
+#
+# Reproducible synthetic corpus for the benchmark harness. Every generator
+# takes (path, scale, rng) and writes one file; scale grows the content
+# roughly linearly so "small/medium/large" stress the same code paths.
+
+import os
+import io
+import json
+import math
+import wave
+import random
+import struct
+import shutil
+import tarfile
+import zipfile
+import subprocess
+
+SCALES = {"small": 1, "medium": 10, "large": 100}
+
+WORDS = (
+    "contract invoice audit revenue quarter customer shipment policy renewal "
+    "clause liability payment schedule region forecast margin supplier risk "
+    "compliance report summary meeting agenda decision action owner deadline"
+).split()
+
+
+def _sentence(rng, n=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _paragraphs(rng, count):
+    return [_sentence(rng, rng.randint(8, 20)) for _ in range(count)]
+
+
+# -----------------------------
+# Text-like formats
+# -----------------------------
+def make_json(path, scale, rng):
+    rows = [{"id": i, "name": rng.choice(WORDS), "amount": round(rng.random() * 1000, 2),
+             "tags": rng.sample(WORDS, 3)} for i in range(200 * scale)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"records": rows}, f)
+
+
+def make_xml(path, scale, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<?xml version='1.0'?>\n<records>\n")
+        for i in range(200 * scale):
+            f.write(f"  <record id='{i}'><name>{rng.choice(WORDS)}</name>"
+                    f"<note>{_sentence(rng)}</note></record>\n")
+        f.write("</records>\n")
+
+
+def make_yaml(path, scale, rng):
+    import yaml
+    data = {f"section_{i}": {"owner": rng.choice(WORDS), "items": rng.sample(WORDS, 5)}
+            for i in range(100 * scale)}
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f)
+
+
+def make_log(path, scale, rng):
+    levels = ["INFO", "WARNING", "ERROR", "DEBUG"]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1000 * scale):
+            f.write(f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d} {rng.choice(levels)} "
+                    f"worker-{rng.randint(1, 8)} {_sentence(rng, 8)}\n")
+
+
+def make_html(path, scale, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><body><dl>\n")
+        for i in range(200 * scale):
+            f.write(f"<dt><a href='https://example.com/{i}'>{_sentence(rng, 4)}</a></dt>\n")
+        f.write("</dl></body></html>\n")
+
+
+def make_txt(path, scale, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(_paragraphs(rng, 100 * scale)))
+
+
+def make_csv(path, scale, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,region,amount,owner\n")
+        for i in range(1000 * scale):
+            f.write(f"{i},{rng.choice(WORDS)},{rng.random() * 1000:.2f},{rng.choice(WORDS)}\n")
+
+
+# -----------------------------
+# Office / binary formats
+# -----------------------------
+def make_xlsx(path, scale, rng):
+    import pandas as pd
+    df = pd.DataFrame({
+        "id": range(500 * scale),
+        "region": [rng.choice(WORDS) for _ in range(500 * scale)],
+        "amount": [rng.random() * 1000 for _ in range(500 * scale)],
+    })
+    df.to_excel(path, index=False, engine="openpyxl")
+
+
+def make_docx(path, scale, rng):
+    from docx import Document
+    doc = Document()
+    for i, para in enumerate(_paragraphs(rng, 50 * scale)):
+        if i % 25 == 0:
+            doc.add_heading(_sentence(rng, 4), level=1)
+        doc.add_paragraph(para)
+    table = doc.add_table(rows=5 * scale, cols=4)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.text = rng.choice(WORDS)
+    doc.save(path)
+
+
+def make_contract_docx(path, scale, rng):
+    """Contract-like .docx: numbered clauses, schedule tables, header and footer."""
+    from docx import Document
+    doc = Document()
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = "Master Services Agreement — Confidential"
+    section.footer.paragraphs[0].text = "Page footer: " + _sentence(rng, 6)
+    for clause in range(1, 20 * scale + 1):
+        doc.add_heading(f"{clause}. {_sentence(rng, 4)}", level=2)
+        for para in _paragraphs(rng, 3):
+            doc.add_paragraph(para)
+        if clause % 5 == 0:
+            table = doc.add_table(rows=6, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = f"{rng.choice(WORDS)} {round(rng.random() * 1000, 2)}"
+    doc.save(path)
+
+
+def make_pptx(path, scale, rng):
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    for _ in range(5 * scale):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = _sentence(rng, 4)
+        slide.placeholders[1].text = "\n".join(_paragraphs(rng, 4))
+        slide.notes_slide.notes_text_frame.text = _sentence(rng)
+        rows = 3
+        table = slide.shapes.add_table(rows, 3, Inches(1), Inches(5), Inches(6), Inches(1)).table
+        for r in range(rows):
+            for c in range(3):
+                table.cell(r, c).text = rng.choice(WORDS)
+    prs.save(path)
+
+
+def make_deck(path, scale, rng):
+    """Presentation of 3 × scale slides: bullets, notes, a table and a group of text boxes each."""
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    for _ in range(3 * scale):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = _sentence(rng, 4)
+        slide.placeholders[1].text = "\n".join(_paragraphs(rng, 5))
+        slide.notes_slide.notes_text_frame.text = " ".join(_paragraphs(rng, 3))
+        table = slide.shapes.add_table(4, 4, Inches(1), Inches(5), Inches(6), Inches(1)).table
+        for r in range(4):
+            for c in range(4):
+                table.cell(r, c).text = f"{rng.choice(WORDS)} {rng.randint(1, 999)}"
+        group = slide.shapes.add_group_shape()
+        for i in range(3):
+            group.shapes.add_textbox(Inches(1 + 2 * i), Inches(6.5), Inches(2), Inches(0.5)).text_frame.text = \
+                _sentence(rng, 5)
+    prs.save(path)
+
+
+
+def make_epub(path, scale, rng):
+    """Book of 2 × scale chapters: headings, paragraphs, a nested list and a table each."""
+    from ebooklib import epub
+    book = epub.EpubBook()
+    book.set_identifier(f"bench-{rng.randint(0, 10 ** 9)}")
+    book.set_title(_sentence(rng, 4))
+    book.set_language("en")
+    chapters = []
+    for number in range(1, 2 * scale + 1):
+        body = [f"<h1>Chapter {number}: {_sentence(rng, 4)}</h1>"]
+        for i, para in enumerate(_paragraphs(rng, 12)):
+            if i % 4 == 0:
+                body.append(f"<h2>{_sentence(rng, 3)}</h2>")
+            body.append(f"<p>{para[:40]}<em>{rng.choice(WORDS)}</em>{para[40:]}</p>")
+        body.append("<ul>" + "".join(f"<li>{_sentence(rng, 6)}<ul><li>{_sentence(rng, 4)}</li></ul></li>"
+                                     for _ in range(3)) + "</ul>")
+        body.append("<table>" + "".join("<tr>" + "".join(f"<td>{rng.choice(WORDS)}</td>" for _ in range(3)) + "</tr>"
+                                        for _ in range(4)) + "</table>")
+        chapter = epub.EpubHtml(title=f"Chapter {number}", file_name=f"chapter-{number}.xhtml")
+        chapter.content = "".join(body)
+        book.add_item(chapter)
+        chapters.append(chapter)
+    book.toc = chapters
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ["nav"] + chapters
+    epub.write_epub(path, book)
+
+
+def make_odt(path, scale, rng):
+    """Text document of 20 × scale sections: heading, styled paragraphs, a footnote and a table every 5th."""
+    from odf.opendocument import OpenDocumentText
+    from odf.text import H, P, S, Span, Note, NoteBody, NoteCitation
+    from odf.table import Table, TableColumn, TableRow, TableCell
+    doc = OpenDocumentText()
+    for section in range(1, 20 * scale + 1):
+        doc.text.addElement(H(outlinelevel=2, text=f"{section}. {_sentence(rng, 4)}"))
+        for para in _paragraphs(rng, 3):
+            p = P(text=para[:30])
+            p.addElement(S(c=2))
+            p.addElement(Span(text=para[30:]))
+            doc.text.addElement(p)
+        note = Note(id=f"n{section}", noteclass="footnote")
+        note.addElement(NoteCitation(text=str(section)))
+        body = NoteBody()
+        body.addElement(P(text=_sentence(rng)))
+        note.addElement(body)
+        p = P(text=_sentence(rng))
+        p.addElement(note)
+        doc.text.addElement(p)
+        if section % 5 == 0:
+            table = Table()
+            table.addElement(TableColumn(numbercolumnsrepeated=4))
+            for _ in range(6):
+                row = TableRow()
+                for _ in range(4):
+                    cell = TableCell()
+                    cell.addElement(P(text=f"{rng.choice(WORDS)} {round(rng.random() * 1000, 2)}"))
+                    row.addElement(cell)
+                table.addElement(row)
+            doc.text.addElement(table)
+    doc.save(path)
+
+
+def make_pdf(path, scale, rng):
+    """Minimal hand-written PDF with one text page per 'page' (no extra deps)."""
+    pages = 5 * scale
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = _paragraphs(rng, 30)
+        stream = "BT /F1 10 Tf 50 780 Td 12 TL " + " ".join(
+            f"({line[:90]}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for off in offsets:
+        out.write(f"{off:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    with open(path, "wb") as f:
+        f.write(out.getvalue())
+
+
+def make_png(path, scale, rng):
+    from PIL import Image
+    side = int(256 * math.sqrt(scale))
+    img = Image.effect_noise((side, side), 64).convert("RGB")
+    img.save(path, format="PNG")
+
+
+def make_zip(path, scale, rng):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(20 * scale):
+            zf.writestr(f"docs/file_{i}.txt", "\n".join(_paragraphs(rng, 10)))
+
+
+def make_tar(path, scale, rng):
+    with tarfile.open(path, "w") as tf:
+        for i in range(20 * scale):
+            data = "\n".join(_paragraphs(rng, 10)).encode()
+            info = tarfile.TarInfo(f"docs/file_{i}.txt")
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+
+
+# -----------------------------
+# Media
+# -----------------------------
+def make_wav(path, scale, rng, seconds=None):
+    """Mono 16 kHz tone sweep; 5 s per scale step."""
+    seconds = seconds or 5 * scale
+    rate = 16000
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        frames = bytearray()
+        for n in range(rate * seconds):
+            freq = 220 + (n / rate) * 40
+            frames += struct.pack("<h", int(8000 * math.sin(2 * math.pi * freq * n / rate)))
+        w.writeframes(bytes(frames))
+
+
+def make_mp4(path, scale, rng):
+    ffmpeg = shutil.which(os.getenv("FFMPEG_PATH") or "ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg not found: cannot generate video samples")
+    subprocess.run(
+        [ffmpeg, "-y", "-loglevel", "error",
+         "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={5 * scale}",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={5 * scale}",
+         "-shortest", "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", path],
+        check=True,
+    )
+
+
+# file_type → [(extension, generator)]
+GENERATORS = {
+    "json": [(".json", make_json)],
+    "xml": [(".xml", make_xml)],
+    "yaml": [(".yaml", make_yaml)],
+    "log": [(".log", make_log)],
+    "html": [(".html", make_html)],
+    "document": [(".txt", make_txt), (".pdf", make_pdf), (".docx", make_docx)],
+    "presentation": [(".pptx", make_pptx)],
+    "spreadsheet": [(".csv", make_csv), (".xlsx", make_xlsx)],
+    "image": [(".png", make_png)],
+    "archive": [(".zip", make_zip), (".tar", make_tar)],
+    "audio": [(".wav", make_wav)],
+    "video": [(".mp4", make_mp4)],
+}
+
+
+class CorpusFile:
+    def __init__(self, path, object_name, file_type, size_class):
+        self.path = path
+        self.object_name = object_name
+        self.file_type = file_type
+        self.size_class = size_class
+        self.size = os.path.getsize(path)
+
+    def __repr__(self):
+        return f"<CorpusFile {self.object_name} ({self.size} bytes)>"
+
+
+def build_corpus(outdir, types=None, sizes=("small", "medium"), seed=1234):
+    """
+    Generate the corpus into ``outdir`` (reused if already there). Files are
+    deterministic for a given seed, so runs are comparable across commits.
+    """
+    os.makedirs(outdir, exist_ok=True)
+    corpus = []
+    for file_type, generators in GENERATORS.items():
+        if types and file_type not in types:
+            continue
+        for ext, generator in generators:
+            for size_class in sizes:
+                name = f"{file_type}-{size_class}{ext}"
+                path = os.path.join(outdir, name)
+                if not os.path.exists(path):
+                    rng = random.Random(f"{seed}:{name}")
+                    try:
+                        generator(path, SCALES[size_class], rng)
+                    except Exception as e:
+                        if os.path.exists(path):
+                            os.remove(path)
+                        print(f"[BENCH] ⚠️ Skipping {name}: {e}")
+                        continue
+                corpus.append(CorpusFile(path, name, file_type, size_class))
+    return corpus
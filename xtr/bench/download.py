@@ -0,0 +1,80 @@
+# xtr/bench/download.py
+#
+# Single-stream fget_object against xtr.transfer.parallel_download on one
+# large object, across part sizes and stream counts. Reports MB/s (median
+# and best of the runs) and the speedup over single-stream.
+
+import os
+import time
+import random
+import tempfile
+
+from xtr.bench import standins
+from xtr.bench.runner import percentile
+from xtr.transfer import parallel_download
+
+MB = 1024 * 1024
+
+
+def make_payload(outdir, size_mb, seed=1234):
+    """Incompressible, deterministic payload of ``size_mb`` MB (reused if already there)."""
+    os.makedirs(outdir, exist_ok=True)
+    path = os.path.join(outdir, f"download-{size_mb}mb.bin")
+    if not os.path.exists(path):
+        rng = random.Random(seed)
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(rng.randbytes(MB))
+    return path
+
+
+def _timed(fn, path):
+    started = time.perf_counter()
+    fn(path)
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(path)
+    os.remove(path)
+    return size / MB / elapsed
+
+
+def run(endpoint, payload, part_sizes=(16,), concurrencies=(4,), repeat=3, scratch_dir=None):
+    client = standins.use_s3(endpoint)
+    object_name = f"bench/{os.path.basename(payload)}"
+    client.fput_object("processing", object_name, payload)
+    stat = client.stat_object("processing", object_name)
+
+    configs = [("single", None, 1)] + [
+        ("parallel", part, streams) for part in part_sizes for streams in concurrencies
+    ]
+    rows = []
+    for mode, part, streams in configs:
+        print(f"[BENCH] ▶️ {mode} part={part or '-'}MB streams={streams}")
+        rates = []
+        for _ in range(repeat):
+            fd, path = tempfile.mkstemp(suffix=".bin", dir=scratch_dir)
+            os.close(fd)
+            if mode == "single":
+                rates.append(_timed(lambda p: client.fget_object("processing", object_name, p), path))
+            else:
+                rates.append(_timed(lambda p: parallel_download(
+                    client, "processing", object_name, p,
+                    part_size=part * MB, concurrency=streams, stat=stat), path))
+        rows.append((mode, part, streams, percentile(rates, 50), max(rates)))
+
+    client.remove_object("processing", object_name)
+    return stat.size, rows
+
+
+HEADER = ("mode", "part MB", "streams", "p50 MB/s", "best MB/s", "speedup")
+
+
+def format_report(size, rows):
+    baseline = rows[0][3] or 1e-9
+    lines = [
+        f"Object: {size / MB:.0f} MB",
+        "{:<10}{:>9}{:>9}{:>11}{:>11}{:>9}".format(*HEADER),
+    ]
+    for mode, part, streams, p50, best in rows:
+        lines.append("{:<10}{:>9}{:>9}{:>11.1f}{:>11.1f}{:>8.2f}x".format(
+            mode, part or "-", streams, p50, best, p50 / baseline))
+    return "\n".join(lines)
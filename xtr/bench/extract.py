@@ -0,0 +1,137 @@
+# xtr/bench/extract.py
+#
+# Text extractors head to head on one large synthetic document per format:
+# the library/DOM approach each handler used before against the streaming
+# extractor in xtr/extractors. Every implementation runs in its own forked
+# process so peak RSS is attributable. Reports p50 seconds, characters
+# extracted (more means content the other missed) and peak / Δ RSS.
+
+import os
+import time
+import random
+
+from xtr.bench import corpus
+from xtr.bench.runner import percentile, current_rss, peak_rss, _run_isolated
+
+MB = 1024 * 1024
+
+
+# -----------------------------
+# Implementations: path → text
+# -----------------------------
+def _docx_python_docx(path):
+    from docx import Document
+    return "\n".join(p.text for p in Document(path).paragraphs)
+
+
+def _docx_streaming(path):
+    from xtr.extractors.word import extract_docx
+    with open(path, "rb") as f:
+        return extract_docx(f)[0]
+
+
+def _pptx_python_pptx(path):
+    # What extract_ppt_text did before: top-level shape text only
+    from pptx import Presentation
+    prs = Presentation(path)
+    return "\n".join(shape.text for slide in prs.slides for shape in slide.shapes if hasattr(shape, "text"))
+
+
+def _pptx_streaming(path):
+    from xtr.extractors.slides import extract_pptx
+    with open(path, "rb") as f:
+        return extract_pptx(f)[0]
+
+
+def _epub_ebooklib(path):
+    # What process_doc did before: every document item as one line of soup text
+    from ebooklib import epub
+    from bs4 import BeautifulSoup
+    book = epub.read_epub(path)
+    return "\n".join(BeautifulSoup(item.get_content(), "html.parser").get_text(" ", strip=True)
+                     for item in book.get_items_of_type(9))
+
+
+def _epub_streaming(path):
+    from xtr.extractors.ebook import extract_epub
+    with open(path, "rb") as f:
+        return extract_epub(f)[0]
+
+
+def _odt_odfpy(path):
+    from odf.opendocument import load
+    from odf import text
+    return "\n".join(str(p) for p in load(path).getElementsByType(text.P))
+
+
+def _odt_streaming(path):
+    from xtr.extractors.opendocument import extract_odt
+    with open(path, "rb") as f:
+        return extract_odt(f)[0]
+
+
+# format → (extension, generator, {implementation name: fn})
+FORMATS = {
+    "docx": (".docx", corpus.make_contract_docx, {
+        "python-docx": _docx_python_docx,
+        "streaming": _docx_streaming,
+    }),
+    # 300 slides at the default scale
+    "pptx": (".pptx", corpus.make_deck, {
+        "python-pptx": _pptx_python_pptx,
+        "streaming": _pptx_streaming,
+    }),
+    # 200 chapters at the default scale
+    "epub": (".epub", corpus.make_epub, {
+        "ebooklib+bs4": _epub_ebooklib,
+        "streaming": _epub_streaming,
+    }),
+    "odt": (".odt", corpus.make_odt, {
+        "odfpy": _odt_odfpy,
+        "streaming": _odt_streaming,
+    }),
+}
+
+
+def make_document(outdir, fmt, scale, seed=1234):
+    """The benchmark document for ``fmt`` at ``scale`` (reused if already there)."""
+    ext, generator, _ = FORMATS[fmt]
+    os.makedirs(outdir, exist_ok=True)
+    path = os.path.join(outdir, f"extract-{fmt}-{scale}{ext}")
+    if not os.path.exists(path):
+        generator(path, scale, random.Random(seed))
+    return path
+
+
+def _child(fmt, name, path, repeat, queue):
+    fn = FORMATS[fmt][2][name]
+    baseline = current_rss()
+    seconds = []
+    chars = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chars = len(fn(path))
+        seconds.append(time.perf_counter() - started)
+    peak = peak_rss()
+    queue.put((fmt, name, percentile(seconds, 50), chars, peak / MB, (peak - baseline) / MB))
+
+
+def run(outdir, formats=None, scale=100, repeat=3, seed=1234):
+    rows = []
+    for fmt in formats or FORMATS:
+        path = make_document(outdir, fmt, scale, seed)
+        print(f"[BENCH] 📄 {fmt}: {os.path.getsize(path) / MB:.1f} MB")
+        for name in FORMATS[fmt][2]:
+            print(f"[BENCH] ▶️ {fmt} / {name} × {repeat}")
+            rows.append(_run_isolated(_child, fmt, name, path, repeat))
+    return rows
+
+
+HEADER = ("format", "extractor", "p50 s", "chars", "peak RSS MB", "Δ RSS MB")
+
+
+def format_report(rows):
+    lines = ["{:<8}{:<14}{:>9}{:>12}{:>13}{:>10}".format(*HEADER)]
+    for fmt, name, p50, chars, peak, delta in rows:
+        lines.append("{:<8}{:<14}{:>9.2f}{:>12}{:>13.1f}{:>10.1f}".format(fmt, name, p50, chars, peak, delta))
+    return "\n".join(lines)
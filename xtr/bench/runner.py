@@ -0,0 +1,179 @@
+# xtr/bench/runner.py
+#
+# Runs the process_* handlers and the full dispatch path against the local
+# stand-ins and reports throughput, p50/p99 latency and peak RSS per type.
+# Each file type runs in its own forked process so peak RSS is attributable.
+
+import os
+import time
+import resource
+import multiprocessing
+import queue as queue_module
+from collections import defaultdict
+
+from xtr import write_buffer
+from xtr.bench import standins
+
+MB = 1024 * 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def current_rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Result:
+    def __init__(self, name):
+        self.name = name
+        self.files = 0
+        self.latencies = []
+        self.bytes = 0
+        self.failures = 0
+        self.wall = 0.0
+        self.baseline_rss = 0
+        self.peak_rss = 0
+
+    def row(self):
+        wall = self.wall or 1e-9
+        return (
+            self.name, self.files, self.bytes / MB,
+            self.files / wall, self.bytes / MB / wall,
+            percentile(self.latencies, 50) * 1000, percentile(self.latencies, 99) * 1000,
+            self.peak_rss / MB, (self.peak_rss - self.baseline_rss) / MB, self.failures,
+        )
+
+
+HEADER = ("type", "files", "MB", "files/s", "MB/s", "p50 ms", "p99 ms", "peak RSS MB", "Δ RSS MB", "failed")
+
+
+def format_report(results):
+    lines = [
+        "{:<14}{:>7}{:>10}{:>10}{:>9}{:>10}{:>10}{:>13}{:>10}{:>8}".format(*HEADER)
+    ]
+    for r in results:
+        lines.append(
+            "{:<14}{:>7}{:>10.2f}{:>10.2f}{:>9.2f}{:>10.1f}{:>10.1f}{:>13.1f}{:>10.1f}{:>8}".format(*r.row())
+        )
+    return "\n".join(lines)
+
+
+# -----------------------------
+# Child process bodies
+# -----------------------------
+def _upload(client, corpus_file, object_name):
+    client.fput_object("processing", object_name, corpus_file.path)
+
+
+def _status(model, object_name):
+    doc = model._get_collection().find_one({"filename": object_name}, {"status": 1})
+    return doc.get("status") if doc else None
+
+
+def _handlers_child(endpoint, mongo_uri, file_type, files, repeat, queue):
+    from xtr.registry import get_handler
+
+    client = standins.use_s3(endpoint)
+    result = Result(file_type)
+    result.baseline_rss = current_rss()
+    handler = get_handler(file_type)
+
+    with standins.local_mongo(mongo_uri):
+        standins.reset_collections()
+        started = time.perf_counter()
+        processed = []
+        for run in range(repeat):
+            for f in files:
+                object_name = f"run{run}/{f.object_name}"
+                _upload(client, f, object_name)
+                t0 = time.perf_counter()
+                handler.task.apply(args=("processing", object_name))
+                result.latencies.append(time.perf_counter() - t0)
+                result.files += 1
+                result.bytes += f.size
+                processed.append(object_name)
+        write_buffer.flush()
+        result.wall = time.perf_counter() - started
+        result.failures = sum(_status(handler.model, name) != "completed" for name in processed)
+
+    result.peak_rss = peak_rss()
+    queue.put(result)
+
+
+def _dispatch_child(endpoint, mongo_uri, files, queue):
+    from web_project.celery import app
+    from xtr.tasks import auto_discover_and_process
+    from xtr.registry import get_handler
+
+    # Run the whole chain in-process: dispatch → handlers
+    app.conf.task_always_eager = True
+
+    client = standins.use_s3(endpoint)
+    result = Result("dispatch(all)")
+    result.baseline_rss = current_rss()
+
+    with standins.local_mongo(mongo_uri):
+        standins.reset_collections()
+        for f in files:
+            _upload(client, f, f"dispatch/{f.object_name}")
+        started = time.perf_counter()
+        auto_discover_and_process.apply(args=("processing",))
+        write_buffer.flush()
+        result.wall = time.perf_counter() - started
+        # Only end-to-end throughput is meaningful here; per-file latency comes from run_handlers
+        for f in files:
+            result.files += 1
+            result.bytes += f.size
+            if _status(get_handler(f.file_type).model, f"dispatch/{f.object_name}") != "completed":
+                result.failures += 1
+
+    result.peak_rss = peak_rss()
+    queue.put(result)
+
+
+def _run_isolated(target, *args):
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=target, args=(*args, queue))
+    proc.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except queue_module.Empty:
+            if not proc.is_alive():
+                raise RuntimeError(f"Benchmark process died (exit code {proc.exitcode})")
+    proc.join()
+    return result
+
+
+# -----------------------------
+# Entry points
+# -----------------------------
+def run_handlers(endpoint, corpus, mongo_uri=None, repeat=3):
+    by_type = defaultdict(list)
+    for f in corpus:
+        by_type[f.file_type].append(f)
+    results = []
+    for file_type, files in by_type.items():
+        print(f"[BENCH] ▶️ {file_type}: {len(files)} files × {repeat}")
+        results.append(_run_isolated(_handlers_child, endpoint, mongo_uri, file_type, files, repeat))
+    return results
+
+
+def run_dispatch(endpoint, corpus, mongo_uri=None):
+    print(f"[BENCH] ▶️ full dispatch: {len(corpus)} files")
+    return _run_isolated(_dispatch_child, endpoint, mongo_uri, corpus)
@@ -0,0 +1,102 @@
+# xtr/bench/standins.py
+#
+# Local replacements for MinIO and MongoDB so the handlers can be benchmarked
+# on a laptop: an in-process S3 server (moto) or any local S3 endpoint, and
+# mongomock or a local mongod. Nothing here is used by the running service.
+
+import socket
+import logging
+from contextlib import contextmanager
+
+import mongoengine
+from minio import Minio
+
+from xtr import minio_client as minio_module
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("processing", "archive", "results")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def local_s3(endpoint=None, access_key="minioadmin", secret_key="minioadmin"):
+    """
+    Make the pipeline use a local S3 endpoint and yield its address.
+    Without ``endpoint`` an in-process moto server is started.
+    """
+    server = None
+    if not endpoint:
+        try:
+            from moto.server import ThreadedMotoServer
+        except ImportError as ie:
+            raise RuntimeError(
+                "Missing dependency 'moto'. Install with `pip install moto[server]` "
+                "or pass --s3-endpoint to use a local MinIO."
+            ) from ie
+        port = _free_port()
+        server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+        server.start()
+        endpoint = f"127.0.0.1:{port}"
+
+    from xtr import tasks
+    previous = (minio_module._CLIENT, tasks.minio_client)
+    client = use_s3(endpoint, access_key, secret_key)
+    for bucket in BUCKETS:
+        if not client.bucket_exists(bucket):
+            client.make_bucket(bucket)
+    try:
+        yield endpoint
+    finally:
+        minio_module._CLIENT, tasks.minio_client = previous
+        if server is not None:
+            server.stop()
+
+
+def use_s3(endpoint, access_key="minioadmin", secret_key="minioadmin"):
+    """
+    Install a fresh client for ``endpoint`` everywhere the pipeline looks for
+    one. Call again in forked children: connection pools must not be shared.
+    """
+    from xtr import tasks
+    client = Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=False)
+    minio_module._CLIENT = client
+    # The tasks module keeps its own reference from import time
+    tasks.minio_client = client
+    return client
+
+
+@contextmanager
+def local_mongo(uri=None, db="xtr_bench"):
+    """Point mongoengine at mongomock (default) or a local mongod for the run."""
+    mongoengine.disconnect(alias="default")
+    if uri:
+        mongoengine.connect(db=db, host=uri, alias="default")
+    else:
+        try:
+            import mongomock
+        except ImportError as ie:
+            raise RuntimeError(
+                "Missing dependency 'mongomock'. Install with `pip install mongomock` "
+                "or pass --mongo-uri to use a local mongod."
+            ) from ie
+        mongoengine.connect(db=db, host="mongodb://localhost", alias="default",
+                            mongo_client_class=mongomock.MongoClient)
+    try:
+        if uri:
+            mongoengine.get_connection().drop_database(db)
+        yield
+    finally:
+        mongoengine.disconnect(alias="default")
+
+
+def reset_collections():
+    """Drop every ingest collection between runs so claims start from scratch."""
+    from xtr.registry import registered_types, get_handler
+    for ftype in registered_types():
+        get_handler(ftype).model.drop_collection()
@@ -0,0 +1,329 @@
+# xtr/claims.py
+
+import os
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from xtr import write_buffer, content_store, search, feed, metrics
+from xtr.registry import file_type_for_model, handler_for_model
+from xtr.resources import TaskUsage
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = int(os.getenv("XTR_LEASE_SECONDS", "900"))
+# Long tasks renew their lease this often, so a much shorter lease is safe for them
+HEARTBEAT_SECONDS = int(os.getenv("XTR_HEARTBEAT_SECONDS", str(LEASE_SECONDS // 3)))
+# A file whose worker died this many times is marked failed instead of re-queued
+MAX_REAPS = int(os.getenv("XTR_MAX_REAPS", "3"))
+
+# Records in these states may be (re)claimed by any worker. "stale" records are
+# completed ones queued for re-extraction by a newer extractor version.
+CLAIMABLE_STATUSES = ["pending", "failed", "stale"]
+
+# Resource accounting for the claims this process currently holds
+_USAGE = {}
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def claim(model, filename, lease_seconds=LEASE_SECONDS):
+    """
+    Atomically move ``filename`` to "processing" for this worker.
+
+    A single find_one_and_update either takes over a pending/failed record
+    or a processing record whose lease has expired, or upserts a fresh one.
+    If the record is already completed or leased by someone else the filter
+    misses, the upsert hits the unique filename index and we get
+    DuplicateKeyError: the claim is lost and the caller must not download
+    or parse the object. Returns True if this worker owns the file.
+    """
+    now = _now()
+    try:
+        model._get_collection().find_one_and_update(
+            {
+                "filename": filename,
+                "$or": [
+                    {"status": {"$in": CLAIMABLE_STATUSES}},
+                    {"status": "processing", "lease_expires_at": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "status": "processing",
+                    "claimed_by": worker_id(),
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                },
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return False
+
+    handler = handler_for_model(model)
+    _USAGE[(model, filename)] = TaskUsage(handler.memory_limit if handler else None)
+    return True
+
+
+def _finish(model, filename, status, fields, sync=False, after=()):
+    """
+    Store the outcome and release the claim. The update goes through the
+    per-process write buffer (xtr/write_buffer.py); it only applies while
+    this worker still holds the lease. With ``sync`` it is written at once
+    and the return value says whether it applied; buffered, True means
+    queued. The result metric, the "file processed" feed event and the
+    ``after`` upserts (the search entry) are recorded once the update has
+    applied.
+    """
+    _record_usage(model, filename, fields)
+    return write_buffer.add(
+        model,
+        {"filename": filename, "claimed_by": worker_id()},
+        {
+            "$set": {"status": status, **fields},
+            "$unset": {"lease_expires_at": "", "claimed_by": "", "source_bucket": ""},
+        },
+        sync=sync,
+        status=status,
+        event=feed.event(file_type_for_model(model), filename, status, fields),
+        after=after,
+    )
+
+
+def _record_usage(model, filename, fields):
+    """Restore the memory limit of the claim and add its resource use to ``fields``."""
+    usage = _USAGE.pop((model, filename), None)
+    if usage is not None:
+        fields["resources"] = usage.finish()
+
+
+def _keep_previous_result(model, filename, status, message, fields):
+    """
+    A failed re-run of a stale record (see mark_stale) must not wipe the
+    result it was meant to replace: put the record back to "completed" with
+    its content, content_ref, search entry and extractor version untouched,
+    and note the error in meta_data.reprocess_error. Returns whether the
+    record was being re-run (and so has been restored).
+    """
+    resources = {"resources": fields["resources"]} if "resources" in fields else {}
+    result = model._get_collection().update_one(
+        {"filename": filename, "claimed_by": worker_id(), "source_bucket": {"$exists": True}},
+        {
+            "$set": {"status": "completed", "meta_data.reprocess_error": message, **resources},
+            "$unset": {"lease_expires_at": "", "claimed_by": "", "source_bucket": ""},
+        },
+    )
+    if not result.matched_count:
+        return False
+    # The re-run itself failed: counted as such, but nothing changed for readers
+    metrics.record_result(model, status)
+    return True
+
+
+def discard_usage():
+    """
+    Task teardown safety net: restore memory limits for any claim the task
+    returned without completing or failing.
+    """
+    while _USAGE:
+        _, usage = _USAGE.popitem()
+        usage.finish()
+
+
+def complete(model, filename, **fields):
+    """
+    Store the result and release the claim. Only the lease holder can write.
+    Content above the offload threshold goes to the results bucket first;
+    the text is (re)indexed for search once the result is written, and the
+    result is stamped with the handler's extractor version.
+    """
+    file_type = file_type_for_model(model)
+    handler = handler_for_model(model)
+    if handler is not None:
+        fields.setdefault("extractor_version", handler.version)
+    text = fields.get("content")
+    content_store.prepare(file_type, fields)
+    entry = search.index_update(file_type, filename, text)
+    return _finish(model, filename, "completed", fields, after=[entry] if entry else ())
+
+
+def fail(model, filename, error, **fields):
+    """
+    Record the failure and release the claim so a retry can pick it up.
+    A MemoryError (the per-type memory cap was hit) is recorded as
+    "too_large", which is final: retries cannot reclaim it. Failures are
+    written straight away, not buffered, so a quick retry finds the
+    record claimable. A stale record being re-run keeps its previous
+    result instead (see _keep_previous_result).
+    """
+    if isinstance(error, MemoryError):
+        status, message = "too_large", f"File too large to process within the memory cap: {error}"
+    else:
+        status, message = "failed", str(error)
+    _record_usage(model, filename, fields)
+    if _keep_previous_result(model, filename, status, message, fields):
+        return True
+    fields.setdefault("meta_data", {"error": message})
+    return _finish(model, filename, status, fields, sync=True)
+
+
+def reject_too_large(model, filename, size, max_size):
+    """
+    Record a file that is never processed because it exceeds a size limit
+    (type or scratch space). A new, pending or failed record becomes
+    "too_large"; a stale record keeps its previous result, as in fail().
+    Records being processed or already finished are left alone.
+    """
+    meta_data = {"error": "File exceeds size limit", "size": size, "max_size": max_size}
+    coll = model._get_collection()
+    coll.update_one(
+        {"filename": filename, "status": "stale"},
+        {"$set": {"status": "completed", "meta_data.reprocess_error": meta_data["error"]},
+         "$unset": {"source_bucket": ""}},
+    )
+    try:
+        result = coll.update_one(
+            {"filename": filename, "status": {"$in": ["pending", "failed"]}},
+            {"$set": {"status": "too_large", "meta_data": meta_data}, "$setOnInsert": {"created_at": _now()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return
+    if result.upserted_id is not None or result.modified_count:
+        metrics.record_result(model, "too_large")
+        feed.publish([feed.event(file_type_for_model(model), filename, "too_large", {"meta_data": meta_data})])
+
+
+# -----------------------------
+# Heartbeats
+# -----------------------------
+def renew(model, filename, lease_seconds=LEASE_SECONDS):
+    """Push the lease forward. Returns False if this worker no longer holds it."""
+    return bool(model.objects(
+        filename=filename, status="processing", claimed_by=worker_id()
+    ).update_one(set__lease_expires_at=_now() + timedelta(seconds=lease_seconds)))
+
+
+class LeaseHeartbeat(threading.Thread):
+    """
+    Background thread that renews a claim while a long, blocking step
+    (download, ffmpeg, transcription) runs. If the process dies, the
+    heartbeats stop and the reaper picks the file up once the lease expires.
+    """
+
+    def __init__(self, model, filename, interval=HEARTBEAT_SECONDS, lease_seconds=LEASE_SECONDS):
+        super().__init__(name=f"lease-heartbeat:{filename}", daemon=True)
+        self.model = model
+        self.filename = filename
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                if not renew(self.model, self.filename, self.lease_seconds):
+                    logger.warning("[CLAIM] ⚠️ Lost lease on '%s', stopping heartbeat", self.filename)
+                    return
+            except Exception as e:
+                logger.error("[CLAIM] ❌ Heartbeat failed for '%s': %s", self.filename, e)
+
+    def stop(self):
+        self._stopped.set()
+
+
+# -----------------------------
+# Reaper
+# -----------------------------
+def expired_claims(model, limit=500):
+    """
+    (filename, bucket) of records whose lease ran out (served by the
+    status/lease_expires_at index). Files being re-run come from their
+    source bucket, everything else from "processing".
+    """
+    cursor = model._get_collection().find(
+        {"status": "processing", "lease_expires_at": {"$lt": _now()}},
+        {"filename": 1, "source_bucket": 1},
+    ).limit(limit)
+    return [(doc["filename"], doc.get("source_bucket") or "processing") for doc in cursor]
+
+
+def release_expired(model, filename):
+    """
+    Hand an expired claim back to the queue. Returns "requeue" if the caller
+    should re-enqueue the file, "failed" if it exceeded MAX_REAPS, or None if
+    someone else got to it first (renewed, completed or already reaped).
+    """
+    now = _now()
+    doc = model._get_collection().find_one_and_update(
+        {"filename": filename, "status": "processing", "lease_expires_at": {"$lt": now}},
+        {
+            "$set": {"status": "pending"},
+            "$unset": {"lease_expires_at": "", "claimed_by": ""},
+            "$inc": {"reap_count": 1},
+        },
+        projection={"reap_count": 1, "source_bucket": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        return None
+    if doc.get("reap_count", 0) > MAX_REAPS:
+        error = f"Worker died {doc['reap_count']} times while processing"
+        if doc.get("source_bucket"):
+            # A stale re-run: keep the previous result, as fail() does
+            update = {"$set": {"status": "completed", "meta_data.reprocess_error": error},
+                      "$unset": {"source_bucket": ""}}
+        else:
+            update = {"$set": {"status": "failed", "meta_data": {"error": error}}}
+        model._get_collection().update_one({"_id": doc["_id"], "status": "pending"}, update)
+        return "failed"
+    return "requeue"
+
+
+# -----------------------------
+# Extractor versions
+# -----------------------------
+def outdated(model, version, limit=100):
+    """
+    Completed records produced by an extractor older than ``version``
+    (or before versioning). Served by the status/extractor_version index.
+    """
+    cursor = model._get_collection().find(
+        {"status": "completed", "$or": [
+            {"extractor_version": {"$lt": version}},
+            {"extractor_version": None},
+        ]},
+        {"filename": 1},
+    ).limit(limit)
+    return [doc["filename"] for doc in cursor]
+
+
+def mark_stale(model, filenames, version, bucket):
+    """
+    Make completed, outdated records claimable again so the handler can
+    re-run them from ``bucket``. The existing result stays readable until
+    the new one replaces it, and is kept if the re-run fails (see fail).
+    Returns the filenames actually marked.
+    """
+    coll = model._get_collection()
+    coll.update_many(
+        {"filename": {"$in": filenames}, "status": "completed", "$or": [
+            {"extractor_version": {"$lt": version}},
+            {"extractor_version": None},
+        ]},
+        {"$set": {"status": "stale", "source_bucket": bucket}},
+    )
+    return [d["filename"] for d in coll.find(
+        {"filename": {"$in": filenames}, "status": "stale", "source_bucket": bucket}, {"filename": 1})]
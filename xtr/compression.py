@@ -0,0 +1,169 @@
+# xtr/compression.py
+
+import os
+import time
+import threading
+from datetime import datetime, timezone
+
+from bson.binary import Binary
+from mongoengine import StringField
+from mongoengine.connection import get_db
+
+# -----------------------------
+# Environment
+# -----------------------------
+# New content is stored compressed when on; compressed and plain values are
+# always readable, so this can be switched either way at any time.
+ENABLED = os.getenv("XTR_COMPRESS_CONTENT", "1") == "1"
+LEVEL = int(os.getenv("XTR_CONTENT_ZSTD_LEVEL", "3"))
+# Below this many bytes the frame overhead isn't worth it
+MIN_BYTES = int(os.getenv("XTR_COMPRESS_MIN_BYTES", "256"))
+# How often a process looks for a newly trained dictionary
+DICT_REFRESH_SECONDS = 300
+
+# BSON binary subtype for "zstd frame of UTF-8 text" (128+ is user-defined)
+BINARY_SUBTYPE = 0x80
+DICT_COLLECTION = "compression_dict"
+
+_lock = threading.Lock()
+_dicts_by_id = {}
+_latest = {}  # file_type -> (checked_at, zstd dict or None)
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def _require_zstd():
+    zstandard = _zstd()
+    if zstandard is None:
+        raise RuntimeError("Missing dependency 'zstandard'. Install with `pip install zstandard`.")
+    return zstandard
+
+
+def is_compressed(value):
+    return isinstance(value, Binary) and value.subtype == BINARY_SUBTYPE
+
+
+# -----------------------------
+# Dictionaries (one family per file type, trained by `manage.py compress_content --train`)
+# -----------------------------
+def _dict_by_id(dict_id):
+    with _lock:
+        if dict_id in _dicts_by_id:
+            return _dicts_by_id[dict_id]
+    doc = get_db()[DICT_COLLECTION].find_one({"dict_id": dict_id})
+    if doc is None:
+        raise LookupError(f"Compression dictionary {dict_id} not found")
+    zdict = _require_zstd().ZstdCompressionDict(bytes(doc["data"]))
+    with _lock:
+        _dicts_by_id[dict_id] = zdict
+    return zdict
+
+
+def latest_dict(file_type):
+    """The newest dictionary trained for ``file_type`` (cached per process), or None."""
+    now = time.monotonic()
+    with _lock:
+        cached = _latest.get(file_type)
+        if cached and now - cached[0] < DICT_REFRESH_SECONDS:
+            return cached[1]
+    doc = get_db()[DICT_COLLECTION].find_one({"file_type": file_type}, sort=[("created_at", -1)])
+    zdict = _dict_by_id(doc["dict_id"]) if doc else None
+    with _lock:
+        _latest[file_type] = (now, zdict)
+    return zdict
+
+
+def train(file_type, samples, dict_size=112 * 1024):
+    """Train and store a dictionary for ``file_type`` from sample texts. Returns its id."""
+    zstandard = _require_zstd()
+    zdict = zstandard.train_dictionary(dict_size, [s.encode("utf-8") for s in samples], level=LEVEL)
+    dict_id = zdict.dict_id()
+    get_db()[DICT_COLLECTION].update_one(
+        {"dict_id": dict_id},
+        {"$setOnInsert": {
+            "dict_id": dict_id,
+            "file_type": file_type,
+            "data": Binary(zdict.as_bytes()),
+            "samples": len(samples),
+            "created_at": datetime.now(timezone.utc),
+        }},
+        upsert=True,
+    )
+    with _lock:
+        _dicts_by_id[dict_id] = zdict
+        _latest.pop(file_type, None)
+    return dict_id
+
+
+# -----------------------------
+# Encode / decode
+# -----------------------------
+def encode(file_type, text):
+    """
+    Compress ``text`` for storage (BSON binary, zstd with the file type's
+    dictionary when one exists). Returns the text unchanged when
+    compression is off, unavailable or not worth it.
+    """
+    if not ENABLED or not isinstance(text, str) or len(text) < MIN_BYTES:
+        return text
+    zstandard = _zstd()
+    if zstandard is None:
+        return text
+    zdict = latest_dict(file_type) if file_type else None
+    compressor = zstandard.ZstdCompressor(level=LEVEL, dict_data=zdict) if zdict else \
+        zstandard.ZstdCompressor(level=LEVEL)
+    return Binary(compressor.compress(text.encode("utf-8")), BINARY_SUBTYPE)
+
+
+def decode(value):
+    """Text of a stored value, compressed or not. The frame names its dictionary."""
+    if value is None or isinstance(value, str):
+        return value
+    zstandard = _require_zstd()
+    data = bytes(value)
+    dict_id = zstandard.get_frame_parameters(data).dict_id
+    decompressor = zstandard.ZstdDecompressor(dict_data=_dict_by_id(dict_id)) if dict_id else \
+        zstandard.ZstdDecompressor()
+    return decompressor.decompress(data).decode("utf-8")
+
+
+class CompressedStringField(StringField):
+    """
+    StringField stored zstd-compressed. Values are compressed on save and
+    decoded on first attribute access, so documents loaded only for their
+    status or metadata never pay for decompression. Plain strings written
+    before compression was enabled still load as they are.
+    """
+
+    def __init__(self, file_type=None, **kwargs):
+        self.file_type = file_type
+        super().__init__(**kwargs)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance._data.get(self.name)
+        if is_compressed(value):
+            value = decode(value)
+            # Cache the decoded text without marking the field as changed
+            instance._data[self.name] = value
+        return value
+
+    def to_python(self, value):
+        if is_compressed(value):
+            return value
+        return super().to_python(value)
+
+    def to_mongo(self, value):
+        return encode(self.file_type, value)
+
+    def validate(self, value):
+        if is_compressed(value):
+            return
+        super().validate(value)
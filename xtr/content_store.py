@@ -0,0 +1,136 @@
+# xtr/content_store.py
+
+import io
+import os
+import gzip
+import hashlib
+import logging
+
+from . import compression
+from .registry import MB
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+# Extracted content above this size goes to RESULTS_BUCKET; Mongo keeps a pointer
+OFFLOAD_BYTES = int(float(os.getenv("XTR_CONTENT_OFFLOAD_MB", "1")) * MB)
+RESULTS_BUCKET = os.getenv("MINIO_RESULTS_BUCKET", "results")
+ZSTD_LEVEL = int(os.getenv("XTR_CONTENT_ZSTD_LEVEL", "3"))
+
+_bucket_ready = False
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def compress(data):
+    """zstd when the 'zstandard' package is installed, gzip otherwise. Returns (encoding, bytes)."""
+    zstandard = _zstd()
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "gzip", gzip.compress(data, compresslevel=6)
+
+
+def decompress(encoding, data):
+    if encoding == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("Missing dependency 'zstandard'. Install with `pip install zstandard`.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unknown content encoding: {encoding}")
+
+
+def _client():
+    from .minio_client import get_minio_client
+    global _bucket_ready
+    client = get_minio_client()
+    if not _bucket_ready:
+        if not client.bucket_exists(RESULTS_BUCKET):
+            client.make_bucket(RESULTS_BUCKET)
+        _bucket_ready = True
+    return client
+
+
+def offload(file_type, text):
+    """
+    Write ``text`` compressed to the results bucket and return the pointer
+    stored in Mongo. Objects are content-addressed, so identical output
+    from different files is stored once.
+    """
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    encoding, payload = compress(data)
+    key = f"{file_type}/{digest[:2]}/{digest}.{encoding}"
+    _client().put_object(
+        RESULTS_BUCKET, key, io.BytesIO(payload), len(payload),
+        content_type="text/plain; charset=utf-8",
+        metadata={"content-encoding": encoding},
+    )
+    logger.info("📤 Offloaded %s content: %.1f MB → %.1f MB (%s)",
+                file_type, len(data) / MB, len(payload) / MB, key)
+    return {
+        "bucket": RESULTS_BUCKET,
+        "key": key,
+        "encoding": encoding,
+        "size": len(data),
+        "stored_size": len(payload),
+        "sha256": digest,
+    }
+
+
+def load(ref):
+    """Fetch, decompress and verify offloaded content."""
+    response = _client().get_object(ref["bucket"], ref["key"])
+    try:
+        payload = response.read()
+    finally:
+        response.close()
+        response.release_conn()
+    data = decompress(ref["encoding"], payload)
+    if hashlib.sha256(data).hexdigest() != ref["sha256"]:
+        raise ValueError(f"Offloaded content {ref['key']} does not match its digest")
+    return data.decode("utf-8")
+
+
+def prepare(file_type, fields):
+    """
+    Swap large ``content`` in a result for a pointer before it's written:
+    content becomes "" and content_ref holds bucket/key/size/digest.
+    Small content is stored inline (compressed, see xtr/compression.py)
+    and clears any previous pointer.
+    """
+    content = fields.get("content")
+    if not isinstance(content, str):
+        return fields
+    if len(content) * 4 < OFFLOAD_BYTES or len(content.encode("utf-8")) <= OFFLOAD_BYTES:
+        fields["content_ref"] = None
+        fields["content"] = compression.encode(file_type, content)
+        return fields
+    fields["content_ref"] = offload(file_type, content)
+    fields["content"] = ""
+    return fields
+
+
+def read_content(doc):
+    """
+    Full content of a record, wherever it lives. Works on documents loaded
+    with the default projection (which leaves ``content`` out).
+    """
+    ref = getattr(doc, "content_ref", None)
+    if ref:
+        return load(ref)
+    if getattr(doc, "content", None):
+        return doc.content
+    raw = type(doc)._get_collection().find_one({"_id": doc.pk}, {"content": 1, "content_ref": 1}) or {}
+    if raw.get("content_ref"):
+        return load(raw["content_ref"])
+    return compression.decode(raw.get("content")) or ""
@@ -0,0 +1,3 @@
+# xtr/extractors: format-specific text extractors used by the process_* tasks.
+# Each works on a seekable file object and keeps memory bounded by streaming
+# the package parts instead of building a full document model.
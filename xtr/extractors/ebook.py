@@ -0,0 +1,155 @@
+# xtr/extractors/ebook.py
+#
+# EPUB text extraction straight from the zip: the OPF spine gives the
+# chapter order, and each chapter's XHTML is streamed with lxml.iterparse
+# (recovering from the malformed markup common in real books). One line per
+# block element (paragraph, heading, list item, ...), one per table row with
+# cells tab-separated, chapters separated by a blank line. Each block is
+# cleared once emitted, so memory is bounded by the current chapter's
+# open elements rather than a soup of the whole book.
+
+import zipfile
+import posixpath
+
+from lxml import etree
+
+CONTAINER = "META-INF/container.xml"
+CONTAINER_NS = "{urn:oasis:names:tc:opendocument:xmlns:container}"
+OPF_NS = "{http://www.idpf.org/2007/opf}"
+XHTML_NS = "{http://www.w3.org/1999/xhtml}"
+
+BLOCKS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "dt", "dd", "blockquote",
+          "pre", "figcaption", "caption", "address", "div", "section", "article", "aside"}
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+CELLS = {"td", "th"}
+IGNORED = {"head", "script", "style", "nav"}
+DOCUMENT_TYPES = {"application/xhtml+xml", "text/html"}
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1].lower() if isinstance(tag, str) else ""
+
+
+def _clean(text):
+    return " ".join(text.split())
+
+
+def _text(elem):
+    """Flattened text of a finished element; <br> counts as a space."""
+    for node in elem.iter():
+        if _local(node.tag) == "br":
+            node.text = " "
+    return "".join(elem.itertext())
+
+
+def _leading_text(block, elem):
+    """Text of ``block`` before its descendant ``elem``, removed from the tree."""
+    path = [elem]
+    while path[-1].getparent() is not block:
+        if path[-1].getparent() is None:
+            # Markup recovery can reparent elements: leave the text to the block itself
+            return ""
+        path.append(path[-1].getparent())
+    parts = []
+    container = block
+    for child in reversed(path):
+        parts.append(container.text or "")
+        container.text = None
+        while child.getprevious() is not None:
+            sibling = child.getprevious()
+            parts.append(_text(sibling) + (sibling.tail or ""))
+            container.remove(sibling)
+        container = child
+    return _clean("".join(parts))
+
+
+def spine(zf):
+    """Chapter part names in reading order (OPF spine, linear items first as listed)."""
+    with zf.open(CONTAINER) as f:
+        rootfile = etree.parse(f).getroot().find(f".//{CONTAINER_NS}rootfile")
+    opf_path = rootfile.get("full-path")
+    folder = posixpath.dirname(opf_path)
+    with zf.open(opf_path) as f:
+        opf = etree.parse(f).getroot()
+    manifest = {
+        item.get("id"): (posixpath.normpath(posixpath.join(folder, item.get("href"))), item.get("media-type"))
+        for item in opf.iter(OPF_NS + "item")
+    }
+    parts = []
+    for ref in opf.iter(OPF_NS + "itemref"):
+        href, media_type = manifest.get(ref.get("idref"), (None, None))
+        if href and media_type in DOCUMENT_TYPES:
+            parts.append(href)
+    return parts
+
+
+def iter_chapter(stream):
+    """Yield (kind, line) for one XHTML chapter: kind is "heading", "text" or "table"."""
+    cell_depth = 0
+    ignored_depth = 0
+    blocks = []  # open block elements outside tables
+    for event, elem in etree.iterparse(stream, events=("start", "end"), recover=True, huge_tree=True):
+        name = _local(elem.tag)
+        if event == "start":
+            if name in CELLS:
+                cell_depth += 1
+            elif name in IGNORED:
+                ignored_depth += 1
+            elif name in BLOCKS and not cell_depth and not ignored_depth:
+                # "<li>Item<ul><li>..." : the outer item's text comes before the nested ones
+                if blocks:
+                    text = _leading_text(blocks[-1], elem)
+                    if text:
+                        yield "text", text
+                blocks.append(elem)
+            continue
+
+        if name in IGNORED:
+            ignored_depth -= 1
+            elem.clear(keep_tail=True)
+        elif ignored_depth:
+            continue
+        elif name in CELLS:
+            cell_depth -= 1
+        elif name == "tr":
+            row = [_clean(_text(cell)) for cell in elem if _local(cell.tag) in CELLS]
+            if any(row):
+                yield "table", "\t".join(row)
+            elem.clear(keep_tail=True)
+        elif name in BLOCKS and not cell_depth:
+            blocks.pop()
+            text = _clean(_text(elem)) if name != "pre" else _text(elem).strip("\n")
+            if text:
+                yield ("heading" if name in HEADINGS else "text"), text
+            # keep_tail: text after the block still belongs to its parent
+            elem.clear(keep_tail=True)
+        elif name == "body" and not cell_depth:
+            # Loose text directly under <body>
+            text = _clean(_text(elem))
+            if text:
+                yield "text", text
+
+
+def iter_epub(fileobj):
+    """Yield (chapter number, kind, line) in reading order."""
+    with zipfile.ZipFile(fileobj) as zf:
+        names = set(zf.namelist())
+        for number, part in enumerate((p for p in spine(zf) if p in names), start=1):
+            with zf.open(part) as stream:
+                for kind, line in iter_chapter(stream):
+                    yield number, kind, line
+
+
+def extract_epub(fileobj):
+    """(text, meta): chapters separated by a blank line; meta counts chapters and headings."""
+    out = []
+    chapters, headings = set(), 0
+    current = None
+    for chapter, kind, line in iter_epub(fileobj):
+        if current is not None and chapter != current:
+            out.append("")
+        current = chapter
+        chapters.add(chapter)
+        headings += kind == "heading"
+        out.append(line)
+    return "\n".join(out), {"chapters": len(chapters), "headings": headings}
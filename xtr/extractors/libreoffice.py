@@ -0,0 +1,303 @@
+# xtr/extractors/libreoffice.py
+#
+# Legacy Office formats (.doc, .rtf, .ppt, ...) are converted to their OOXML
+# equivalents by a node-wide pool of resident headless LibreOffice instances,
+# then read by the regular extractors. Instance i listens on a local socket
+# (BASE_PORT + i) with its own user profile and is driven over UNO, so no
+# conversion pays soffice's seconds of startup. A task takes an instance by
+# flock()ing its slot file before it claims its file (acquire); when every
+# instance is busy the task is re-queued rather than holding a worker
+# process while it waits, and a crashed worker releases its slot
+# automatically.
+#
+# Instances are started on first use and outlive the worker that started
+# them, so they are started with the worker's memory limits from before any
+# task capped them (xtr/resources.py). A conversion that runs past TIMEOUT
+# kills its instance; the next job on that slot starts a fresh one. Without
+# the UNO bindings (python3-uno) the pool falls back to one
+# `soffice --convert-to` per file, still one per slot.
+
+import os
+import sys
+import time
+import fcntl
+import signal
+import socket
+import resource
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+
+from xtr.scheduling import requeue
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+SOFFICE_BIN = os.getenv("LIBREOFFICE_BIN", "soffice")
+POOL_SIZE = int(os.getenv("XTR_SOFFICE_POOL", "2"))
+BASE_PORT = int(os.getenv("XTR_SOFFICE_PORT", "2002"))
+POOL_DIR = os.getenv("XTR_SOFFICE_DIR", "/tmp/xtr-soffice")
+# Per-conversion limit, and when a task finding every instance busy runs again
+TIMEOUT = int(os.getenv("XTR_SOFFICE_TIMEOUT", "120"))
+RETRY_SECONDS = int(os.getenv("XTR_SOFFICE_RETRY_SECONDS", "30"))
+STARTUP_SECONDS = 60
+# Where the distribution's python3-uno lives, for virtualenvs that don't see it
+UNO_PATH = os.getenv("XTR_UNO_PATH", "/usr/lib/python3/dist-packages")
+
+# target extension → LibreOffice export filter
+FILTERS = {
+    "docx": "MS Word 2007 XML",
+    "pptx": "Impress MS PowerPoint 2007 XML",
+    "xlsx": "Calc MS Excel 2007 XML",
+}
+
+
+class ConverterError(RuntimeError):
+    pass
+
+
+class ConverterBusy(ConverterError):
+    """Every instance is in use (convert() called without a slot from acquire())."""
+
+
+class ConversionTimeout(ConverterError):
+    pass
+
+
+def _uno():
+    try:
+        import uno
+        return uno
+    except ImportError:
+        pass
+    if os.path.exists(os.path.join(UNO_PATH, "uno.py")) and UNO_PATH not in sys.path:
+        # Appended, so packages from the virtualenv still win
+        sys.path.append(UNO_PATH)
+        try:
+            import uno
+            return uno
+        except ImportError:
+            pass
+    return None
+
+
+# RLIMIT_DATA of the worker before any task ran (this module is imported at
+# worker start): TaskUsage lowers the soft limit for the length of a task,
+# and soffice would otherwise inherit that cap for its whole life
+_BASE_DATA_LIMIT = resource.getrlimit(resource.RLIMIT_DATA)
+
+
+@contextmanager
+def _pre_task_limits():
+    """Run the body (spawning soffice) with the worker's uncapped memory limit."""
+    current = resource.getrlimit(resource.RLIMIT_DATA)
+    try:
+        resource.setrlimit(resource.RLIMIT_DATA, _BASE_DATA_LIMIT)
+    except (ValueError, OSError) as e:
+        logger.warning("[SOFFICE] ⚠️ Could not lift the task memory cap for soffice: %s", e)
+    try:
+        yield
+    finally:
+        try:
+            resource.setrlimit(resource.RLIMIT_DATA, current)
+        except (ValueError, OSError) as e:
+            logger.warning("[SOFFICE] ⚠️ Could not restore the task memory cap: %s", e)
+
+
+# -----------------------------
+# Pool slots
+# -----------------------------
+class _Slot:
+    def __init__(self, index, fh):
+        self.index = index
+        self.fh = fh
+        self.port = BASE_PORT + index
+        self.profile = f"file://{POOL_DIR}/profile-{index}"
+        self.pid_file = os.path.join(POOL_DIR, f"instance-{index}.pid")
+
+    def listening(self):
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def start(self):
+        """Start this slot's resident instance unless one is already listening."""
+        if self.listening():
+            return
+        with _pre_task_limits():
+            proc = subprocess.Popen(
+                [SOFFICE_BIN, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+                 f"-env:UserInstallation={self.profile}",
+                 f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                # Own process group: survives this worker, and kill() takes soffice.bin with it
+                start_new_session=True,
+            )
+        with open(self.pid_file, "w") as f:
+            f.write(str(proc.pid))
+        deadline = time.monotonic() + STARTUP_SECONDS
+        while not self.listening():
+            if proc.poll() is not None or time.monotonic() > deadline:
+                self.kill()
+                raise ConverterError(f"LibreOffice instance {self.index} did not start on port {self.port}")
+            time.sleep(0.25)
+        logger.info("[SOFFICE] 🚀 Started instance %s on port %s (pid %s)", self.index, self.port, proc.pid)
+
+    def kill(self):
+        try:
+            with open(self.pid_file) as f:
+                pid = int(f.read().strip())
+            os.killpg(pid, signal.SIGKILL)
+            logger.warning("[SOFFICE] 🔪 Killed instance %s (pid %s)", self.index, pid)
+        except (OSError, ValueError):
+            pass
+        try:
+            os.remove(self.pid_file)
+        except OSError:
+            pass
+
+
+def _free_slot():
+    """Lock the first free slot, or None when every instance is in use."""
+    os.makedirs(POOL_DIR, exist_ok=True)
+    for i in range(POOL_SIZE):
+        fh = open(os.path.join(POOL_DIR, f"slot-{i}.lock"), "w")
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return _Slot(i, fh)
+        except BlockingIOError:
+            fh.close()
+    return None
+
+
+def acquire(task):
+    """
+    Take a pool instance for ``task`` before it claims its file. When all
+    POOL_SIZE are busy the task is re-queued in RETRY_SECONDS
+    (scheduling.requeue, no retry spent). Pass the slot to convert() or
+    converted(), and hand it to release() when the task ends.
+    """
+    slot = _free_slot()
+    if slot is None:
+        logger.info("[SOFFICE] ⏳ All %s LibreOffice instances busy, re-queueing", POOL_SIZE)
+        requeue(task, RETRY_SECONDS)
+    return slot
+
+
+def release(slot):
+    if slot is None:
+        return
+    try:
+        fcntl.flock(slot.fh, fcntl.LOCK_UN)
+    finally:
+        slot.fh.close()
+
+
+# -----------------------------
+# Conversion
+# -----------------------------
+def _uno_convert(uno, port, src, dst, filter_name):
+    from com.sun.star.beans import PropertyValue
+
+    def prop(name, value):
+        p = PropertyValue()
+        p.Name, p.Value = name, value
+        return p
+
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+    ctx = resolver.resolve(f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext")
+    desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+    doc = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(src), "_blank", 0, (prop("Hidden", True), prop("ReadOnly", True)))
+    if doc is None:
+        raise ConverterError(f"LibreOffice could not open {os.path.basename(src)}")
+    try:
+        doc.storeToURL(uno.systemPathToFileUrl(dst), (prop("FilterName", filter_name),))
+    finally:
+        doc.close(True)
+
+
+def _run_with_timeout(slot, fn, *args):
+    outcome = {}
+
+    def target():
+        try:
+            fn(*args)
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=target, name=f"soffice-{slot.index}", daemon=True)
+    worker.start()
+    worker.join(TIMEOUT)
+    if worker.is_alive():
+        # The blocked UNO call fails once its instance is gone
+        slot.kill()
+        raise ConversionTimeout(f"Conversion exceeded {TIMEOUT}s")
+    if "error" in outcome:
+        raise outcome["error"]
+
+
+def _oneshot_convert(slot, src, fmt, filter_name):
+    try:
+        with _pre_task_limits():
+            subprocess.run(
+                [SOFFICE_BIN, "--headless", "--norestore", f"-env:UserInstallation={slot.profile}",
+                 "--convert-to", f"{fmt}:{filter_name}", "--outdir", os.path.dirname(src), src],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                timeout=TIMEOUT, check=True,
+            )
+    except subprocess.TimeoutExpired:
+        raise ConversionTimeout(f"Conversion exceeded {TIMEOUT}s")
+    except subprocess.CalledProcessError as e:
+        raise ConverterError(f"soffice failed: {e.stderr.decode(errors='ignore').strip()}")
+
+
+def convert(src, fmt, slot=None):
+    """
+    Convert the file at ``src`` to ``fmt`` ("docx", "pptx", "xlsx") next to
+    it and return the new path; the caller removes it. Uses ``slot`` from
+    acquire(); without one it takes a free instance or raises ConverterBusy.
+    """
+    filter_name = FILTERS[fmt]
+    dst = os.path.splitext(src)[0] + "." + fmt
+    if os.path.abspath(dst) == os.path.abspath(src):
+        raise ConverterError(f"{os.path.basename(src)} is already {fmt}")
+    own = slot is None
+    if own:
+        slot = _free_slot()
+        if slot is None:
+            raise ConverterBusy(f"All {POOL_SIZE} LibreOffice instances busy")
+    uno = _uno()
+    started = time.perf_counter()
+    try:
+        if uno is None:
+            _oneshot_convert(slot, src, fmt, filter_name)
+        else:
+            slot.start()
+            _run_with_timeout(slot, _uno_convert, uno, slot.port, src, dst, filter_name)
+    finally:
+        if own:
+            release(slot)
+    if not os.path.exists(dst):
+        raise ConverterError(f"LibreOffice produced no {fmt} for {os.path.basename(src)}")
+    logger.info("[SOFFICE] ✅ %s → %s in %.2fs", os.path.basename(src), fmt, time.perf_counter() - started)
+    return dst
+
+
+@contextmanager
+def converted(src, fmt, slot=None):
+    """convert() as a context manager that removes the converted file afterwards."""
+    dst = convert(src, fmt, slot)
+    try:
+        yield dst
+    finally:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
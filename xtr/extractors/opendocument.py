@@ -0,0 +1,134 @@
+# xtr/extractors/opendocument.py
+#
+# ODT text extraction by streaming content.xml out of the zip with
+# lxml.iterparse, instead of building odfpy's DOM of the whole document.
+# One line per paragraph or heading, one per table row with cells
+# tab-separated; a heading starts a new section after a blank line. Spaces,
+# tabs and line breaks encoded as <text:s c="n"/>, <text:tab/> and
+# <text:line-break/> are restored, text in footnotes and frames nested in a
+# paragraph follows that paragraph, and tracked deletions and comments are
+# left out. Each paragraph and row is cleared once read.
+
+import re
+import zipfile
+
+from lxml import etree
+
+TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+TABLE = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+OFFICE = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
+
+P, H = TEXT + "p", TEXT + "h"
+S, TAB, LINE_BREAK = TEXT + "s", TEXT + "tab", TEXT + "line-break"
+TR, TC = TABLE + "table-row", TABLE + "table-cell"
+
+PARAGRAPHS = {P, H}
+# Subtrees that are not document text: deleted revisions, comments, and the
+# footnote number (the note body itself is kept)
+IGNORED = {TEXT + "tracked-changes", OFFICE + "annotation", TEXT + "note-citation"}
+
+_SPACES = re.compile(r"[ \t\r\n]+")
+
+
+def _flatten(elem, out):
+    """Text of a paragraph with ODF's whitespace elements restored; nested paragraphs skipped."""
+    if elem.text:
+        out.append(_SPACES.sub(" ", elem.text))
+    for child in elem:
+        tag = child.tag
+        if tag == S:
+            out.append(" " * int(child.get(TEXT + "c", "1")))
+        elif tag == TAB:
+            out.append("\t")
+        elif tag == LINE_BREAK:
+            out.append("\n")
+        elif tag not in PARAGRAPHS and tag not in IGNORED:
+            _flatten(child, out)
+        if child.tail:
+            out.append(_SPACES.sub(" ", child.tail))
+    return out
+
+
+def iter_content(stream):
+    """Yield (kind, line) for content.xml: kind is "heading", "text" or "table"."""
+    open_paragraphs = 0
+    cells = []     # paragraphs of the open table cells
+    rows = []      # cells of the open table rows
+    nested = []    # lines of paragraphs nested in the open one (notes, frames)
+    ignored_depth = 0
+
+    for event, elem in etree.iterparse(stream, events=("start", "end"), huge_tree=True):
+        tag = elem.tag
+        if event == "start":
+            if tag in IGNORED:
+                ignored_depth += 1
+            elif ignored_depth:
+                continue
+            elif tag in PARAGRAPHS:
+                open_paragraphs += 1
+            elif tag == TC:
+                cells.append([])
+            elif tag == TR:
+                rows.append([])
+            continue
+
+        if tag in IGNORED:
+            ignored_depth -= 1
+            continue
+        if ignored_depth:
+            continue
+
+        if tag in PARAGRAPHS:
+            open_paragraphs -= 1
+            text = "".join(_flatten(elem, [])).strip()
+            kind = "heading" if tag == H else "text"
+            if cells:
+                if text:
+                    cells[-1].append(text)
+            elif open_paragraphs:
+                # Its paragraph is still being read: keep the tail for it
+                if text:
+                    nested.append((kind, text))
+                elem.clear(keep_tail=True)
+                continue
+            else:
+                if text:
+                    yield kind, text
+                yield from nested
+                nested.clear()
+        elif tag == TC:
+            text = " ".join(cells.pop())
+            if rows:
+                rows[-1].append(text)
+        elif tag == TR:
+            row = rows.pop()
+            if any(row):
+                line = "\t".join(row).rstrip("\t")
+                if cells:
+                    # Row of a nested table: part of the outer cell's text
+                    cells[-1].append(line)
+                else:
+                    yield "table", line
+        else:
+            continue
+
+        # Same clearing as xtr/extractors/word.py: the finished block and its
+        # earlier siblings go, so the tree holds little more than the open block
+        elem.clear()
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+def extract_odt(fileobj):
+    """(text, meta): headings open a new blank-line-separated section; meta counts lines by kind."""
+    out = []
+    counts = {"paragraphs": 0, "headings": 0, "table_rows": 0}
+    with zipfile.ZipFile(fileobj) as zf, zf.open("content.xml") as stream:
+        for kind, line in iter_content(stream):
+            if kind == "heading" and out:
+                out.append("")
+            counts[{"heading": "headings", "text": "paragraphs", "table": "table_rows"}[kind]] += 1
+            out.append(line)
+    return "\n".join(out), counts
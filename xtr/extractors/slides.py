@@ -0,0 +1,175 @@
+# xtr/extractors/slides.py
+#
+# PPTX text extraction in one pass over the package: slides in presentation
+# order, each slide's XML streamed with lxml.iterparse, speaker notes read
+# from the slide's notesSlide part. Text inside group shapes and table cells
+# is included (one line per table row, cells tab-separated); slide numbers,
+# dates and footers are left out. Memory is bounded by one slide at a time.
+
+import zipfile
+import posixpath
+
+from lxml import etree
+
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+PML = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+SP, PH, SLD = PML + "sp", PML + "ph", PML + "sld"
+P, T, BR = A + "p", A + "t", A + "br"
+TBL, TR, TC = A + "tbl", A + "tr", A + "tc"
+
+TAGS = (SLD, SP, PH, P, T, BR, TBL, TR, TC)
+CLEARABLE = {P, TR, TBL, SP}
+
+TITLE_PLACEHOLDERS = {"title", "ctrTitle"}
+# Placeholder text that repeats on every slide rather than describing it
+SKIPPED_PLACEHOLDERS = {"sldNum", "dt", "ftr", "hdr", "sldImg"}
+
+
+def _rels(zf, part):
+    """{rId: (type, absolute part name)} for one part's relationships."""
+    folder, name = posixpath.split(part)
+    rels = {}
+    try:
+        f = zf.open(posixpath.join(folder, "_rels", name + ".rels"))
+    except KeyError:
+        return rels
+    with f:
+        for rel in etree.parse(f).getroot().iter(RELS + "Relationship"):
+            target = rel.get("Target")
+            if rel.get("TargetMode") == "External":
+                continue
+            path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+            rels[rel.get("Id")] = (rel.get("Type", "").rsplit("/", 1)[-1], path)
+    return rels
+
+
+def slide_parts(zf):
+    """Slide part names in presentation order (p:sldIdLst)."""
+    rels = _rels(zf, "ppt/presentation.xml")
+    with zf.open("ppt/presentation.xml") as f:
+        root = etree.parse(f).getroot()
+    ids = root.find(PML + "sldIdLst")
+    return [rels[s.get(R + "id")][1] for s in (ids if ids is not None else ()) if s.get(R + "id") in rels]
+
+
+def iter_shapes_text(stream):
+    """
+    Yield (placeholder type or None, line) for one slide or notes part:
+    one line per paragraph, one per table row. Group shapes are walked like
+    any other container since their text sits in nested p:sp elements.
+    """
+    shapes = []      # placeholder type of the open p:sp elements
+    paragraphs = []
+    cells = []
+    rows = []
+    hidden = False
+
+    for event, elem in etree.iterparse(stream, events=("start", "end"), tag=TAGS, huge_tree=True):
+        tag = elem.tag
+        if event == "start":
+            if tag == SLD:
+                hidden = elem.get("show") == "0"
+            elif tag == SP:
+                shapes.append(None)
+            elif tag == P:
+                paragraphs.append([])
+            elif tag == TC:
+                cells.append([])
+            elif tag == TR:
+                rows.append([])
+            continue
+
+        if tag == PH:
+            if shapes:
+                shapes[-1] = elem.get("type", "body")
+        elif tag == T:
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == BR:
+            if paragraphs:
+                paragraphs[-1].append("\n")
+        elif tag == P:
+            text = "".join(paragraphs.pop()).strip()
+            if text:
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    yield (shapes[-1] if shapes else None), text
+        elif tag == TC:
+            text = " ".join(cells.pop())
+            if rows:
+                rows[-1].append(text)
+        elif tag == TR:
+            row = rows.pop()
+            if any(row):
+                line = "\t".join(row)
+                if cells:
+                    cells[-1].append(line)
+                else:
+                    yield "table", line
+        elif tag == SP:
+            shapes.pop()
+        elif tag == SLD and hidden:
+            yield "hidden", ""
+
+        if tag in CLEARABLE:
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+def iter_slides(fileobj):
+    """
+    Yield one record per slide: {"slide", "title", "text", "notes",
+    "table_rows", "hidden"}. ``text`` holds the body lines (tables included),
+    ``notes`` the speaker notes.
+    """
+    with zipfile.ZipFile(fileobj) as zf:
+        for number, part in enumerate(slide_parts(zf), start=1):
+            title, body, notes = [], [], []
+            table_rows = 0
+            hidden = False
+            with zf.open(part) as stream:
+                for role, line in iter_shapes_text(stream):
+                    if role == "hidden":
+                        hidden = True
+                    elif role in TITLE_PLACEHOLDERS:
+                        title.append(line)
+                    elif role in SKIPPED_PLACEHOLDERS:
+                        continue
+                    else:
+                        table_rows += role == "table"
+                        body.append(line)
+            for kind, notes_part in _rels(zf, part).values():
+                if kind == "notesSlide":
+                    with zf.open(notes_part) as stream:
+                        # The notes page also carries a slide image and number: keep the body only
+                        notes.extend(line for role, line in iter_shapes_text(stream) if role == "body")
+            yield {
+                "slide": number,
+                "title": " ".join(title),
+                "text": "\n".join(body),
+                "notes": "\n".join(notes),
+                "table_rows": table_rows,
+                "hidden": hidden,
+            }
+
+
+def format_slide(record):
+    lines = [f"[Slide {record['slide']}] {record['title']}".rstrip()]
+    if record["text"]:
+        lines.append(record["text"])
+    if record["notes"]:
+        lines.append("Notes: " + record["notes"])
+    return "\n".join(lines)
+
+
+def extract_pptx(fileobj):
+    """(text, slide records): slides separated by blank lines, notes after each slide's body."""
+    records = list(iter_slides(fileobj))
+    return "\n\n".join(format_slide(r) for r in records), records
@@ -0,0 +1,157 @@
+# xtr/extractors/word.py
+#
+# DOCX text extraction by streaming the WordprocessingML parts out of the zip
+# with lxml.iterparse. Unlike python-docx's Document(...).paragraphs it keeps
+# tables (one line per row, cells tab-separated), headers, footers, footnotes,
+# endnotes and text boxes, and memory stays flat: each paragraph, row and
+# table is cleared as soon as its text has been taken. Deleted revisions
+# (w:delText) are left out, and of an mc:AlternateContent block only the
+# mc:Choice is read, since its mc:Fallback repeats the same text.
+
+import re
+import zipfile
+
+from lxml import etree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+P, T, TAB, BR, CR = W + "p", W + "t", W + "tab", W + "br", W + "cr"
+TBL, TR, TC = W + "tbl", W + "tr", W + "tc"
+NOTE_TAGS = (W + "footnote", W + "endnote")
+FALLBACK = MC + "Fallback"
+
+TAGS = (P, T, TAB, BR, CR, TBL, TR, TC, FALLBACK, *NOTE_TAGS)
+# Elements freed as soon as they end
+CLEARABLE = {P, TBL, TR, *NOTE_TAGS}
+
+
+def _numbered(zf, kind):
+    names = [n for n in zf.namelist() if re.fullmatch(rf"word/{kind}\d*\.xml", n)]
+    return sorted(names, key=lambda n: int(re.sub(r"\D", "", n) or 0))
+
+
+def iter_part(stream):
+    """
+    Yield the text lines of one WordprocessingML part in document order:
+    one per non-empty paragraph and one per table row. Text in nested tables
+    and text boxes folds into the enclosing cell, or follows the paragraph
+    that anchors the text box on lines of its own.
+    """
+    paragraphs = []  # text pieces of the open paragraphs (text boxes nest them)
+    cells = []       # paragraphs of the open table cells
+    rows = []        # cells of the open table rows
+    boxed = []       # text box lines waiting for their anchoring paragraph
+    fallback_depth = 0
+
+    for event, elem in etree.iterparse(stream, events=("start", "end"), tag=TAGS, huge_tree=True):
+        tag = elem.tag
+        if tag == FALLBACK:
+            fallback_depth += 1 if event == "start" else -1
+            continue
+        if fallback_depth:
+            continue
+        if event == "start":
+            if tag == P:
+                paragraphs.append([])
+            elif tag == TC:
+                cells.append([])
+            elif tag == TR:
+                rows.append([])
+            continue
+
+        if tag == T:
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == TAB:
+            if paragraphs:
+                paragraphs[-1].append("\t")
+        elif tag in (BR, CR):
+            if paragraphs:
+                paragraphs[-1].append("\n")
+        elif tag == P:
+            text = "".join(paragraphs.pop()).strip()
+            if cells:
+                if text:
+                    cells[-1].append(text)
+            elif paragraphs:
+                # Text box paragraph: its anchor is still open
+                if text:
+                    boxed.append(text)
+            else:
+                if text:
+                    yield text
+                yield from boxed
+                boxed.clear()
+        elif tag == TC:
+            text = " ".join(cells.pop())
+            if rows:
+                rows[-1].append(text)
+        elif tag == TR:
+            row = rows.pop()
+            if any(row):
+                line = "\t".join(row)
+                if cells:
+                    # Row of a nested table: part of the outer cell's text
+                    cells[-1].append(line)
+                else:
+                    yield line
+
+        # Text of a finished block has been taken: drop it and its (also
+        # finished) earlier siblings so the tree never holds more than the
+        # block being read
+        if tag in CLEARABLE:
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+def iter_docx(fileobj):
+    """
+    Yield (part, line) for a .docx: headers, body, footnotes, endnotes,
+    footers. Headers and footers repeated across sections are yielded once.
+    """
+    with zipfile.ZipFile(fileobj) as zf:
+        names = set(zf.namelist())
+        seen = set()
+
+        def _once(part, name):
+            with zf.open(name) as stream:
+                lines = list(iter_part(stream))
+            key = "\n".join(lines)
+            if key and key not in seen:
+                seen.add(key)
+                for line in lines:
+                    yield part, line
+
+        for name in _numbered(zf, "header"):
+            yield from _once("header", name)
+        with zf.open("word/document.xml") as stream:
+            for line in iter_part(stream):
+                yield "body", line
+        for part, name in (("footnote", "word/footnotes.xml"), ("endnote", "word/endnotes.xml")):
+            if name in names:
+                with zf.open(name) as stream:
+                    for line in iter_part(stream):
+                        yield part, line
+        for name in _numbered(zf, "footer"):
+            yield from _once("footer", name)
+
+
+def extract_docx(fileobj):
+    """
+    Plain text of a .docx plus per-part line counts. Parts are separated by
+    a blank line; the body comes first after any header text.
+    """
+    out = []
+    counts = {}
+    previous = None
+    for part, line in iter_docx(fileobj):
+        if previous is not None and part != previous:
+            out.append("")
+        previous = part
+        counts[part] = counts.get(part, 0) + 1
+        out.append(line)
+    return "\n".join(out), counts
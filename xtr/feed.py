@@ -0,0 +1,137 @@
+# xtr/feed.py
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+# "File processed" events go to a Redis stream (the broker's Redis by default).
+# Mongo change streams would need a replica set, which the deployment doesn't run.
+ENABLED = os.getenv("XTR_FEED", "1") == "1"
+REDIS_URL = os.getenv("XTR_FEED_REDIS_URL") or os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+STREAM = os.getenv("XTR_FEED_STREAM", "xtr:processed")
+# Approximate cap on retained events; consumers further behind than this miss some
+MAX_EVENTS = int(os.getenv("XTR_FEED_MAX_EVENTS", "100000"))
+BLOCK_MS = 15000
+# Each open /events/ stream holds a request thread (runserver) for up to
+# STREAM_SECONDS; past MAX_STREAMS per web process new streams get a 503
+MAX_STREAMS = int(os.getenv("XTR_FEED_MAX_STREAMS", "16"))
+STREAM_SECONDS = int(os.getenv("XTR_FEED_STREAM_SECONDS", "300"))
+
+# Redis stream ids: <milliseconds>-<sequence>
+STREAM_ID = re.compile(r"\d+-\d+")
+
+_streams = threading.BoundedSemaphore(MAX_STREAMS)
+
+_client = None
+_client_pid = None
+
+
+def _redis():
+    global _client, _client_pid
+    # Connections don't survive fork(): one client per worker process
+    if _client is None or _client_pid != os.getpid():
+        import redis
+        _client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        _client_pid = os.getpid()
+    return _client
+
+
+def event(file_type, filename, status, fields):
+    """Compact event for one finished file: no content, only its pointer."""
+    return {
+        "type": file_type,
+        "filename": filename,
+        "status": status,
+        "meta_data": fields.get("meta_data") or {},
+        "content_ref": fields.get("content_ref"),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def publish(events):
+    """
+    Append events to the stream. Called once their results are written, so
+    a consumer reacting to an event finds the record updated. Best effort:
+    a Redis outage is logged and never fails the task.
+    """
+    if not ENABLED or not events:
+        return
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for e in events:
+            pipe.xadd(STREAM, {"event": json.dumps(e, default=str)}, maxlen=MAX_EVENTS, approximate=True)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("[FEED] ⚠️ Could not publish %s events: %s", len(events), e)
+
+
+def read(last_id="$", count=100, block_ms=BLOCK_MS):
+    """
+    Events after ``last_id`` ("$": only new ones), waiting up to
+    ``block_ms`` for the first. Returns [(stream_id, event), ...].
+    """
+    reply = _redis().xread({STREAM: last_id}, count=count, block=block_ms) or []
+    return [(sid, json.loads(data["event"])) for _, entries in reply for sid, data in entries]
+
+
+def sse(last_id="$", types=None, max_seconds=300):
+    """
+    Server-sent-events body: one ``processed`` event per finished file,
+    with the stream id as the SSE id so EventSource resumes via
+    Last-Event-ID. Comments keep idle connections open; the response ends
+    after ``max_seconds`` and the client reconnects where it left off.
+    """
+    deadline = time.monotonic() + max_seconds
+    if last_id == "$":
+        # Pin "now" to a real id so nothing published between reads is skipped
+        latest = _redis().xrevrange(STREAM, count=1)
+        last_id = latest[0][0] if latest else "0-0"
+    yield "retry: 1000\n\n"
+    while time.monotonic() < deadline:
+        entries = read(last_id)
+        if not entries:
+            yield ": keepalive\n\n"
+            continue
+        for sid, e in entries:
+            last_id = sid
+            if types and e.get("type") not in types:
+                continue
+            yield f"id: {sid}\nevent: processed\ndata: {json.dumps(e)}\n\n"
+
+
+def valid_id(last_id):
+    return last_id == "$" or bool(STREAM_ID.fullmatch(last_id))
+
+
+class _Stream:
+    """An sse() body that holds one of MAX_STREAMS slots until the response is closed."""
+
+    def __init__(self, body):
+        self._body = body
+        self._open = True
+
+    def __iter__(self):
+        return self._body
+
+    def close(self):
+        # Django closes the response when the request ends, streamed to the end or not
+        if self._open:
+            self._open = False
+            self._body.close()
+            _streams.release()
+
+
+def open_stream(last_id="$", types=None):
+    """sse() body for one client, or None when MAX_STREAMS are already open in this process."""
+    if not _streams.acquire(blocking=False):
+        return None
+    return _Stream(sse(last_id, types, STREAM_SECONDS))
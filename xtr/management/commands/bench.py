@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the processing pipeline on a synthetic corpus against local "
+        "stand-ins (moto S3 + mongomock by default). Reports throughput, "
+        "p50/p99 latency and peak RSS per file type. The 'download' suite "
+        "compares single-stream and parallel ranged downloads of one large object; "
+        "the 'extract' suite compares text extractors on one large document per format."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("suite", nargs="?", default="pipeline", choices=["pipeline", "download", "extract"])
+        parser.add_argument("--types", default="", help="Comma-separated file types (default: all)")
+        parser.add_argument("--sizes", default="small,medium", help="Any of small,medium,large")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per file in the handler benchmark")
+        parser.add_argument("--seed", type=int, default=1234)
+        parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "xtr-bench-corpus"))
+        parser.add_argument("--s3-endpoint", default=None, help="host:port of a local MinIO (default: moto)")
+        parser.add_argument("--mongo-uri", default=None, help="Local mongod URI (default: mongomock)")
+        parser.add_argument("--no-dispatch", action="store_true", help="Skip the full dispatch run")
+        parser.add_argument("--output", default=None, help="Also write the report to this file")
+        # download suite
+        parser.add_argument("--download-mb", type=int, default=256, help="Object size for the download suite")
+        parser.add_argument("--part-mb", default="8,16,32", help="Comma-separated part sizes (MB)")
+        parser.add_argument("--streams", default="2,4,8", help="Comma-separated parallel stream counts")
+        # extract suite
+        parser.add_argument("--formats", default="", help="Comma-separated formats for the extract suite (default: all)")
+        parser.add_argument("--extract-scale", type=int, default=100,
+                            help="Document size for the extract suite (per unit: docx 20 clauses, pptx 3 slides, "
+                                 "epub 2 chapters, odt 20 sections)")
+
+    def handle(self, *args, **options):
+        handler = getattr(self, f"bench_{options['suite']}")
+        report = handler(options)
+        self.stdout.write(report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+
+    def bench_pipeline(self, options):
+        from xtr.bench import corpus as corpus_mod, runner, standins
+
+        types = [t for t in options["types"].split(",") if t] or None
+        sizes = [s for s in options["sizes"].split(",") if s]
+        unknown = set(sizes) - set(corpus_mod.SCALES)
+        if unknown:
+            raise CommandError(f"Unknown sizes: {', '.join(sorted(unknown))}")
+
+        corpus = corpus_mod.build_corpus(options["corpus_dir"], types, sizes, options["seed"])
+        if not corpus:
+            raise CommandError("Empty corpus: nothing to benchmark")
+        self.stdout.write(f"📦 Corpus: {len(corpus)} files in {options['corpus_dir']}")
+
+        with standins.local_s3(options["s3_endpoint"]) as endpoint:
+            results = runner.run_handlers(endpoint, corpus, options["mongo_uri"], options["repeat"])
+            if not options["no_dispatch"]:
+                results.append(runner.run_dispatch(endpoint, corpus, options["mongo_uri"]))
+        return runner.format_report(results)
+
+    def bench_download(self, options):
+        from xtr.bench import download, standins
+
+        try:
+            part_sizes = [int(p) for p in options["part_mb"].split(",") if p]
+            streams = [int(c) for c in options["streams"].split(",") if c]
+        except ValueError as e:
+            raise CommandError(f"--part-mb and --streams take comma-separated integers: {e}")
+
+        payload = download.make_payload(options["corpus_dir"], options["download_mb"], options["seed"])
+        with standins.local_s3(options["s3_endpoint"]) as endpoint:
+            size, rows = download.run(endpoint, payload, part_sizes, streams, options["repeat"])
+        return download.format_report(size, rows)
+
+    def bench_extract(self, options):
+        from xtr.bench import extract
+
+        formats = [f for f in options["formats"].split(",") if f] or None
+        unknown = set(formats or ()) - set(extract.FORMATS)
+        if unknown:
+            raise CommandError(f"Unknown formats: {', '.join(sorted(unknown))}")
+        rows = extract.run(options["corpus_dir"], formats, options["extract_scale"], options["repeat"], options["seed"])
+        return extract.format_report(rows)
@@ -0,0 +1,101 @@
+from bson.binary import Binary
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import UpdateOne
+
+from xtr import compression
+from xtr.registry import MB, get_handler, registered_types
+
+
+class Command(BaseCommand):
+    help = ("Train per-type zstd dictionaries and compress the content already stored "
+            "in the ingest collections (or --decompress to undo).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--types", nargs="+", default=None, help="File types (default: all with content)")
+        parser.add_argument("--train", action="store_true", help="Train a new dictionary per type first")
+        parser.add_argument("--samples", type=int, default=2000, help="Records sampled per dictionary")
+        parser.add_argument("--dict-kb", type=int, default=112, help="Dictionary size")
+        parser.add_argument("--batch", type=int, default=500, help="Records per bulk write")
+        parser.add_argument("--decompress", action="store_true", help="Rewrite compressed content as plain text")
+        parser.add_argument("--dry-run", action="store_true", help="Report savings without writing")
+
+    def handle(self, *args, **options):
+        import xtr.tasks  # noqa: F401  (registers the handlers)
+
+        if compression._zstd() is None:
+            raise CommandError("Missing dependency 'zstandard'. Install with `pip install zstandard`.")
+        if not compression.ENABLED and not options["decompress"]:
+            raise CommandError("XTR_COMPRESS_CONTENT is off; enable it before migrating")
+
+        types = options["types"] or registered_types()
+        for file_type in types:
+            handler = get_handler(file_type)
+            if handler is None:
+                raise CommandError(f"Unknown file type '{file_type}'")
+            if "content" not in handler.model._fields:
+                continue
+            coll = handler.model._get_collection()
+            if options["decompress"]:
+                self._decompress(file_type, coll, options)
+                continue
+            if options["train"]:
+                self._train(file_type, coll, options)
+            self._compress(file_type, coll, options)
+
+    def _train(self, file_type, coll, options):
+        samples = [d["content"] for d in coll.aggregate([
+            {"$match": {"content": {"$type": "string"}}},
+            {"$match": {"$expr": {"$gte": [{"$strLenBytes": "$content"}, compression.MIN_BYTES]}}},
+            {"$sample": {"size": options["samples"]}},
+            {"$project": {"content": 1}},
+        ])]
+        if len(samples) < 10:
+            self.stdout.write(f"⏭️ {file_type}: only {len(samples)} plain samples, no dictionary trained")
+            return
+        if options["dry_run"]:
+            self.stdout.write(f"🧪 {file_type}: would train on {len(samples)} samples")
+            return
+        dict_id = compression.train(file_type, samples, options["dict_kb"] * 1024)
+        self.stdout.write(f"📚 {file_type}: dictionary {dict_id} trained on {len(samples)} samples")
+
+    def _compress(self, file_type, coll, options):
+        before = after = records = 0
+        ops = []
+        cursor = coll.find({"content": {"$type": "string"}}, {"content": 1}, batch_size=options["batch"])
+        for doc in cursor:
+            text = doc["content"]
+            encoded = compression.encode(file_type, text)
+            if not isinstance(encoded, Binary):
+                continue
+            records += 1
+            before += len(text.encode("utf-8"))
+            after += len(encoded)
+            # Only replace the text we read: a task may have rewritten it since
+            ops.append(UpdateOne({"_id": doc["_id"], "content": text}, {"$set": {"content": encoded}}))
+            if len(ops) >= options["batch"]:
+                self._write(coll, ops, options)
+        self._write(coll, ops, options)
+        ratio = before / after if after else 0
+        self.stdout.write(f"🗜️ {file_type}: {records} records, {before / MB:.1f} MB → {after / MB:.1f} MB "
+                          f"({ratio:.1f}×){' [dry run]' if options['dry_run'] else ''}")
+
+    def _decompress(self, file_type, coll, options):
+        records = 0
+        ops = []
+        query = {"content": {"$type": "binData"}}
+        for doc in coll.find(query, {"content": 1}, batch_size=options["batch"]):
+            if not compression.is_compressed(doc["content"]):
+                continue
+            records += 1
+            ops.append(UpdateOne({"_id": doc["_id"], "content": doc["content"]},
+                                 {"$set": {"content": compression.decode(doc["content"])}}))
+            if len(ops) >= options["batch"]:
+                self._write(coll, ops, options)
+        self._write(coll, ops, options)
+        self.stdout.write(f"📄 {file_type}: {records} records decompressed"
+                          f"{' [dry run]' if options['dry_run'] else ''}")
+
+    def _write(self, coll, ops, options):
+        if ops and not options["dry_run"]:
+            coll.bulk_write(ops, ordered=False)
+        ops.clear()
@@ -0,0 +1,82 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from xtr.claims import outdated, mark_stale
+from xtr.registry import get_handler, registered_types
+
+
+class Command(BaseCommand):
+    help = ("Re-run completed records whose extractor version is below their handler's "
+            "current version, from the archive bucket, in throttled batches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--types", nargs="+", default=None, help="File types (default: all)")
+        parser.add_argument("--bucket", default=os.getenv("MINIO_ARCHIVE_BUCKET", "archive"),
+                            help="Bucket holding the processed originals")
+        parser.add_argument("--batch", type=int, default=50, help="Files queued per batch")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many files per type")
+        parser.add_argument("--wait", type=int, default=600,
+                            help="Seconds to wait for a batch to finish before queueing the next")
+        parser.add_argument("--pause", type=float, default=0, help="Extra seconds between batches")
+        parser.add_argument("--dry-run", action="store_true", help="Only count outdated records")
+
+    def handle(self, *args, **options):
+        from xtr.tasks import minio_client
+        from xtr.scheduling import plan_dispatch
+
+        for file_type in options["types"] or registered_types():
+            handler = get_handler(file_type)
+            if handler is None:
+                raise CommandError(f"Unknown file type '{file_type}'")
+            model, version = handler.model, handler.version
+
+            if options["dry_run"]:
+                count = model._get_collection().count_documents({"status": "completed", "$or": [
+                    {"extractor_version": {"$lt": version}}, {"extractor_version": None}]})
+                self.stdout.write(f"🧪 {file_type}: {count} records below v{version}")
+                continue
+
+            queued = 0
+            missing = set()
+            while options["limit"] is None or queued < options["limit"]:
+                size = options["batch"] if options["limit"] is None else min(options["batch"], options["limit"] - queued)
+                # Files whose original is gone stay completed; skip past them
+                candidates = [f for f in outdated(model, version, size + len(missing)) if f not in missing][:size]
+                if not candidates:
+                    break
+                present = {}
+                for fname in candidates:
+                    try:
+                        present[fname] = minio_client.stat_object(options["bucket"], fname).size
+                    except Exception:
+                        missing.add(fname)
+                        self.stderr.write(f"⚠️ {file_type}/{fname}: not in '{options['bucket']}', skipped")
+                if not present:
+                    continue
+
+                batch = mark_stale(model, list(present), version, options["bucket"])
+                for fname in batch:
+                    handler.task.apply_async(args=(options["bucket"], fname),
+                                             **plan_dispatch(handler, present[fname]))
+                queued += len(batch)
+                self.stdout.write(f"♻️ {file_type}: queued {len(batch)} (total {queued}) for v{version}")
+                self._wait(model, batch, options["wait"])
+                if options["pause"]:
+                    time.sleep(options["pause"])
+
+            if missing:
+                self.stdout.write(f"⏭️ {file_type}: {len(missing)} outdated records have no original")
+            self.stdout.write(f"✅ {file_type}: {queued} records re-queued for v{version}")
+
+    def _wait(self, model, filenames, timeout):
+        """Throttle: hold the next batch until this one has left stale/processing."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            busy = model._get_collection().count_documents(
+                {"filename": {"$in": filenames}, "status": {"$in": ["stale", "processing"]}})
+            if not busy:
+                return
+            time.sleep(5)
+        self.stderr.write(f"⚠️ Batch still running after {timeout}s, continuing")
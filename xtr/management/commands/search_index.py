@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import UpdateOne
+
+from xtr import compression, content_store, search
+from xtr.models import SearchEntry
+from xtr.registry import get_handler, registered_types
+
+
+class Command(BaseCommand):
+    help = ("Index the content of completed records for /search/. New results are indexed "
+            "as tasks complete; this covers records processed before that, or a rebuild.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--types", nargs="+", default=None, help="File types (default: all with content)")
+        parser.add_argument("--batch", type=int, default=200, help="Records per bulk write")
+        parser.add_argument("--rebuild", action="store_true", help="Drop existing entries of these types first")
+
+    def handle(self, *args, **options):
+        import xtr.tasks  # noqa: F401  (registers the handlers)
+
+        index = SearchEntry._get_collection()
+        for file_type in options["types"] or registered_types():
+            handler = get_handler(file_type)
+            if handler is None:
+                raise CommandError(f"Unknown file type '{file_type}'")
+            if "content" not in handler.model._fields:
+                continue
+            if options["rebuild"]:
+                index.delete_many({"file_type": file_type})
+
+            indexed = 0
+            ops = []
+            cursor = handler.model._get_collection().find(
+                {"status": "completed"}, {"filename": 1, "content": 1, "content_ref": 1},
+                batch_size=options["batch"],
+            )
+            for doc in cursor:
+                try:
+                    text = content_store.load(doc["content_ref"]) if doc.get("content_ref") \
+                        else compression.decode(doc.get("content"))
+                except Exception as e:
+                    self.stderr.write(f"⚠️ {file_type}/{doc['filename']}: {e}")
+                    continue
+                if not text or not text.strip():
+                    continue
+                filter_, update = search.entry_update(file_type, doc["filename"], text)
+                ops.append(UpdateOne(filter_, update, upsert=True))
+                indexed += 1
+                if len(ops) >= options["batch"]:
+                    index.bulk_write(ops, ordered=False)
+                    ops = []
+            if ops:
+                index.bulk_write(ops, ordered=False)
+            self.stdout.write(f"🔎 {file_type}: {indexed} records indexed")
@@ -0,0 +1,39 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from xtr import tracing
+
+
+class Command(BaseCommand):
+    help = "Show the per-stage timing of a file's traces, slowest stage first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("filename", help="Object name as stored in MinIO")
+        parser.add_argument("--trace-file", default=None, help="Defaults to XTR_TRACE_FILE")
+
+    def handle(self, *args, **options):
+        path = options["trace_file"] or tracing.TRACE_FILE
+        if not path:
+            raise CommandError("No trace file: set XTR_TRACE_FILE or pass --trace-file")
+
+        filename = options["filename"]
+        spans = list(tracing.read_spans(path))
+        trace_ids = {s["traceId"] for s in spans if s["attributes"].get("file") == filename}
+        if not trace_ids:
+            raise CommandError(f"No spans recorded for '{filename}'")
+
+        by_trace = defaultdict(list)
+        for s in spans:
+            if s["traceId"] in trace_ids:
+                by_trace[s["traceId"]].append(s)
+
+        for trace_id, trace_spans in by_trace.items():
+            start = min(int(s["startTimeUnixNano"]) for s in trace_spans)
+            end = max(int(s["endTimeUnixNano"]) for s in trace_spans)
+            self.stdout.write(f"🔎 Trace {trace_id}: {(end - start) / 1e9:.3f}s end-to-end")
+            trace_spans.sort(key=lambda s: int(s["startTimeUnixNano"]) - int(s["endTimeUnixNano"]))
+            for s in trace_spans:
+                seconds = (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e9
+                failed = " ❌" if s.get("status", {}).get("code") == 2 else ""
+                self.stdout.write(f"   {seconds:10.3f}s  {s['name']}{failed}")
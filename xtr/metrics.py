@@ -0,0 +1,151 @@
+# xtr/metrics.py
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest,
+    start_http_server, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from xtr.registry import file_type_for_model
+from xtr.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+# Celery prefork children and Django each run in their own process. With
+# PROMETHEUS_MULTIPROC_DIR set (the same directory for web and workers on a
+# host), every process writes its samples there and any scrape aggregates them.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+WORKER_METRICS_PORT = int(os.getenv("XTR_WORKER_METRICS_PORT", "0"))
+QUEUES = os.getenv("XTR_METRICS_QUEUES", "celery,media,media_large").split(",")
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# -----------------------------
+# Metrics
+# -----------------------------
+FILES_PROCESSED = Counter(
+    "xtr_files_processed_total", "Files processed successfully", ["type"])
+FILES_FAILED = Counter(
+    "xtr_files_failed_total", "Files whose processing failed", ["type"])
+FILES_TOO_LARGE = Counter(
+    "xtr_files_too_large_total", "Files rejected or stopped for exceeding a size or memory limit", ["type"])
+BYTES_PROCESSED = Counter(
+    "xtr_bytes_processed_total", "Bytes downloaded from MinIO for processing", ["type"])
+STAGE_SECONDS = Histogram(
+    "xtr_stage_seconds", "Time spent per pipeline stage (download, parse, transcribe, mongo_write, ...)",
+    ["type", "stage"], buckets=STAGE_BUCKETS)
+MODEL_LOAD_SECONDS = Histogram(
+    "xtr_model_load_seconds", "Time to load the Faster-Whisper model", ["model"],
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300))
+MODEL_WARMUP_SECONDS = Histogram(
+    "xtr_model_warmup_seconds", "Time of the warm-up inference after loading the model", ["model"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60))
+TRANSCRIPT_CACHE = Counter(
+    "xtr_transcript_cache_total", "Whisper transcript cache lookups", ["result"])
+
+
+@contextmanager
+def stage(file_type, name):
+    """
+    Time one pipeline stage: ``with stage("pdf", "download"): ...``.
+    Also recorded as a tracing span under the file's current trace.
+    """
+    start = time.perf_counter()
+    try:
+        with span(name, type=file_type):
+            yield
+    finally:
+        STAGE_SECONDS.labels(file_type, name).observe(time.perf_counter() - start)
+
+
+def record_result(model, status):
+    file_type = file_type_for_model(model)
+    if status == "completed":
+        FILES_PROCESSED.labels(file_type).inc()
+    elif status == "failed":
+        FILES_FAILED.labels(file_type).inc()
+    elif status == "too_large":
+        FILES_TOO_LARGE.labels(file_type).inc()
+
+
+def record_bytes(file_type, size):
+    if size:
+        BYTES_PROCESSED.labels(file_type).inc(size)
+
+
+# -----------------------------
+# Queue depth (read from the broker at scrape time)
+# -----------------------------
+class QueueDepthCollector:
+    """Reports the length of each Celery queue, summed over its priority lists."""
+
+    def describe(self):
+        yield GaugeMetricFamily("xtr_queue_depth", "Messages waiting in each Celery queue", labels=["queue"])
+
+    def collect(self):
+        from django.conf import settings
+        import redis
+
+        gauge = GaugeMetricFamily("xtr_queue_depth", "Messages waiting in each Celery queue", labels=["queue"])
+        try:
+            client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+            sep = settings.CELERY_BROKER_TRANSPORT_OPTIONS.get("sep", ":")
+            steps = settings.CELERY_BROKER_TRANSPORT_OPTIONS.get("priority_steps", [0])
+            for queue in QUEUES:
+                # Kombu keeps priority 0 in "<queue>" and N in "<queue><sep>N"
+                names = [queue if p == 0 else f"{queue}{sep}{p}" for p in steps]
+                pipe = client.pipeline()
+                for name in names:
+                    pipe.llen(name)
+                gauge.add_metric([queue], sum(pipe.execute()))
+        except Exception as e:
+            logger.warning("⚠️ Could not read queue depth from broker: %s", e)
+        yield gauge
+
+
+_SCRAPE_REGISTRY = None
+
+def scrape_registry():
+    """Registry to expose: all processes' samples plus live queue depth."""
+    global _SCRAPE_REGISTRY
+    if _SCRAPE_REGISTRY is None:
+        if MULTIPROC_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        registry.register(QueueDepthCollector())
+        _SCRAPE_REGISTRY = registry
+    return _SCRAPE_REGISTRY
+
+
+def render():
+    return generate_latest(scrape_registry())
+
+
+# -----------------------------
+# Worker exporter
+# -----------------------------
+def start_worker_exporter():
+    """
+    Serve /metrics from the Celery main process when XTR_WORKER_METRICS_PORT
+    is set. Task samples are recorded in the prefork children, so this needs
+    PROMETHEUS_MULTIPROC_DIR to show anything but queue depth.
+    """
+    if not WORKER_METRICS_PORT:
+        return
+    start_http_server(WORKER_METRICS_PORT, registry=scrape_registry())
+    logger.info("📈 Worker metrics on :%s", WORKER_METRICS_PORT)
+
+
+def mark_process_dead(pid):
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
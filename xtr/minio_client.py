@@ -4,6 +4,9 @@ import os
 import logging
 from minio import Minio
 from minio.commonconfig import CopySource
+from minio.error import S3Error
+
+from xtr.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -50,12 +53,23 @@ def list_objects(bucket_name, recursive=True):
     return client.list_objects(bucket_name, recursive=recursive)
 
 
+def object_exists(bucket_name, object_name):
+    try:
+        get_minio_client().stat_object(bucket_name, object_name)
+        return True
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return False
+        raise
+
+
 def move_object(source_bucket: str, object_name: str, dest_bucket: str) -> bool:
     try:
         client = get_minio_client()
         src = CopySource(source_bucket, object_name)
-        client.copy_object(dest_bucket, object_name, src)
-        client.remove_object(source_bucket, object_name)
+        with span("move_object", source=source_bucket, dest=dest_bucket):
+            client.copy_object(dest_bucket, object_name, src)
+            client.remove_object(source_bucket, object_name)
         logger.info("📦 Moved %s: %s → %s", object_name, source_bucket, dest_bucket)
         return True
     except Exception as e:
@@ -2,12 +2,55 @@ from mongoengine import *
 from datetime import datetime, timezone
 from mongoengine import Document, StringField, IntField, DictField, DateTimeField
 
+from .compression import CompressedStringField
+
+# ------------------------
+# Processing claim (see xtr/claims.py)
+# ------------------------
+class ClaimedFile(Document):
+    """Lease fields shared by every ingest collection."""
+    claimed_by = StringField(max_length=255)
+    lease_expires_at = DateTimeField()
+    reap_count = IntField(default=0)
+    # CPU / wall time / memory used by the task that finished the record (xtr/resources.py)
+    resources = DictField()
+    # Large extractions live in the results bucket: bucket/key/encoding/size/sha256
+    # (xtr/content_store.py). Use content_store.read_content(doc) to get the text.
+    # Inline content is zstd-compressed with a per-type dictionary (xtr/compression.py).
+    content_ref = DictField(null=True)
+    # FileHandler.version of the extractor that produced the result (missing: before versioning)
+    extractor_version = IntField()
+    # Set while a record is re-run from another bucket (see claims.mark_stale)
+    source_bucket = StringField(max_length=255)
+    meta = {
+        'abstract': True,
+        'indexes': [
+            # Used by the stuck-job reaper: status == "processing" AND lease_expires_at < now
+            ('status', 'lease_expires_at'),
+            # Keyset pages of the read API (xtr/records.py), with and without a status filter
+            ('created_at', '_id'),
+            ('status', 'created_at', '_id'),
+            # Backfill: completed records below the handler's current extractor version
+            ('status', 'extractor_version'),
+        ],
+    }
+
+    @queryset_manager
+    def objects(doc_cls, queryset):
+        # Listings and lookups never drag the (possibly multi-MB) content along
+        return queryset.exclude('content') if 'content' in doc_cls._fields else queryset
+
+    @queryset_manager
+    def with_content(doc_cls, queryset):
+        return queryset
+
+
 # ------------------------
 # Audio, Video, Document Files
 # ------------------------
-class VideoFile(Document):
+class VideoFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="video")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
@@ -15,57 +58,57 @@ class VideoFile(Document):
         'collection': 'video_file'  # Custom collection name
     }
 
-class AudioFile(Document):
+class AudioFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="audio")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
 
 
-class DocumentFile(Document):
+class DocumentFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="document")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
 
 
-class HtmlFile(Document):
+class HtmlFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="html")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
 
 
-class JsonFile(Document):
+class JsonFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="json")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
 
 
-class XmlFile(Document):
+class XmlFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="xml")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
 
 
-class LogFile(Document):
+class LogFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="log")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
 
 
-class PPTFile(Document):
+class PPTFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="presentation")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
@@ -73,25 +116,41 @@ class PPTFile(Document):
         'collection': 'ppt_file'  # Custom collection name
     }
 
-class SpreadsheetFile(Document):
+class SpreadsheetFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="spreadsheet")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
 
 
-class ArchiveFile(Document):
+class ArchiveFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="archive")
     status = StringField(max_length=50, default='pending')
     meta_data = DictField()
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
 
 
-class YamlFile(Document):
+class PPTSlide(Document):
+    """One slide of a processed presentation (see xtr/extractors/slides.py)."""
+    filename = StringField(max_length=255, required=True)
+    slide = IntField(required=True)
+    title = StringField()
+    text = StringField()
+    notes = StringField()
+    table_rows = IntField(default=0)
+    hidden = BooleanField(default=False)
+    created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
+    meta = {
+        'collection': 'ppt_slide',
+        'indexes': [{'fields': ('filename', 'slide'), 'unique': True}],
+    }
+
+
+class YamlFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
-    content = StringField()
+    content = CompressedStringField(file_type="yaml")
     status = StringField(max_length=50, default='pending')
     created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
     meta_data = DictField() 
@@ -102,7 +161,7 @@ class YamlFile(Document):
 
 
 
-class ImageFile(Document):
+class ImageFile(ClaimedFile):
     filename = StringField(max_length=255, unique=True, required=True)
     file_path = StringField(max_length=1024)
     file_size = IntField()
@@ -132,3 +191,50 @@ class ImageFile(Document):
         self.updated_at = datetime.utcnow()
         self.save()
 
+
+
+# ------------------------
+# Whisper transcription cache (see xtr/transcripts.py)
+# ------------------------
+class TranscriptCache(Document):
+    # sha256(content) + transcription profile + model size + compute type + language hint
+    key = StringField(max_length=255, unique=True, required=True)
+    fingerprint = StringField(max_length=64, required=True)
+    profile = StringField(max_length=50)
+    model = StringField(max_length=50)
+    compute_type = StringField(max_length=50)
+    language = StringField(max_length=20)
+    detected_language = StringField(max_length=20)
+    duration = FloatField()
+    segments = ListField(DictField())
+    size_bytes = IntField(default=0)
+    hits = IntField(default=0)
+    created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
+    last_used_at = DateTimeField(default=lambda: datetime.now(timezone.utc))
+    meta = {
+        'collection': 'transcript_cache',
+        # Eviction drops the least recently used entries first
+        'indexes': ['last_used_at', 'fingerprint'],
+    }
+
+
+# ------------------------
+# Full-text search over extracted content (see xtr/search.py)
+# ------------------------
+class SearchEntry(Document):
+    file_type = StringField(max_length=50, required=True)
+    filename = StringField(max_length=255, required=True)
+    # Leading XTR_SEARCH_MAX_CHARS of the extracted text, kept plain for the text index
+    text = StringField()
+    size = IntField(default=0)
+    created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), required=True)
+    updated_at = DateTimeField(default=lambda: datetime.now(timezone.utc))
+    meta = {
+        'collection': 'search_index',
+        'indexes': [
+            {'fields': ('file_type', 'filename'), 'unique': True},
+            # Matches in the filename rank above matches in the body
+            {'fields': ['$filename', '$text'], 'default_language': 'english',
+             'weights': {'filename': 5, 'text': 1}},
+        ],
+    }
@@ -0,0 +1,117 @@
+# xtr/records.py
+
+import json
+import base64
+import hashlib
+from datetime import datetime
+
+from bson import ObjectId
+
+from xtr import compression
+from xtr.registry import get_handler
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+# Always returned: they identify the record and form the page cursor
+KEY_FIELDS = ("_id", "filename", "created_at")
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def model_for(file_type):
+    handler = get_handler(file_type)
+    if handler is None:
+        raise LookupError(f"Unknown file type '{file_type}'")
+    return handler.model
+
+
+def encode_cursor(doc):
+    raw = json.dumps([doc["created_at"].isoformat(), str(doc["_id"])])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, oid = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), ObjectId(oid)
+    except Exception:
+        raise BadRequest("Invalid cursor")
+
+
+def projection(model, fields=None):
+    """
+    Mongo projection for ``fields`` (validated against the model). By
+    default everything except ``content``, which must be asked for.
+    """
+    if not fields:
+        return {"content": 0} if "content" in model._fields else None
+    unknown = [f for f in fields if f not in model._fields]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}")
+    proj = {f: 1 for f in KEY_FIELDS}
+    proj.update({model._fields[f].db_field: 1 for f in fields})
+    if "content" in fields:
+        # Offloaded content is returned as its pointer
+        proj["content_ref"] = 1
+    return proj
+
+
+def page(model, status=None, after=None, limit=DEFAULT_LIMIT, fields=None):
+    """
+    One page of records in (created_at, _id) order. ``after`` is the
+    cursor of the previous page: the next page starts right after it, an
+    index range scan rather than skip/limit. Returns (docs, next_cursor).
+    """
+    limit = min(max(limit, 1), MAX_LIMIT)
+    filter_ = {}
+    if status:
+        filter_["status"] = {"$in": status}
+    if after:
+        created_at, oid = decode_cursor(after)
+        filter_["$or"] = [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "_id": {"$gt": oid}},
+        ]
+    docs = list(
+        model._get_collection()
+        .find(filter_, projection(model, fields))
+        .sort([("created_at", 1), ("_id", 1)])
+        .limit(limit + 1)
+    )
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return [serialize(d) for d in docs[:limit]], next_cursor
+
+
+def get(model, filename, fields=None):
+    doc = model._get_collection().find_one({"filename": filename}, projection(model, fields or None))
+    return serialize(doc) if doc else None
+
+
+def serialize(doc):
+    """JSON-ready copy of a raw document: ids and dates as strings, content decoded."""
+    out = {}
+    for key, value in doc.items():
+        if key == "content":
+            value = compression.decode(value)
+        out["id" if key == "_id" else key] = _plain(value)
+    return out
+
+
+def _plain(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def etag(payload):
+    """Strong ETag of a response body: identical pages answer 304 to If-None-Match."""
+    return '"%s"' % hashlib.sha1(payload).hexdigest()
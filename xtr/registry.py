@@ -0,0 +1,87 @@
+# xtr/registry.py
+
+import logging
+
+from xtr.utils import register_extensions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = "celery"
+MEDIA_QUEUE = "media"
+
+MB = 1024 * 1024
+
+
+# -----------------------------
+# Handler spec
+# -----------------------------
+class FileHandler:
+    """
+    Everything the dispatcher needs to know about one file type:
+    the Mongo model used for the "already processed" check, the Celery
+    task that processes it, the queue it is routed to, an optional size
+    limit, an optional per-task memory cap (see xtr.resources), a rough
+    cost model (seconds = base_cost + cost_per_mb * MB) and the extractor
+    version stamped on its results. Bump ``version`` when a change to the
+    handler should reach records it has already processed
+    (`manage.py reprocess_outdated`).
+    """
+
+    def __init__(self, file_type, model, task, queue=DEFAULT_QUEUE,
+                 max_size=None, memory_limit=None, base_cost=0.1, cost_per_mb=0.05, version=1):
+        self.file_type = file_type
+        self.model = model
+        self.task = task
+        self.queue = queue
+        self.max_size = max_size
+        self.memory_limit = memory_limit
+        self.base_cost = base_cost
+        self.cost_per_mb = cost_per_mb
+        self.version = version
+
+    def estimate_cost(self, size=None):
+        if not size:
+            return self.base_cost
+        return self.base_cost + self.cost_per_mb * (size / MB)
+
+    def accepts_size(self, size=None):
+        return size is None or self.max_size is None or size <= self.max_size
+
+    def __repr__(self):
+        return f"<FileHandler {self.file_type} v{self.version} → {self.task.name} ({self.queue})>"
+
+
+# -----------------------------
+# Registry
+# -----------------------------
+_HANDLERS = {}
+_TYPES_BY_MODEL = {}
+
+
+def register_handler(file_type, model, task, extensions=(), **options):
+    """
+    Register (or replace) the handler for ``file_type``.
+    ``extensions`` are added to the lookup table used by detect_file_type.
+    """
+    handler = FileHandler(file_type, model, task, **options)
+    _HANDLERS[file_type] = handler
+    _TYPES_BY_MODEL[model] = file_type
+    register_extensions(file_type, extensions)
+    logger.debug("Registered %r", handler)
+    return handler
+
+
+def get_handler(file_type):
+    return _HANDLERS.get(file_type)
+
+
+def registered_types():
+    return list(_HANDLERS)
+
+
+def file_type_for_model(model):
+    return _TYPES_BY_MODEL.get(model, model.__name__.lower())
+
+
+def handler_for_model(model):
+    return _HANDLERS.get(_TYPES_BY_MODEL.get(model))
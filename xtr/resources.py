@@ -0,0 +1,94 @@
+# xtr/resources.py
+
+import os
+import time
+import resource
+import logging
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def _status_kb(field):
+    """Read a 'VmXxx:   123 kB' line from /proc/self/status (Linux only)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM, so the peak we read later belongs to this task
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class TaskUsage:
+    """
+    CPU, wall-clock and memory used by one task in this worker process,
+    plus an optional soft memory cap. The cap is an RLIMIT_DATA of
+    "heap already in use + memory_limit", so an oversized spreadsheet or
+    archive raises MemoryError inside the task (which then fails cleanly
+    as "too_large") instead of bloating the prefork child for every later
+    task. The previous limit is restored when the task finishes.
+    """
+
+    def __init__(self, memory_limit=None):
+        self.memory_limit = memory_limit
+        self._previous_limit = None
+        self._wall = time.perf_counter()
+        self._rusage = resource.getrusage(resource.RUSAGE_SELF)
+        self._peak_reset = _reset_peak_rss()
+        self._rss_start = _status_kb("VmRSS")
+        if memory_limit:
+            self._apply_limit(memory_limit)
+
+    def _apply_limit(self, memory_limit):
+        data_kb = _status_kb("VmData")
+        if data_kb is None:
+            return
+        try:
+            self._previous_limit = resource.getrlimit(resource.RLIMIT_DATA)
+            hard = self._previous_limit[1]
+            soft = data_kb * 1024 + memory_limit
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            resource.setrlimit(resource.RLIMIT_DATA, (soft, hard))
+        except (ValueError, OSError) as e:
+            logger.warning("⚠️ Could not apply memory cap: %s", e)
+            self._previous_limit = None
+
+    def finish(self):
+        if self._previous_limit is not None:
+            try:
+                resource.setrlimit(resource.RLIMIT_DATA, self._previous_limit)
+            except (ValueError, OSError) as e:
+                logger.warning("⚠️ Could not restore memory limit: %s", e)
+            self._previous_limit = None
+
+        end = resource.getrusage(resource.RUSAGE_SELF)
+        usage = {
+            "wall_sec": round(time.perf_counter() - self._wall, 3),
+            "cpu_user_sec": round(end.ru_utime - self._rusage.ru_utime, 3),
+            "cpu_system_sec": round(end.ru_stime - self._rusage.ru_stime, 3),
+            "pid": os.getpid(),
+        }
+        rss_end = _status_kb("VmRSS")
+        if rss_end is not None and self._rss_start is not None:
+            usage["rss_start_mb"] = round(self._rss_start / 1024, 1)
+            usage["rss_end_mb"] = round(rss_end / 1024, 1)
+        peak = _status_kb("VmHWM") if self._peak_reset else None
+        if peak is not None:
+            usage["peak_rss_mb"] = round(peak / 1024, 1)
+        if self.memory_limit:
+            usage["memory_limit_mb"] = round(self.memory_limit / MB)
+        return usage
@@ -0,0 +1,115 @@
+# xtr/scheduling.py
+
+import os
+import fcntl
+import logging
+
+from celery.exceptions import Retry
+
+from xtr.registry import MEDIA_QUEUE, MB
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Size classes
+# -----------------------------
+SMALL_FILE_BYTES = int(float(os.getenv("XTR_SMALL_FILE_MB", "8")) * MB)
+LARGE_FILE_BYTES = int(float(os.getenv("XTR_LARGE_FILE_MB", "512")) * MB)
+
+LARGE_MEDIA_QUEUE = os.getenv("XTR_LARGE_MEDIA_QUEUE", "media_large")
+
+# Redis transport: 0 is the highest priority, 9 the lowest
+PRIORITY_BY_CLASS = {
+    "small": 0,
+    "medium": 4,
+    "large": 8,
+    "unknown": 4,
+}
+
+# How many large media jobs may run at once on one node
+LARGE_MEDIA_SLOTS = int(os.getenv("XTR_LARGE_MEDIA_SLOTS", "1"))
+LARGE_MEDIA_LOCK_DIR = os.getenv("XTR_LARGE_MEDIA_LOCK_DIR", "/tmp/xtr-large-media")
+LARGE_MEDIA_RETRY_SECONDS = int(os.getenv("XTR_LARGE_MEDIA_RETRY_SECONDS", "30"))
+
+
+def size_class(size):
+    if size is None:
+        return "unknown"
+    if size < SMALL_FILE_BYTES:
+        return "small"
+    if size >= LARGE_FILE_BYTES:
+        return "large"
+    return "medium"
+
+
+def plan_dispatch(handler, size):
+    """
+    Celery routing options for one file: priority by size class, and
+    large media diverted to its own queue so it can be throttled.
+    """
+    cls = size_class(size)
+    queue = handler.queue
+    if cls == "large" and queue == MEDIA_QUEUE:
+        queue = LARGE_MEDIA_QUEUE
+    return {"queue": queue, "priority": PRIORITY_BY_CLASS[cls]}
+
+
+def order_by_cost(candidates):
+    """
+    Sort (handler, filename, size) tuples cheapest first so a bucket full of
+    small files isn't stuck behind one multi-GB video.
+    """
+    return sorted(candidates, key=lambda c: c[0].estimate_cost(c[2]))
+
+
+# -----------------------------
+# Per-node large media budget
+# -----------------------------
+def _is_large_media(task):
+    delivery_info = getattr(task.request, "delivery_info", None) or {}
+    return delivery_info.get("routing_key") == LARGE_MEDIA_QUEUE
+
+
+def requeue(task, countdown):
+    """
+    Send the running task again in ``countdown`` seconds and stop this run,
+    like task.retry() but without spending one of its retries: waiting for
+    capacity is not a failure, and the retry budget stays for real errors.
+    (retry(max_retries=None) would fall back to the task's own limit.)
+    """
+    sig = task.signature_from_request(countdown=countdown)
+    sig.apply_async()
+    raise Retry(when=countdown, sig=sig)
+
+
+def acquire_large_media_slot(task):
+    """
+    Take one of LARGE_MEDIA_SLOTS node-local slots before a large media job
+    runs. Slots are flock()ed files, so a crashed worker releases its slot
+    automatically. When every slot is busy the task is re-queued (see
+    requeue) instead of blocking a worker process. Returns a handle for
+    release_large_media_slot, or None for jobs that aren't throttled.
+    """
+    if not _is_large_media(task):
+        return None
+
+    os.makedirs(LARGE_MEDIA_LOCK_DIR, exist_ok=True)
+    for i in range(LARGE_MEDIA_SLOTS):
+        fh = open(os.path.join(LARGE_MEDIA_LOCK_DIR, f"slot-{i}.lock"), "w")
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fh
+        except BlockingIOError:
+            fh.close()
+
+    logger.info("[SCHED] ⏳ All %s large media slots busy, re-queueing", LARGE_MEDIA_SLOTS)
+    requeue(task, LARGE_MEDIA_RETRY_SECONDS)
+
+
+def release_large_media_slot(fh):
+    if fh is None:
+        return
+    try:
+        fcntl.flock(fh, fcntl.LOCK_UN)
+    finally:
+        fh.close()
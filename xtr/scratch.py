@@ -0,0 +1,168 @@
+# xtr/scratch.py
+
+import os
+import json
+import fcntl
+import shutil
+import logging
+import secrets
+import tempfile
+from contextlib import contextmanager
+
+from minio.error import S3Error
+
+from .registry import MB
+from .scheduling import requeue
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+# Objects up to this size are parsed straight from memory and need no scratch space
+IN_MEMORY_BYTES = int(float(os.getenv("XTR_IN_MEMORY_MB", "8")) * MB)
+
+# Where downloads land: point XTR_SCRATCH_DIR at a tmpfs for documents and
+# XTR_MEDIA_SCRATCH_DIR at a large volume for audio/video.
+SCRATCH_DIR = os.getenv("XTR_SCRATCH_DIR") or tempfile.gettempdir()
+MEDIA_SCRATCH_DIR = os.getenv("XTR_MEDIA_SCRATCH_DIR") or SCRATCH_DIR
+MEDIA_TYPES = ("audio", "video")
+
+# Space always left free on a scratch filesystem
+HEADROOM_BYTES = int(float(os.getenv("XTR_SCRATCH_HEADROOM_MB", "512")) * MB)
+RETRY_SECONDS = int(os.getenv("XTR_SCRATCH_RETRY_SECONDS", "30"))
+
+# Expected scratch use relative to the object size (video also writes a WAV)
+SPACE_FACTOR = {"video": 1.5}
+
+LEDGER_NAME = ".xtr-scratch.json"
+
+
+class ScratchFull(Exception):
+    """Not enough free space to reserve scratch for a file right now."""
+
+
+def scratch_dir(file_type):
+    return MEDIA_SCRATCH_DIR if file_type in MEDIA_TYPES else SCRATCH_DIR
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _ledger(directory):
+    """
+    Open reservations on one scratch filesystem, shared by every worker
+    process on the node through an flock()ed JSON file. Entries of dead
+    processes are dropped, so a crashed worker can't leak space.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(os.path.join(directory, LEDGER_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, "r+") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            entries = json.loads(fh.read() or "{}")
+        except ValueError:
+            entries = {}
+        entries = {token: e for token, e in entries.items() if _alive(e[0])}
+        yield entries
+        fh.seek(0)
+        fh.truncate()
+        fh.write(json.dumps(entries))
+
+
+class Reservation:
+    """Scratch space held for one task; temp files go into ``directory``."""
+
+    def __init__(self, directory, nbytes=0, token=None):
+        self.directory = directory
+        self.nbytes = nbytes
+        self.token = token
+
+    def mkstemp(self, suffix=""):
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.directory)
+        os.close(fd)
+        return path
+
+    def release(self):
+        if self.token is None:
+            return
+        with _ledger(self.directory) as entries:
+            entries.pop(self.token, None)
+        self.token = None
+
+
+def reserve(file_type, nbytes):
+    """
+    Reserve ``nbytes`` on the scratch filesystem for ``file_type``. Raises
+    ScratchFull when free space minus other open reservations and the
+    headroom can't cover it. Bytes that in-flight downloads have already
+    written count twice, which errs on the safe side.
+    """
+    directory = scratch_dir(file_type)
+    if nbytes <= 0:
+        return Reservation(directory)
+    with _ledger(directory) as entries:
+        reserved = sum(e[1] for e in entries.values())
+        available = shutil.disk_usage(directory).free - reserved - HEADROOM_BYTES
+        if nbytes > available:
+            raise ScratchFull(
+                f"need {nbytes / MB:.0f} MB in {directory}, {max(available, 0) / MB:.0f} MB available"
+            )
+        token = f"{os.getpid()}:{secrets.token_hex(4)}"
+        entries[token] = [os.getpid(), nbytes]
+    return Reservation(directory, nbytes, token)
+
+
+def admit_scratch(task, bucket_name, object_name, file_type):
+    """
+    Reserve scratch space for an object before its task claims it, sized
+    from stat_object. When the space isn't there the task is re-queued
+    (scheduling.requeue, which spends none of its retries) rather than risk filling the disk mid-download; a
+    file over its type's max_size, or too big for the filesystem at all, is
+    recorded as "too_large" and None is returned. The size limit is checked
+    here, whichever path queued the task (rescan, reaper, reprocess_outdated).
+    Small objects that are parsed in memory reserve nothing.
+    """
+    from .tasks import minio_client
+    from .claims import reject_too_large
+    from .registry import get_handler
+
+    try:
+        size = minio_client.stat_object(bucket_name, object_name).size
+    except S3Error as e:
+        # Let the handler's own download surface the error
+        logger.warning("[SCRATCH] ⚠️ Could not stat %s: %s", object_name, e)
+        return Reservation(scratch_dir(file_type))
+
+    handler = get_handler(file_type)
+    if not handler.accepts_size(size):
+        logger.error("[SCRATCH] ❌ %s is %.0f MB, over the %s limit of %.0f MB",
+                     object_name, size / MB, file_type, handler.max_size / MB)
+        reject_too_large(handler.model, object_name, size, handler.max_size)
+        return None
+
+    if file_type not in MEDIA_TYPES and size <= IN_MEMORY_BYTES:
+        return Reservation(scratch_dir(file_type))
+
+    factor = SPACE_FACTOR.get(file_type, 1.0)
+    nbytes = int(size * factor)
+    capacity = shutil.disk_usage(scratch_dir(file_type)).total - HEADROOM_BYTES
+    if nbytes > capacity:
+        logger.error("[SCRATCH] ❌ %s needs %.0f MB, more than %s can ever hold",
+                     object_name, nbytes / MB, scratch_dir(file_type))
+        reject_too_large(handler.model, object_name, size, int(capacity / factor))
+        return None
+
+    try:
+        return reserve(file_type, nbytes)
+    except ScratchFull as e:
+        logger.info("[SCRATCH] ⏳ %s: %s, re-queueing", object_name, e)
+        requeue(task, RETRY_SECONDS)
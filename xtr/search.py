@@ -0,0 +1,95 @@
+# xtr/search.py
+
+import os
+import re
+import logging
+from datetime import datetime, timezone
+
+from xtr.models import SearchEntry
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+ENABLED = os.getenv("XTR_SEARCH_INDEX", "1") == "1"
+# Only the start of very large extractions is indexed: keeps index entries and
+# the search_index collection bounded whatever the source size.
+MAX_CHARS = int(os.getenv("XTR_SEARCH_MAX_CHARS", "100000"))
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Ranked results can't be keyset-paged; skip stays cheap for the first pages only
+MAX_PAGE = 50
+SNIPPET_CHARS = 200
+
+
+def entry_update(file_type, filename, text):
+    """(filter, update) that upserts the search entry for one file."""
+    now = datetime.now(timezone.utc)
+    return (
+        {"file_type": file_type, "filename": filename},
+        {
+            "$set": {"text": text[:MAX_CHARS], "size": len(text), "updated_at": now},
+            "$setOnInsert": {"created_at": now},
+        },
+    )
+
+
+def index_update(file_type, filename, text):
+    """
+    (SearchEntry, filter, update) that adds or refreshes one file in the
+    search index, or None when there is nothing to index. claims.complete
+    queues it with the result, and the write buffer only applies it if the
+    result itself was written (the lease was still held).
+    """
+    if not ENABLED or not isinstance(text, str) or not text.strip():
+        return None
+    return (SearchEntry, *entry_update(file_type, filename, text))
+
+
+def _terms(q):
+    # Positive terms only: negated ("-word") terms never appear in a snippet
+    return [t.strip('"').lower() for t in q.split() if t.strip('"') and not t.startswith("-")]
+
+
+def snippet(text, q, width=SNIPPET_CHARS):
+    """A window of ``text`` around the first query term, or its start."""
+    lowered = text.lower()
+    hits = [i for i in (lowered.find(t) for t in _terms(q)) if i >= 0]
+    start = max(min(hits) - width // 4, 0) if hits else 0
+    excerpt = re.sub(r"\s+", " ", text[start:start + width]).strip()
+    return ("…" if start else "") + excerpt + ("…" if start + width < len(text) else "")
+
+
+def query(q, types=None, page=1, page_size=PAGE_SIZE):
+    """
+    Ranked full-text search across every file type. Returns (results,
+    has_more); each result has file_type, filename, score, size and a
+    snippet. ``q`` uses Mongo text search syntax: "exact phrase", -exclude.
+    """
+    page = min(max(page, 1), MAX_PAGE)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    filter_ = {"$text": {"$search": q}}
+    if types:
+        filter_["file_type"] = {"$in": list(types)}
+    cursor = (
+        SearchEntry._get_collection()
+        .find(filter_, {"score": {"$meta": "textScore"}, "file_type": 1, "filename": 1,
+                        "text": 1, "size": 1, "updated_at": 1})
+        .sort([("score", {"$meta": "textScore"})])
+        .skip((page - 1) * page_size)
+        .limit(page_size + 1)
+    )
+    docs = list(cursor)
+    results = [
+        {
+            "file_type": d["file_type"],
+            "filename": d["filename"],
+            "score": round(d["score"], 4),
+            "size": d.get("size", 0),
+            "updated_at": d["updated_at"].isoformat() if d.get("updated_at") else None,
+            "snippet": snippet(d.get("text") or "", q),
+        }
+        for d in docs[:page_size]
+    ]
+    return results, len(docs) > page_size
@@ -1,31 +1,45 @@
 from indic_transliteration import sanscript
 from datetime import datetime, timezone
 from celery import shared_task
-import os, tempfile, platform, zipfile, tarfile, json, yaml, gzip,py7zr, rarfile,filetype
+import io, os, time, shutil, tempfile, platform, zipfile, tarfile, json, yaml, gzip,py7zr, rarfile,filetype
 import pandas as pd
 import PyPDF2
-from docx import Document
 import xml.etree.ElementTree as ET
-import whisper, ffmpeg
+import ffmpeg
 from pptx import Presentation
 from pydub import AudioSegment
 from PIL import Image
 import logging
+import importlib.util
+from contextlib import contextmanager
 from .models import (
     AudioFile, VideoFile, ImageFile, DocumentFile, HtmlFile,
-    JsonFile, XmlFile, LogFile, PPTFile, SpreadsheetFile, ArchiveFile, YamlFile
+    JsonFile, XmlFile, LogFile, PPTFile, PPTSlide, SpreadsheetFile, ArchiveFile, YamlFile
 )
 from .minio_client import get_minio_client, list_objects 
 from .utils import detect_file_type, SPREADSHEET_EXTENSIONS, normalize_filename
-from .minio_client import move_object
+from .registry import register_handler, get_handler, registered_types, MEDIA_QUEUE, MB
+from .tracing import file_trace
+from .metrics import stage, record_bytes, MODEL_LOAD_SECONDS, MODEL_WARMUP_SECONDS
+from .claims import claim, complete, fail, reject_too_large, LeaseHeartbeat, expired_claims, release_expired
+from .scheduling import (
+    order_by_cost, plan_dispatch, acquire_large_media_slot, release_large_media_slot
+)
+from .scratch import admit_scratch, IN_MEMORY_BYTES
+from .transfer import download_object
+from .extractors.word import extract_docx
+from .extractors import libreoffice
+from .extractors.slides import extract_pptx
+from .extractors.ebook import extract_epub
+from .extractors.opendocument import extract_odt
+from . import transcripts, transcription
+from .minio_client import move_object, object_exists
 from pathlib import Path
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from faster_whisper import WhisperModel
 import torch
 from bs4 import BeautifulSoup
-from celery.signals import worker_process_init
 from mongoengine import connect
-from xtr.utils import extract_ppt_text
 from minio.error import S3Error
 
 from xtr import minio_client
@@ -66,70 +80,99 @@ def fetch_all_buckets_and_objects():
             if bucket_name == skip_bucket:
                 continue  # Skip this bucket!
             print(f"[TASK] 📂 Bucket: {bucket_name}")
-            for obj in list_objects(bucket_name):
-                filename = obj.object_name
-                auto_discover_and_process.delay(bucket_name, filename)
+            # One listing per bucket: the batch keeps its sizes and is dispatched cheapest first
+            auto_discover_and_process.delay(bucket_name)
     except Exception as e:
         print(f"[TASK] ❌ Error fetching buckets/objects: {e}")
 
 
+def _single_object(bucket_name, filename, size=None):
+    """Listing entry for one object, sized from stat_object when the caller didn't pass a size."""
+    if size is None:
+        try:
+            size = minio_client.stat_object(bucket_name, filename).size
+        except S3Error as e:
+            print(f"[TASK] ⚠️ Could not stat {filename}: {e}")
+    return type("obj", (object,), {"object_name": filename, "size": size})
+
+
 @shared_task
-def auto_discover_and_process(bucket_name=None, filename=None):
+def auto_discover_and_process(bucket_name=None, filename=None, size=None):
     if not bucket_name:
         print("[TASK] ⚠️ Missing bucket_name")
         return
     if bucket_name != "processing":
         return  # Only process the 'processing' bucket
 
-    files = [type("obj", (object,), {"object_name": filename})] if filename else list_objects(bucket_name)
+    files = [_single_object(bucket_name, filename, size)] if filename else list_objects(bucket_name)
 
+    found = []
     for obj in files:
         fname = obj.object_name.strip()
         fname = normalize_filename(fname)
         ftype = detect_file_type(fname)
         print(f"[TASK] ➡️ Found: {fname} (type: {ftype})")
 
-        processed = False
-
-        # Dispatch by file type, update processed = True if actually processed
-        if ftype == "audio" and not AudioFile.objects(filename=fname).first():
-            process_audio.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "video" and not VideoFile.objects(filename=fname).first():
-            process_video.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "image" and not ImageFile.objects(filename=fname).first():
-            process_image.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "document" and not DocumentFile.objects(filename=fname).first():
-            process_doc.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "presentation" and not PPTFile.objects(filename=fname).first():
-            process_ppt.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "spreadsheet" and not SpreadsheetFile.objects(filename=fname).first():
-            process_spreadsheet.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "html" and not HtmlFile.objects(filename=fname).first():
-            process_html.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "json" and not JsonFile.objects(filename=fname).first():
-            process_json.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "xml" and not XmlFile.objects(filename=fname).first():
-            process_xml.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "log" and not LogFile.objects(filename=fname).first():
-            process_log.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "archive" and not ArchiveFile.objects(filename=fname).first():
-            process_archive.delay(bucket_name, fname)
-            processed = True
-        elif ftype == "yaml" and not YamlFile.objects(filename=fname).first():
-            process_yaml.delay(bucket_name, fname)
-            processed = True
-        else:
+        handler = get_handler(ftype)
+        if handler is None:
             print(f"[TASK] ⏭️ Skipped or unknown: {fname}")
+            continue
+        if not handler.accepts_size(obj.size):
+            print(f"[TASK] ⏭️ Too large for {ftype} handler: {fname} ({obj.size} bytes)")
+            reject_too_large(handler.model, fname, obj.size, handler.max_size)
+            continue
+        found.append((handler, fname, obj.size))
+
+    # One filename-only query per collection instead of loading each record
+    existing = set()
+    by_model = {}
+    for handler, fname, _ in found:
+        by_model.setdefault(handler.model, []).append(fname)
+    for model, names in by_model.items():
+        for doc in model._get_collection().find({"filename": {"$in": names}}, {"filename": 1, "_id": 0}):
+            existing.add((model, doc["filename"]))
+
+    candidates = []
+    for handler, fname, size in found:
+        if (handler.model, fname) in existing:
+            print(f"[TASK] ⏭️ Already processed: {fname}")
+            continue
+        candidates.append((handler, fname, size))
+
+    # Cheapest first, with priority and queue chosen by size class
+    for handler, fname, size in order_by_cost(candidates):
+        with file_trace(fname):
+            handler.task.apply_async(args=(bucket_name, fname), **plan_dispatch(handler, size))
+
+
+
+# Where handlers move finished objects (and reprocess_outdated re-reads them from)
+ARCHIVE_BUCKET = os.getenv("MINIO_ARCHIVE_BUCKET", "archive")
+
+
+@shared_task
+def reap_expired_leases():
+    """
+    Celery beat job: find files whose worker died mid-task (lease expired
+    without a heartbeat) and re-enqueue only those, instead of re-listing
+    the whole bucket. A file already moved to the archive (its buffered
+    result was lost after the task finished) is re-queued from there.
+    """
+    for ftype in registered_types():
+        handler = get_handler(ftype)
+        for fname, bucket in expired_claims(handler.model):
+            outcome = release_expired(handler.model, fname)
+            if outcome == "requeue":
+                try:
+                    if bucket == "processing" and not object_exists(bucket, fname) \
+                            and object_exists(ARCHIVE_BUCKET, fname):
+                        bucket = ARCHIVE_BUCKET
+                except Exception as e:
+                    logger.error("[REAPER] ⚠️ Could not locate %s, re-queueing from %s: %s", fname, bucket, e)
+                logger.warning("[REAPER] ♻️ Lease expired, re-queueing %s (%s)", fname, ftype)
+                handler.task.apply_async(args=(bucket, fname), **plan_dispatch(handler, None))
+            elif outcome == "failed":
+                logger.error("[REAPER] ❌ Giving up on %s after repeated worker deaths", fname)
 
 
 
@@ -150,52 +193,126 @@ AudioSegment.ffprobe = FFPROBE_EXE
 
 logger = logging.getLogger(__name__)
 
-_MODEL = None
+# One loaded model per (model_size, device, compute_type) in this process
+_MODELS = {}
 
-def get_whisper_model():
-    global _MODEL
+def whisper_settings(profile="default"):
+    """(model_size, device, compute_type) for a transcription profile (xtr/transcription.py)."""
+    settings = transcription.PROFILES[profile]
+    # Read configuration from environment variables
+    model_size = settings["model"] or os.getenv("WHISPER_MODEL", "tiny")  # default to 'tiny'
+    device_env = os.getenv("WHISPER_DEVICE", None)   # optional override
+    compute_type_env = settings["compute_type"] or os.getenv("WHISPER_COMPUTE_TYPE", None)  # optional override
 
-    if _MODEL is None:
-        # Read configuration from environment variables
-        model_size = os.getenv("WHISPER_MODEL", "tiny")  # default to 'tiny'
-        device_env = os.getenv("WHISPER_DEVICE", None)   # optional override
-        compute_type_env = os.getenv("WHISPER_COMPUTE_TYPE", None)  # optional override
+    # Determine device: use environment override if provided
+    if device_env:
+        device = device_env
+    else:
+        # Auto-detect GPU availability
+        device = "cuda" if torch.cuda.is_available() else "cpu"
 
-        # Determine device: use environment override if provided
-        if device_env:
-            device = device_env
-        else:
-            # Auto-detect GPU availability
-            device = "cuda" if torch.cuda.is_available() else "cpu"
+    # Determine compute_type: use environment override if provided
+    if compute_type_env:
+        compute_type = compute_type_env
+    else:
+        compute_type = "float16" if device == "cuda" else "int8"
 
-        # Determine compute_type: use environment override if provided
-        if compute_type_env:
-            compute_type = compute_type_env
-        else:
-            compute_type = "float16" if device == "cuda" else "int8"
+    return model_size, device, compute_type
+
+
+def get_whisper_model(profile="default"):
+    key = whisper_settings(profile)
+
+    if key not in _MODELS:
+        model_size, device, compute_type = key
 
         try:
             logger.info(f"🚀 Loading Faster-Whisper model '{model_size}' on {device} ({compute_type})...")
-            _MODEL = WhisperModel(model_size, device=device, compute_type=compute_type)
-            logger.info("✅ Faster-Whisper model loaded successfully.")
+            started = time.perf_counter()
+            _MODELS[key] = WhisperModel(model_size, device=device, compute_type=compute_type)
+            load_seconds = time.perf_counter() - started
+            MODEL_LOAD_SECONDS.labels(model_size).observe(load_seconds)
+            logger.info(f"✅ Faster-Whisper model loaded successfully in {load_seconds:.1f}s.")
         except Exception as e:
+            # Nothing is cached: the next call tries again, and the caller sees the real error
             logger.error(f"❌ Failed to load Faster-Whisper model: {e}")
-            _MODEL = None
+            raise
+
+    return _MODELS[key]
 
-    return _MODEL
+
+def warm_up_whisper(profile=transcription.DEFAULT_PROFILE):
+    """
+    Load the model and run one short inference so the first real file on
+    this worker process doesn't pay for loading, weight paging or kernel
+    setup. Called from worker_process_init on media workers.
+    """
+    import numpy as np
+
+    model = get_whisper_model(profile)
+    model_size = whisper_settings(profile)[0]
+    started = time.perf_counter()
+    # One second of silence; a fixed language skips detection
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language="en", beam_size=1)
+    list(segments)
+    warmup_seconds = time.perf_counter() - started
+    MODEL_WARMUP_SECONDS.labels(model_size).observe(warmup_seconds)
+    logger.info(f"🔥 Faster-Whisper model '{model_size}' warmed up in {warmup_seconds:.1f}s.")
 
 # ----------------------------
 # Helper: Transcribe file with per-segment logging
 # ----------------------------
 
-def transcribe_file(file_path: str, language: str = None):
-    if get_whisper_model() is None:
-        raise RuntimeError("Faster-Whisper model not loaded")
+def transcription_options(bucket_name, object_name):
+    """(profile, language hint) for an object, from its key prefix and user metadata."""
+    try:
+        metadata = minio_client.stat_object(bucket_name, object_name).metadata
+    except S3Error as e:
+        logger.warning(f"⚠️ Could not read metadata of {object_name}: {e}")
+        metadata = None
+    return transcription.choose(object_name, metadata)
+
+
+def transcription_setup(bucket_name, object_name):
+    """
+    (profile, language) for an object, with that profile's model loaded.
+    Media tasks call it before claiming, so the model isn't counted against
+    the file's memory cap; a load error is left for transcribe_file to report.
+    """
+    profile, language = transcription_options(bucket_name, object_name)
+    try:
+        get_whisper_model(profile)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load the {profile} model ahead of {object_name}: {e}")
+    return profile, language
+
+
+def cached_transcript(fingerprint: str, language: str = None, profile: str = "default"):
+    """(text, language, duration) from the transcript cache for this content and model, or None."""
+    model_size, _, compute_type = whisper_settings(profile)
+    cached = transcripts.lookup(fingerprint, model_size, compute_type, language, profile)
+    return cached[:3] if cached else None
+
+
+def transcribe_file(file_path: str, language: str = None, fingerprint: str = None, profile: str = "default"):
+    """
+    Transcribe a file with a transcription profile, or return the cached
+    transcript when the same content was already transcribed with the same
+    settings. A ``language`` hint skips detection. ``fingerprint`` overrides
+    the content hash (video passes the hash of the original video).
+    """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    logger.info(f"🔊 Starting transcription for {file_path}")
-    segments, info = get_whisper_model().transcribe(file_path, language=language)
+    fingerprint = fingerprint or transcripts.fingerprint(file_path)
+    cached = cached_transcript(fingerprint, language, profile)
+    if cached:
+        return cached
+
+    logger.info(f"🔊 Starting {profile} transcription for {file_path} (language: {language or 'auto'})")
+    segments, info = get_whisper_model(profile).transcribe(
+        file_path, language=language, **transcription.PROFILES[profile]["options"]
+    )
     segments = list(segments)
     # Log each segment
     for i, seg in enumerate(segments, start=1):
@@ -203,8 +320,84 @@ def transcribe_file(file_path: str, language: str = None):
 
     text = " ".join([seg.text for seg in segments]).strip()
     logger.info(f"✅ Transcription completed: {file_path} | Duration: {info.duration:.2f}s | Language: {info.language}")
+
+    model_size, _, compute_type = whisper_settings(profile)
+    try:
+        transcripts.store(
+            fingerprint, model_size, compute_type, language,
+            [{"start": seg.start, "end": seg.end, "text": seg.text} for seg in segments],
+            info.language, info.duration, profile,
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cache transcript for {file_path}: {e}")
     return text, info.language, info.duration
 
+# ----------------------------
+# Helpers: MinIO download with timing
+# ----------------------------
+
+def download_to(bucket_name, object_name, path, file_type):
+    # Large media goes over parallel ranged GETs, see xtr/transfer.py
+    with stage(file_type, "download"):
+        size = download_object(minio_client, bucket_name, object_name, path)
+    record_bytes(file_type, size)
+
+
+def read_object(bucket_name, object_name, file_type):
+    with stage(file_type, "download"):
+        response = minio_client.get_object(bucket_name, object_name)
+        try:
+            data = response.read()
+        finally:
+            response.close()
+            response.release_conn()
+    record_bytes(file_type, len(data))
+    return data
+
+
+@contextmanager
+def open_object(bucket_name, object_name, file_type, scratch=None):
+    """
+    Yield the object as a seekable binary file for parsers that accept
+    file-like input (PIL, PyPDF2, python-docx/pptx, pandas, yaml, zipfile...),
+    so small files never touch the disk. Objects over IN_MEMORY_BYTES are
+    spooled and roll over to a temp file in the task's scratch directory.
+    """
+    with stage(file_type, "download"):
+        response = minio_client.get_object(bucket_name, object_name)
+        try:
+            length = int(response.headers.get("Content-Length") or 0)
+            if 0 < length <= IN_MEMORY_BYTES:
+                f = io.BytesIO(response.read())
+            else:
+                f = tempfile.SpooledTemporaryFile(
+                    max_size=IN_MEMORY_BYTES, dir=scratch.directory if scratch else None
+                )
+                for chunk in response.stream(MB):
+                    f.write(chunk)
+        finally:
+            response.close()
+            response.release_conn()
+    record_bytes(file_type, f.seek(0, io.SEEK_END))
+    f.seek(0)
+    try:
+        yield f
+    finally:
+        f.close()
+
+
+@contextmanager
+def local_path(f, suffix, scratch=None):
+    """Spill an open_object() file to disk for the few libraries that insist on a path."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=scratch.directory if scratch else None)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            f.seek(0)
+            shutil.copyfileobj(f, out, MB)
+        yield path
+    finally:
+        os.remove(path)
+
 # ----------------------------
 # Celery Task: Audio
 # ----------------------------
@@ -219,58 +412,71 @@ def process_audio(self, bucket_name, filename):
     """
     path = None
     status = "failed"
-    
+    filename = normalize_filename(filename)
+    slot = acquire_large_media_slot(self)
+    try:
+        # Before the claim applies the memory cap: the model isn't this file's memory
+        profile, language = transcription_setup(bucket_name, filename)
+        scratch = admit_scratch(self, bucket_name, filename, "audio")
+    except BaseException:
+        release_large_media_slot(slot)
+        raise
+    if scratch is None:
+        release_large_media_slot(slot)
+        return
+    if not claim(AudioFile, filename):
+        scratch.release()
+        release_large_media_slot(slot)
+        logger.info(f"[TASK] ⏭️ Audio already claimed or processed: {filename}")
+        return
+    heartbeat = LeaseHeartbeat(AudioFile, filename)
+    heartbeat.start()
+
     try:
-        filename = normalize_filename(filename)
         logger.info(f"[TASK] 🎧 Processing audio: {filename}")
 
         # Download file from MinIO
-        fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[-1])
-
-        os.close(fd)
-
-        minio_client.fget_object(bucket_name, filename, path)
+        path = scratch.mkstemp(suffix=os.path.splitext(filename)[-1])
+        download_to(bucket_name, filename, path, "audio")
 
         if not os.path.exists(path):
             raise FileNotFoundError(f"Downloaded audio file not found at {path}")
 
         # Transcribe
-        text, detected_lang, duration = transcribe_file(path)
+        with stage("audio", "transcribe"):
+            text, detected_lang, duration = transcribe_file(path, language=language, profile=profile)
 
         # Save to MongoDB
-        doc = AudioFile(
-            filename=filename,
+        if complete(
+            AudioFile, filename,
             content=text,
-            status="completed",
-            meta_data={"detected_language": detected_lang, "duration_sec": duration},
-            created_at=datetime.now(timezone.utc)
-        )
-        doc.save()
-        logger.info(f"[TASK] ✅ AudioFile saved with ID: {doc.id}")
-        status = "completed"
+            meta_data={"detected_language": detected_lang, "duration_sec": duration,
+                       "profile": profile, "language_hint": language},
+        ):
+            logger.info(f"[TASK] ✅ AudioFile saved: {filename}")
+            status = "completed"
 
     except Exception as exc:
         logger.error(f"[TASK] ❌ Failed audio {filename}: {exc}")
         try:
-            doc = AudioFile(
-                filename=filename,
-                content="",
-                status="failed",
-                meta_data={"error": str(exc)},
-                created_at=datetime.now(timezone.utc)
-            )
-            doc.save()
+            fail(AudioFile, filename, exc, content="")
         except Exception as e:
             logger.error(f"[TASK] ❌ Failed saving failed audio record: {e}")
         try:
-            self.retry(exc=exc)
+            # Over the memory cap the file is "too_large", which is final
+            if not isinstance(exc, MemoryError):
+                self.retry(exc=exc)
         except self.MaxRetriesExceededError:
             logger.error(f"[TASK] Max retries reached for {filename}")
 
     finally:
+        heartbeat.stop()
+        release_large_media_slot(slot)
+
         # Clean up temp file
         if path and os.path.exists(path):
             os.remove(path)
+        scratch.release()
 
         # Move to archive ONLY if completed
         if bucket_name == "processing" and status == "completed":
@@ -290,74 +496,95 @@ def process_audio(self, bucket_name, filename):
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def process_video(self, bucket_name, filename):
     vpath, apath = None, None
+    filename = normalize_filename(filename)
+    slot = acquire_large_media_slot(self)
+    try:
+        # Before the claim applies the memory cap: the model isn't this file's memory
+        profile, language = transcription_setup(bucket_name, filename)
+        scratch = admit_scratch(self, bucket_name, filename, "video")
+    except BaseException:
+        release_large_media_slot(slot)
+        raise
+    if scratch is None:
+        release_large_media_slot(slot)
+        return
+    if not claim(VideoFile, filename):
+        scratch.release()
+        release_large_media_slot(slot)
+        logger.info(f"[TASK] ⏭️ Video already claimed or processed: {filename}")
+        return
+    heartbeat = LeaseHeartbeat(VideoFile, filename)
+    heartbeat.start()
+
     try:
-        filename = normalize_filename(filename)
         logger.info(f"[TASK] 🎬 Processing video: {filename}")
 
         # Download video
-        fd, vpath = tempfile.mkstemp(suffix=os.path.splitext(filename)[-1])
-        os.close(fd)
-        minio_client.fget_object(bucket_name, filename, vpath)
+        vpath = scratch.mkstemp(suffix=os.path.splitext(filename)[-1])
+        download_to(bucket_name, filename, vpath, "video")
 
         if not os.path.exists(vpath):
             raise FileNotFoundError(f"Downloaded video file not found at {vpath}")
 
-        # Extract audio
-        fd, apath = tempfile.mkstemp(suffix=".wav")
-        os.close(fd)
-        logger.info(f"🎵 Extracting audio from {vpath} to {apath}")
-
-        (
-            ffmpeg
-            .input(vpath)
-            .output(apath, format="wav", acodec="pcm_s16le", ac=1, ar="16000")
-            .run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
-        )
-        logger.info(f"✅ Audio extraction completed: {apath}")
-
-        if not os.path.exists(apath):
-            raise FileNotFoundError(f"Extracted audio file not found at {apath}")
-
-        # Transcribe audio
-        text, detected_lang, duration = transcribe_file(apath)
-
-        doc = VideoFile(
-            filename=filename,
+        # A video we've already transcribed skips extraction and transcription
+        fingerprint = transcripts.fingerprint(vpath)
+        cached = cached_transcript(fingerprint, language, profile)
+        if cached:
+            text, detected_lang, duration = cached
+        else:
+            # Extract audio
+            apath = scratch.mkstemp(suffix=".wav")
+            logger.info(f"🎵 Extracting audio from {vpath} to {apath}")
+
+            with stage("video", "extract_audio"):
+                (
+                    ffmpeg
+                    .input(vpath)
+                    .output(apath, format="wav", acodec="pcm_s16le", ac=1, ar="16000")
+                    .run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+                )
+            logger.info(f"✅ Audio extraction completed: {apath}")
+
+            if not os.path.exists(apath):
+                raise FileNotFoundError(f"Extracted audio file not found at {apath}")
+
+            # Transcribe audio
+            with stage("video", "transcribe"):
+                text, detected_lang, duration = transcribe_file(
+                    apath, language=language, fingerprint=fingerprint, profile=profile
+                )
+
+        complete(
+            VideoFile, filename,
             content=text,
-            status="completed",
-            meta_data={"detected_language": detected_lang, "duration_sec": duration},
-            created_at=datetime.now(timezone.utc)
+            meta_data={"detected_language": detected_lang, "duration_sec": duration,
+                       "profile": profile, "language_hint": language},
         )
-        doc.save()
-        logger.info(f"[TASK] ✅ VideoFile saved with ID: {doc.id}")
+        logger.info(f"[TASK] ✅ VideoFile saved: {filename}")
 
     except Exception as exc:
         logger.error(f"[TASK] ❌ Failed video {filename}: {exc}")
         try:
-            doc = VideoFile(
-                filename=filename,
-                content="",
-                status="failed",
-                meta_data={"error": str(exc)},
-                created_at=datetime.now(timezone.utc)
-            )
-            doc.save()
+            fail(VideoFile, filename, exc, content="")
         except Exception as e:
             logger.error(f"[TASK] ❌ Failed saving failed video record: {e}")
         try:
-            self.retry(exc=exc)
+            # Over the memory cap the file is "too_large", which is final
+            if not isinstance(exc, MemoryError):
+                self.retry(exc=exc)
         except self.MaxRetriesExceededError:
             logger.error(f"[TASK] Max retries reached for {filename}")
 
     finally:
+        heartbeat.stop()
+        release_large_media_slot(slot)
         for p in [vpath, apath]:
             if p and os.path.exists(p):
                 os.remove(p)
+        scratch.release()
         if bucket_name == "processing":
             try:
                 archive_bucket = "archive"
-                doc = VideoFile.objects(filename=filename).first()
-                status = doc.status if doc else "completed"
                 success = move_object(bucket_name, filename, archive_bucket)
                 if success:
                     logger.info(f"[TASK] 📦 Moved '{filename}' from '{bucket_name}' to '{archive_bucket}'")
@@ -372,76 +599,66 @@ def process_video(self, bucket_name, filename):
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def process_image(self, bucket_name, object_name):
-    tmp_path = None
     object_name = normalize_filename(object_name)
 
+    scratch = admit_scratch(self, bucket_name, object_name, "image")
+    if scratch is None:
+        return
+    if not claim(ImageFile, object_name):
+        scratch.release()
+        logger.info(f"[TASK] ⏭️ Image already claimed or processed: {object_name}")
+        return
+
     logger.info(f"[TASK] 📷 Processing image: {object_name}")
 
     try:
-        # ✅ 1. Check object existence (CRITICAL)
-        try:
-            minio_client.stat_object(bucket_name, object_name)
-        except S3Error as e:
-            if e.code == "NoSuchKey":
-                logger.warning(f"[TASK] ⏭️ Already processed: {object_name}")
-                return
-            raise
-
-        # ✅ 2. Download
+        # ✅ 1. Download (kept in memory for small images); a vanished object raises NoSuchKey here
         ext = os.path.splitext(object_name)[1].lower()
-        fd, tmp_path = tempfile.mkstemp(suffix=ext)
-        os.close(fd)
-
-        minio_client.fget_object(bucket_name, object_name, tmp_path)
-
-        # ✅ 3. Extension typo fixes
-        typo_map = {
-            ".ppng": ".png",
-            ".jiif": ".jfif",
-            ".jif": ".jfif",
-            ".jgp": ".jpg",
-            ".jpe": ".jpeg",
-            ".tif": ".tiff",
-        }
-        if ext in typo_map:
-            new_path = tmp_path.replace(ext, typo_map[ext])
-            os.rename(tmp_path, new_path)
-            tmp_path = new_path
-            ext = typo_map[ext]
-
-        # ✅ 4. HEIC support
-        if ext in (".heic", ".heif"):
-            from pillow_heif import register_heif_opener
-            register_heif_opener()
-
-        # ✅ 5. SVG → PNG
-        if ext == ".svg":
-            import cairosvg
-            png_path = tmp_path + ".png"
-            cairosvg.svg2png(url=tmp_path, write_to=png_path)
-            os.remove(tmp_path)
-            tmp_path = png_path
-            ext = ".png"
-
-        # ✅ 6. Image processing
-        with Image.open(tmp_path) as img:
-            if img.mode not in ("RGB", "L"):
-                img = img.convert("RGB")
-
-            ImageFile.objects(filename=object_name).update_one(
-                set__file_size=os.path.getsize(tmp_path),
-                set__width=img.width,
-                set__height=img.height,
-                set__format=img.format or ext,
-                set__status="completed",
-                set__meta_data={"mode": img.mode},
-                set__created_at=datetime.now(timezone.utc),
-                upsert=True
-            )
+        with open_object(bucket_name, object_name, "image", scratch) as src:
+
+            # ✅ 2. Extension typo fixes
+            typo_map = {
+                ".ppng": ".png",
+                ".jiif": ".jfif",
+                ".jif": ".jfif",
+                ".jgp": ".jpg",
+                ".jpe": ".jpeg",
+                ".tif": ".tiff",
+            }
+            ext = typo_map.get(ext, ext)
+
+            # ✅ 3. HEIC support
+            if ext in (".heic", ".heif"):
+                from pillow_heif import register_heif_opener
+                register_heif_opener()
+
+            # ✅ 4. SVG → PNG
+            if ext == ".svg":
+                import cairosvg
+                src = io.BytesIO(cairosvg.svg2png(file_obj=src))
+                ext = ".png"
+
+            file_size = src.seek(0, io.SEEK_END)
+            src.seek(0)
+
+            # ✅ 5. Image processing
+            with stage("image", "parse"), Image.open(src) as img:
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+
+                complete(
+                    ImageFile, object_name,
+                    file_size=file_size,
+                    width=img.width,
+                    height=img.height,
+                    format=img.format or ext,
+                    meta_data={"mode": img.mode},
+                )
 
         logger.info(f"[TASK] ✅ ImageFile saved: {object_name}")
 
     except S3Error as exc:
+        fail(ImageFile, object_name, exc)
         # ✅ NEVER retry NoSuchKey
         if exc.code == "NoSuchKey":
             logger.warning(f"[TASK] ⏭️ Object vanished: {object_name}")
@@ -450,18 +667,11 @@ def process_image(self, bucket_name, object_name):
 
     except Exception as exc:
         logger.error(f"[TASK] ❌ Failed image {object_name}: {exc}")
-        ImageFile.objects(filename=object_name).update_one(
-            set__status="failed",
-            set__meta_data={"error": str(exc)},
-            set__created_at=datetime.now(timezone.utc),
-            upsert=True
-        )
+        fail(ImageFile, object_name, exc)
         raise self.retry(exc=exc)
 
     finally:
-        # ✅ Cleanup temp
-        if tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        scratch.release()
 
         # ✅ Move ONLY if still exists
         if bucket_name == "processing":
@@ -482,78 +692,79 @@ def process_image(self, bucket_name, object_name):
 # ------------------------------------
 
 
-@shared_task
-def process_doc(bucket_name, object_name):
+@shared_task(bind=True)
+def process_doc(self, bucket_name, object_name):
     print(f"[TASK] 📄 Document: {object_name}")
     ext = os.path.splitext(object_name)[-1].lower()
-    tmp = None
+    object_name = normalize_filename(object_name)
+    # Legacy formats need a LibreOffice instance: wait for one on the queue, not here
+    converter = libreoffice.acquire(self) if ext in (".doc", ".rtf") else None
     try:
-        fd, tmp = tempfile.mkstemp(suffix=ext)
-        os.close(fd)
-        object_name=normalize_filename(object_name)
-        minio_client.fget_object(bucket_name, object_name, tmp)
+        scratch = admit_scratch(self, bucket_name, object_name, "document")
+    except BaseException:
+        libreoffice.release(converter)
+        raise
+    if scratch is None:
+        libreoffice.release(converter)
+        return
+    if not claim(DocumentFile, object_name):
+        scratch.release()
+        libreoffice.release(converter)
+        print(f"[TASK] ⏭️ Document already claimed or processed: {object_name}")
+        return
 
-        text = ""
+    try:
+        with open_object(bucket_name, object_name, "document", scratch) as src, stage("document", "parse"):
+            text = ""
+            meta = {}
 
-        if ext == ".pdf":
-            with open(tmp, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
+            if ext == ".pdf":
+                reader = PyPDF2.PdfReader(src)
                 text = "\n".join(p.extract_text() or "" for p in reader.pages)
 
-        elif ext == ".docx":
-            doc = Document(tmp)
-            text = "\n".join(p.text for p in doc.paragraphs)
-
-        elif ext == ".odt":
-            from odf.opendocument import load
-            from odf import text as odf_text
-            odt_doc = load(tmp)
-            parts = []
-            for elem in odt_doc.getElementsByType(odf_text.P):
-                parts.append(str(elem))
-            text = "\n".join(parts)
-
-        elif ext == ".epub":
-            from ebooklib import epub
-            from bs4 import BeautifulSoup
-            book = epub.read_epub(tmp)
-            parts = []
-            for item in book.get_items_of_type(9):  # DOCUMENT
-                soup = BeautifulSoup(item.get_content(), "html.parser")
-                parts.append(soup.get_text(" ", strip=True))
-            text = "\n".join(parts)
-
-        else:
-            # fallback for .txt or unknown
-            with open(tmp, "r", encoding="utf-8", errors="ignore") as f:
-                text = f.read()
-
-        DocumentFile.objects.create(
-            filename=object_name,
+            elif ext == ".docx":
+                # Streams the XML parts: tables, headers, footers and notes included
+                text, meta["parts"] = extract_docx(src)
+
+            elif ext in (".doc", ".rtf"):
+                # Converted by the resident LibreOffice pool, then read as .docx
+                with local_path(src, ext, scratch) as path, libreoffice.converted(path, "docx", converter) as docx, \
+                        open(docx, "rb") as f:
+                    text, meta["parts"] = extract_docx(f)
+                meta["converted_from"] = ext
+
+            elif ext == ".odt":
+                # Streams content.xml: headings, lists, tables and notes included
+                text, odt_meta = extract_odt(src)
+                meta.update(odt_meta)
+
+            elif ext == ".epub":
+                # Streams the spine's chapters straight from the zip, in reading order
+                text, epub_meta = extract_epub(src)
+                meta.update(epub_meta)
+
+            else:
+                # fallback for .txt or unknown
+                text = src.read().decode("utf-8", errors="ignore")
+
+        complete(
+            DocumentFile, object_name,
             content=text,
-            status="completed",
-            meta_data={"ext": ext, "length": len(text)},
+            meta_data={"ext": ext, "length": len(text), **meta},
         )
         print(f"[TASK] ✅ Document processed: {object_name}")
 
     except Exception as e:
-        DocumentFile.objects.create(
-            filename=object_name,
-            content="",
-            status="failed",
-            meta_data={"error": str(e)},
-        )
+        fail(DocumentFile, object_name, e, content="")
         print(f"[TASK] ❌ Failed processing {object_name}: {e}")
 
     finally:
-        if tmp and os.path.exists(tmp):
-            os.remove(tmp)
+        libreoffice.release(converter)
+        scratch.release()
 
         if bucket_name == "processing":
             try:
                 archive_bucket = "archive"
-                doc = DocumentFile.objects(filename=object_name).first()
-                status = doc.status if doc else "completed"
                 success = move_object(bucket_name, object_name, archive_bucket)
                 if success:
                     print(f"[TASK] 📦 Moved '{object_name}' from '{bucket_name}' to '{archive_bucket}'")
@@ -568,43 +779,37 @@ def process_doc(bucket_name, object_name):
 
 @shared_task
 def process_html(bucket_name, filename):
+    if not claim(HtmlFile, filename):
+        print(f"[TASK] ⏭️ HTML already claimed or processed: {filename}")
+        return
+
     try:
         # Fetch HTML from MinIO
-        data = minio_client.get_object(bucket_name, filename).read().decode()
+        data = read_object(bucket_name, filename, "html").decode()
 
         # Parse HTML bookmarks
-        soup = BeautifulSoup(data, "html.parser")
-        bookmarks = []
+        with stage("html", "parse"):
+            soup = BeautifulSoup(data, "html.parser")
+            bookmarks = []
 
-        for a_tag in soup.find_all('a'):
-            bookmarks.append({
-                "name": a_tag.get_text(),
-                "url": a_tag.get('href')
-            })
+            for a_tag in soup.find_all('a'):
+                bookmarks.append({
+                    "name": a_tag.get_text(),
+                    "url": a_tag.get('href')
+                })
 
         # Convert to human-readable string (or JSON if you want)
         human_readable = "\n".join([f"{b['name']}: {b['url']}" for b in bookmarks])
 
         # Save in database
-        HtmlFile.objects.create(
-            filename=filename,
-            content=human_readable,
-            status="completed"
-        )
+        complete(HtmlFile, filename, content=human_readable)
         print(f"[TASK] ✅ HTML processed and converted: {filename}")
 
     except Exception as e:
-        HtmlFile.objects.create(
-            filename=filename,
-            content="",
-            status="failed",
-            meta_data={"error": str(e)}
-        )
+        fail(HtmlFile, filename, e, content="")
     if bucket_name == "processing":
         try:
             archive_bucket = "archive"
-            doc = HtmlFile.objects(filename=filename).first()
-            status = doc.status if doc else "completed"
             success = move_object(bucket_name, filename, archive_bucket)
             if success:
                 print(f"[TASK] 📦 Moved '{filename}' from '{bucket_name}' to '{archive_bucket}'")
@@ -618,17 +823,19 @@ def process_html(bucket_name, filename):
 
 @shared_task
 def process_json(bucket_name, filename):
+    if not claim(JsonFile, filename):
+        print(f"[TASK] ⏭️ JSON already claimed or processed: {filename}")
+        return
+
     try:
-        raw = minio_client.get_object(bucket_name, filename).read().decode()
-        JsonFile.objects.create(filename=filename, content=raw, status="completed")
+        raw = read_object(bucket_name, filename, "json").decode()
+        complete(JsonFile, filename, content=raw)
         print(f"[TASK] ✅ JSON processed: {filename}")
     except Exception as e:
-        JsonFile.objects.create(filename=filename, content="", status="failed", meta_data={"error": str(e)})
+        fail(JsonFile, filename, e, content="")
     if bucket_name == "processing":
         try:
             archive_bucket = "archive"
-            doc = JsonFile.objects(filename=filename).first()
-            status = doc.status if doc else "completed"
             success = move_object(bucket_name, filename, archive_bucket)
             if success:
                 print(f"[TASK] 📦 Moved '{filename}' from '{bucket_name}' to '{archive_bucket}'")
@@ -642,18 +849,21 @@ def process_json(bucket_name, filename):
 
 @shared_task
 def process_xml(bucket_name, filename):
+    if not claim(XmlFile, filename):
+        print(f"[TASK] ⏭️ XML already claimed or processed: {filename}")
+        return
+
     try:
-        raw = minio_client.get_object(bucket_name, filename).read().decode()
-        root = ET.fromstring(raw)
-        XmlFile.objects.create(filename=filename, content=raw, status="completed", meta_data={"root_tag": root.tag})
+        raw = read_object(bucket_name, filename, "xml").decode()
+        with stage("xml", "parse"):
+            root = ET.fromstring(raw)
+        complete(XmlFile, filename, content=raw, meta_data={"root_tag": root.tag})
         print(f"[TASK] ✅ XML processed: {filename}")
     except Exception as e:
-        XmlFile.objects.create(filename=filename, content="", status="failed", meta_data={"error": str(e)})
+        fail(XmlFile, filename, e, content="")
     if bucket_name == "processing":
         try:
             archive_bucket = "archive"
-            doc = XmlFile.objects(filename=filename).first()
-            status = doc.status if doc else "completed"
             success = move_object(bucket_name, filename, archive_bucket)
             if success:
                 print(f"[TASK] 📦 Moved '{filename}' from '{bucket_name}' to '{archive_bucket}'")
@@ -666,17 +876,19 @@ def process_xml(bucket_name, filename):
 
 @shared_task
 def process_log(bucket_name, filename):
+    if not claim(LogFile, filename):
+        print(f"[TASK] ⏭️ Log already claimed or processed: {filename}")
+        return
+
     try:
-        raw = minio_client.get_object(bucket_name, filename).read().decode()
-        LogFile.objects.create(filename=filename, content=raw, status="completed", meta_data={"length": len(raw)})
+        raw = read_object(bucket_name, filename, "log").decode()
+        complete(LogFile, filename, content=raw, meta_data={"length": len(raw)})
         print(f"[TASK] ✅ Log processed: {filename}")
     except Exception as e:
-        LogFile.objects.create(filename=filename, content="", status="failed", meta_data={"error": str(e)})
+        fail(LogFile, filename, e, content="")
     if bucket_name == "processing":
         try:
             archive_bucket = "archive"
-            doc = LogFile.objects(filename=filename).first()
-            status = doc.status if doc else "completed"
             success = move_object(bucket_name, filename, archive_bucket)
             if success:
                 print(f"[TASK] 📦 Moved '{filename}' from '{bucket_name}' to '{archive_bucket}'")
@@ -689,26 +901,26 @@ def process_log(bucket_name, filename):
 
 @shared_task(bind=True)
 def process_yaml(self, bucket_name, filename):
-    tmp_file = None
+    scratch = admit_scratch(self, bucket_name, filename, "yaml")
+    if scratch is None:
+        return
+    if not claim(YamlFile, filename):
+        scratch.release()
+        print(f"[TASK] ⏭️ YAML already claimed or processed: {filename}")
+        return
+
     try:
         print(f"[TASK] 📄 YAML: {filename}")
 
-        # Create temp file safely
-        fd, tmp_file = tempfile.mkstemp(suffix=".yaml")
-        os.close(fd)
-
-        # Download from MinIO
-        minio_client.fget_object(bucket_name, filename, tmp_file)
-
-        # Read YAML safely
-        with open(tmp_file, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        # Download from MinIO and read YAML safely
+        with open_object(bucket_name, filename, "yaml", scratch) as f:
+            with stage("yaml", "parse"):
+                data = yaml.safe_load(f)
 
         # Save to MongoDB
-        YamlFile.objects.create(
-            filename=filename,
+        complete(
+            YamlFile, filename,
             content=yaml.dump(data),
-            status="completed",
             meta_data={"keys": list(data.keys()) if isinstance(data, dict) else None},
         )
 
@@ -716,27 +928,15 @@ def process_yaml(self, bucket_name, filename):
 
     except Exception as e:
         # Save failure info
-        YamlFile.objects.create(
-            filename=filename,
-            content="",
-            status="failed",
-            meta_data={"error": str(e)},
-        )
+        fail(YamlFile, filename, e, content="")
         print(f"[TASK] ❌ Failed processing {filename}: {e}")
 
     finally:
-        # Clean up temp file
-        if tmp_file and os.path.exists(tmp_file):
-            try:
-                os.remove(tmp_file)
-            except Exception as cleanup_error:
-                print(f"[WARNING] Could not remove temp file {tmp_file}: {cleanup_error}")
+        scratch.release()
 
         if bucket_name == "processing":
             try:
                 archive_bucket = "archive"
-                doc = YamlFile.objects(filename=filename).first()
-                status = doc.status if doc else "completed"
                 success = move_object(bucket_name, filename, archive_bucket)
                 if success:
                     print(f"[TASK] 📦 Moved '{filename}' from '{bucket_name}' to '{archive_bucket}'")
@@ -750,55 +950,74 @@ def process_yaml(self, bucket_name, filename):
 logger = logging.getLogger(__name__)
 
 
+def store_slides(filename, slides):
+    """Replace the per-slide records of a presentation (collection ppt_slide)."""
+    coll = PPTSlide._get_collection()
+    now = datetime.now(timezone.utc)
+    with stage("presentation", "mongo_write"):
+        if slides:
+            coll.bulk_write([
+                UpdateOne({"filename": filename, "slide": s["slide"]},
+                          {"$set": s, "$setOnInsert": {"created_at": now}}, upsert=True)
+                for s in slides
+            ], ordered=False)
+        # A re-processed deck may have fewer slides than before
+        coll.delete_many({"filename": filename, "slide": {"$gt": len(slides)}})
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def process_ppt(self, bucket_name, filename):
     """
     Task: Process PPT/PPTX files from MinIO 'processing' bucket.
     Extracts text content and moves completed files to 'archive' bucket.
     """
-    path = None
     status = "failed"  # default status, will change to completed later
+    filename = normalize_filename(filename)
+    ext = os.path.splitext(filename)[-1].lower()
+    converter = libreoffice.acquire(self) if ext == ".ppt" else None
+    try:
+        scratch = admit_scratch(self, bucket_name, filename, "presentation")
+    except BaseException:
+        libreoffice.release(converter)
+        raise
+    if scratch is None:
+        libreoffice.release(converter)
+        return
+    if not claim(PPTFile, filename):
+        scratch.release()
+        libreoffice.release(converter)
+        logger.info(f"[TASK] ⏭️ PPT already claimed or processed: {filename}")
+        return
 
     try:
-        filename = normalize_filename(filename)
         logger.info(f"[TASK] 📊 Processing PPT file: {filename}")
 
-        # Temporary local file
-        fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[-1])
-        os.close(fd)
-
-        # Download file from MinIO
-        minio_client.fget_object(bucket_name, filename, path)
-
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Downloaded file not found: {path}")
-
-        # Extract PPT text and slide count
-        extracted_text, slide_count = extract_ppt_text(path)
+        # Download file from MinIO and walk the slides (text, tables, groups, notes)
+        with open_object(bucket_name, filename, "presentation", scratch) as src:
+            with stage("presentation", "parse"):
+                if ext == ".ppt":
+                    # Converted by the resident LibreOffice pool, then read as .pptx
+                    with local_path(src, ext, scratch) as path, libreoffice.converted(path, "pptx", converter) as pptx, \
+                            open(pptx, "rb") as f:
+                        extracted_text, slides = extract_pptx(f)
+                else:
+                    extracted_text, slides = extract_pptx(src)
 
+        store_slides(filename, slides)
+        meta_data = {
+            "slides": len(slides),
+            "slides_with_notes": sum(1 for s in slides if s["notes"]),
+            "hidden_slides": sum(1 for s in slides if s["hidden"]),
+        }
         # Save document info to MongoDB
-        doc = PPTFile(
-            filename=filename,
-            content=extracted_text,
-            status="completed",
-            meta_data={"slides": slide_count},
-            created_at=datetime.now(timezone.utc)
-        )
-        doc.save()
-        status = "completed"
-        logger.info(f"[TASK] ✅ PPTFile saved successfully: {doc.id}")
+        if complete(PPTFile, filename, content=extracted_text, meta_data=meta_data):
+            status = "completed"
+            logger.info(f"[TASK] ✅ PPTFile saved successfully: {filename}")
 
     except Exception as exc:
         logger.error(f"[TASK] ❌ Failed to process {filename}: {exc}")
         try:
-            doc = PPTFile(
-                filename=filename,
-                content="",
-                status="failed",
-                meta_data={"error": str(exc)},
-                created_at=datetime.now(timezone.utc)
-            )
-            doc.save()
+            fail(PPTFile, filename, exc, content="")
         except Exception as e:
             logger.error(f"[TASK] ❌ Failed saving failed PPT record: {e}")
 
@@ -808,6 +1027,9 @@ def process_ppt(self, bucket_name, filename):
             logger.error(f"[TASK] Max retries reached for {filename}")
 
     finally:
+        libreoffice.release(converter)
+        scratch.release()
+
         # ✅ Move to archive only if status == "completed"
         if bucket_name == "processing" and status == "completed":
             try:
@@ -818,11 +1040,6 @@ def process_ppt(self, bucket_name, filename):
             except Exception as e:
                 logger.error(f"[TASK] ⚠️ Could not move '{filename}' to archive: {e}")
 
-        # 🧹 Clean up temporary file
-        if path and os.path.exists(path):
-            os.remove(path)
-            logger.info(f"[TASK] 🧹 Cleaned up temp file: {path}")
-
 # @shared_task
 # def process_ppt(bucket_name, filename):
 #     tmp, converted = None, None
@@ -907,75 +1124,79 @@ def process_ppt(self, bucket_name, filename):
 
 @shared_task(bind=True, autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
 def process_spreadsheet(self, bucket_name, filename):
-    tmp = None
+    ext = os.path.splitext(filename)[-1].lower()
+    # Without xlrd, .xls goes through the LibreOffice pool
+    converter = libreoffice.acquire(self) if ext == ".xls" and importlib.util.find_spec("xlrd") is None else None
     try:
-        ext = os.path.splitext(filename)[-1].lower()
-        fd, tmp = tempfile.mkstemp(suffix=ext)
-        os.close(fd)
-
-        # Download file from MinIO
-        minio_client.fget_object(bucket_name, filename, tmp)
-
-        # Read spreadsheet based on extension
-        if ext == ".csv":
-            df = pd.read_csv(tmp)
+        scratch = admit_scratch(self, bucket_name, filename, "spreadsheet")
+    except BaseException:
+        libreoffice.release(converter)
+        raise
+    if scratch is None:
+        libreoffice.release(converter)
+        return
+    if not claim(SpreadsheetFile, filename):
+        scratch.release()
+        libreoffice.release(converter)
+        print(f"[TASK] ⏭️ Spreadsheet already claimed or processed: {filename}")
+        return
 
-        elif ext == ".xlsx":
-            try:
-                import openpyxl
-                df = pd.read_excel(tmp, engine="openpyxl")
-            except ImportError as ie:
-                raise RuntimeError(
-                    "Missing dependency 'openpyxl'. Install with `pip install openpyxl`."
-                ) from ie
-
-        elif ext == ".xls":
-            try:
-                import xlrd
-                df = pd.read_excel(tmp, engine="xlrd")
-            except ImportError as ie:
-                raise RuntimeError(
-                    "Missing dependency 'xlrd'. Install with `pip install xlrd`."
-                ) from ie
-
-        elif ext == ".ods":
-            try:
-                df = pd.read_excel(tmp, engine="odf")
-            except ImportError as ie:
-                raise RuntimeError(
-                    "Missing dependency 'odfpy'. Install with `pip install odfpy`."
-                ) from ie
+    try:
 
-        else:
-            raise ValueError(f"Unsupported spreadsheet format: {ext}")
+        # Download file from MinIO
+        with open_object(bucket_name, filename, "spreadsheet", scratch) as tmp, stage("spreadsheet", "parse"):
+            # Read spreadsheet based on extension
+            if ext == ".csv":
+                df = pd.read_csv(tmp)
+
+            elif ext == ".xlsx":
+                try:
+                    import openpyxl
+                    df = pd.read_excel(tmp, engine="openpyxl")
+                except ImportError as ie:
+                    raise RuntimeError(
+                        "Missing dependency 'openpyxl'. Install with `pip install openpyxl`."
+                    ) from ie
+
+            elif ext == ".xls":
+                try:
+                    import xlrd
+                    df = pd.read_excel(tmp, engine="xlrd")
+                except ImportError:
+                    # No xlrd: let the LibreOffice pool turn it into .xlsx
+                    with local_path(tmp, ext, scratch) as path, libreoffice.converted(path, "xlsx", converter) as xlsx:
+                        df = pd.read_excel(xlsx, engine="openpyxl")
+
+            elif ext == ".ods":
+                try:
+                    df = pd.read_excel(tmp, engine="odf")
+                except ImportError as ie:
+                    raise RuntimeError(
+                        "Missing dependency 'odfpy'. Install with `pip install odfpy`."
+                    ) from ie
+
+            else:
+                raise ValueError(f"Unsupported spreadsheet format: {ext}")
 
         # Save result
-        SpreadsheetFile.objects.create(
-            filename=filename,
+        complete(
+            SpreadsheetFile, filename,
             content=df.to_csv(index=False),
-            status="completed",
             meta_data={"columns": list(df.columns), "num_rows": len(df)},
         )
         print(f"[TASK] ✅ Spreadsheet processed: {filename}")
 
     except Exception as e:
-        SpreadsheetFile.objects.create(
-            filename=filename,
-            content="",
-            status="failed",
-            meta_data={"error": str(e)},
-        )
+        fail(SpreadsheetFile, filename, e, content="")
         print(f"[TASK] ❌ Failed spreadsheet {filename}: {e}")
 
     finally:
-        if tmp and os.path.exists(tmp):
-            os.remove(tmp)
+        libreoffice.release(converter)
+        scratch.release()
 
         if bucket_name == "processing":
             try:
                 archive_bucket = "archive"
-                doc = SpreadsheetFile.objects(filename=filename).first()
-                status = doc.status if doc else "completed"
                 success = move_object(bucket_name, filename, archive_bucket)
                 if success:
                     print(f"[TASK] 📦 Moved '{filename}' from '{bucket_name}' to '{archive_bucket}'")
@@ -988,107 +1209,98 @@ def process_spreadsheet(self, bucket_name, filename):
 
 
 
-@shared_task
-def process_archive(bucket_name, object_name):
+@shared_task(bind=True)
+def process_archive(self, bucket_name, object_name):
     print(f"[TASK] ➡️ Processing archive: {object_name}")
     ext = os.path.splitext(object_name)[-1].lower()
-    tmp = None
+    scratch = admit_scratch(self, bucket_name, object_name, "archive")
+    if scratch is None:
+        return
+    if not claim(ArchiveFile, object_name):
+        scratch.release()
+        print(f"[TASK] ⏭️ Archive already claimed or processed: {object_name}")
+        return
 
     try:
         # Download object from MinIO
-        fd, tmp = tempfile.mkstemp(suffix=ext)
-        os.close(fd)
-        minio_client.fget_object(bucket_name, object_name, tmp)
-
-        file_list = []
-
-        # -------- Detect real filetype --------
-        kind = filetype.guess(tmp)
-        if kind:
-            print(f"[DEBUG] Detected type: {kind.mime} ({kind.extension})")
-            real_ext = f".{kind.extension}"
-        else:
-            print("[DEBUG] Could not detect file type, falling back to extension")
-            real_ext = ext
-
-        # -------- ZIP --------
-        if real_ext == ".zip":
-            print("[DEBUG] Using zipfile")
-            with zipfile.ZipFile(tmp, "r") as zf:
-                file_list = zf.namelist()
-
-        # -------- TAR & compressed TAR --------
-        elif real_ext in (".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tar.xz"):
-            print("[DEBUG] Using tarfile (auto-detect compression)")
-            with tarfile.open(tmp, "r:*") as tf:
-                file_list = tf.getnames()
-
-        # -------- GZ (single file, not tar.gz) --------
-        elif real_ext == ".gz":
-            print("[DEBUG] Using gzip (single file)")
-            try:
-                with gzip.open(tmp, "rb") as gz:
-                    inner_name = os.path.basename(object_name).replace(".gz", "")
-                    out_tmp = tmp + "_decompressed"
-                    with open(out_tmp, "wb") as out_f:
-                        out_f.write(gz.read())
-                    file_list = [inner_name]
-            except OSError:
-                raise RuntimeError("File has .gz extension but is not a valid gzip file")
-
-        # -------- 7Z --------
-        elif real_ext == ".7z":
-            print("[DEBUG] Using py7zr")
-            with open(tmp, "rb") as f:
-                sig = f.read(6)
-            if sig != b"7z\xbc\xaf\x27\x1c":
-                raise RuntimeError("Not a valid 7z archive (wrong header)")
-            with py7zr.SevenZipFile(tmp, "r") as zf:
-                file_list = zf.getnames()
-
-        # -------- RAR --------
-        elif real_ext == ".rar":
-            print("[DEBUG] Using rarfile")
-            try:
-                with rarfile.RarFile(tmp, "r") as rf:
-                    file_list = rf.namelist()
-            except rarfile.Error as e:
-                raise RuntimeError(f"Invalid RAR file (unrar not installed?): {e}")
-
-        else:
-            raise RuntimeError(f"Unsupported or unrecognized archive type: {real_ext}")
+        with open_object(bucket_name, object_name, "archive", scratch) as tmp, stage("archive", "parse"):
+            file_list = []
+
+            # -------- Detect real filetype --------
+            kind = filetype.guess(tmp)
+            if kind:
+                print(f"[DEBUG] Detected type: {kind.mime} ({kind.extension})")
+                real_ext = f".{kind.extension}"
+            else:
+                print("[DEBUG] Could not detect file type, falling back to extension")
+                real_ext = ext
+
+            # -------- ZIP --------
+            if real_ext == ".zip":
+                print("[DEBUG] Using zipfile")
+                with zipfile.ZipFile(tmp, "r") as zf:
+                    file_list = zf.namelist()
+
+            # -------- TAR & compressed TAR --------
+            elif real_ext in (".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tar.xz"):
+                print("[DEBUG] Using tarfile (auto-detect compression)")
+                with tarfile.open(fileobj=tmp, mode="r:*") as tf:
+                    file_list = tf.getnames()
+
+            # -------- GZ (single file, not tar.gz) --------
+            elif real_ext == ".gz":
+                print("[DEBUG] Using gzip (single file)")
+                try:
+                    with gzip.GzipFile(fileobj=tmp, mode="rb") as gz:
+                        inner_name = os.path.basename(object_name).replace(".gz", "")
+                        # Decompress in chunks only to validate the stream
+                        while gz.read(MB):
+                            pass
+                        file_list = [inner_name]
+                except OSError:
+                    raise RuntimeError("File has .gz extension but is not a valid gzip file")
+
+            # -------- 7Z --------
+            elif real_ext == ".7z":
+                print("[DEBUG] Using py7zr")
+                sig = tmp.read(6)
+                tmp.seek(0)
+                if sig != b"7z\xbc\xaf\x27\x1c":
+                    raise RuntimeError("Not a valid 7z archive (wrong header)")
+                with py7zr.SevenZipFile(tmp, "r") as zf:
+                    file_list = zf.getnames()
+
+            # -------- RAR --------
+            elif real_ext == ".rar":
+                print("[DEBUG] Using rarfile")
+                try:
+                    with rarfile.RarFile(tmp, "r") as rf:
+                        file_list = rf.namelist()
+                except rarfile.Error as e:
+                    raise RuntimeError(f"Invalid RAR file (unrar not installed?): {e}")
+
+            else:
+                raise RuntimeError(f"Unsupported or unrecognized archive type: {real_ext}")
 
         # Save success
-        ArchiveFile.objects.create(
-            filename=object_name,
+        complete(
+            ArchiveFile, object_name,
             content="\n".join(file_list),
-            status="completed",
-            meta_data={"num_files": len(file_list)}
+            meta_data={"num_files": len(file_list)},
         )
         print(f"[TASK] ✅ Archive processed: {object_name} with {len(file_list)} files")
 
     except Exception as e:
         # Save failure
-        ArchiveFile.objects.create(
-            filename=object_name,
-            content="",
-            status="failed",
-            meta_data={"error": str(e)}
-        )
+        fail(ArchiveFile, object_name, e, content="")
         print(f"[TASK] ❌ Failed processing {object_name}: {e}")
 
     finally:
-        if tmp and os.path.exists(tmp):
-            try:
-                os.remove(tmp)
-            except Exception:
-                pass
+        scratch.release()
 
         if bucket_name == "processing":
             try:
                 archive_bucket = "archive"
-                doc = ArchiveFile.objects(filename=object_name).first()
-                status = doc.status if doc else "completed"
                 success = move_object(bucket_name, object_name, archive_bucket)
                 if success:
                     print(f"[TASK] 📦 Moved '{object_name}' from '{bucket_name}' to '{archive_bucket}'")
@@ -1096,3 +1308,42 @@ def process_archive(bucket_name, object_name):
                 print(f"[TASK] ⚠️ Could not move '{object_name}' to archive: {e}")
 
 
+# ------------------------------------
+# HANDLER REGISTRY
+# ------------------------------------
+# One entry per file type. To add a format: write the task, then register it
+# here with its extensions (see xtr.registry.register_handler).
+
+# Media caps leave the Whisper model out (it is loaded before the claim): 3 GB
+# holds the decoded audio of about ten hours
+register_handler("audio", AudioFile, process_audio, queue=MEDIA_QUEUE, max_size=2048 * MB,
+                 memory_limit=3072 * MB, base_cost=5.0, cost_per_mb=1.5)
+register_handler("video", VideoFile, process_video, queue=MEDIA_QUEUE, max_size=16384 * MB,
+                 memory_limit=3072 * MB, base_cost=10.0, cost_per_mb=0.5)
+register_handler("image", ImageFile, process_image, max_size=200 * MB, memory_limit=1024 * MB,
+                 base_cost=0.2, cost_per_mb=0.1)
+# v2: DOCX tables, headers, footers and notes (xtr/extractors/word.py)
+# v3: .doc/.rtf through the LibreOffice pool instead of raw bytes as text
+# v4: EPUB/ODT streamed with chapter and paragraph breaks (xtr/extractors/ebook.py, opendocument.py)
+register_handler("document", DocumentFile, process_doc, memory_limit=1024 * MB,
+                 base_cost=0.3, cost_per_mb=0.5, version=4)
+# v2: .ppt through the LibreOffice pool
+# v3: notes, tables and grouped shapes, per-slide records (xtr/extractors/slides.py)
+register_handler("presentation", PPTFile, process_ppt, memory_limit=1024 * MB,
+                 base_cost=0.5, cost_per_mb=0.3, version=3)
+register_handler("spreadsheet", SpreadsheetFile, process_spreadsheet, max_size=500 * MB,
+                 memory_limit=2048 * MB, base_cost=0.3, cost_per_mb=1.0)
+register_handler("html", HtmlFile, process_html, max_size=100 * MB, memory_limit=512 * MB,
+                 base_cost=0.1, cost_per_mb=0.2)
+# Text formats are no longer bound by Mongo's 16 MB document limit: large
+# content is offloaded to the results bucket (xtr/content_store.py).
+register_handler("json", JsonFile, process_json, max_size=256 * MB, memory_limit=1536 * MB,
+                 base_cost=0.05, cost_per_mb=0.05)
+register_handler("xml", XmlFile, process_xml, max_size=256 * MB, memory_limit=1536 * MB,
+                 base_cost=0.05, cost_per_mb=0.1)
+register_handler("log", LogFile, process_log, max_size=256 * MB, memory_limit=1536 * MB,
+                 base_cost=0.05, cost_per_mb=0.05)
+register_handler("archive", ArchiveFile, process_archive, memory_limit=1024 * MB,
+                 base_cost=0.2, cost_per_mb=0.05)
+register_handler("yaml", YamlFile, process_yaml, max_size=64 * MB, memory_limit=1024 * MB,
+                 base_cost=0.05, cost_per_mb=0.1)
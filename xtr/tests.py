@@ -1,3 +1,630 @@
-from django.test import TestCase
+import io
+import os
+import unittest
+import zipfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import mongoengine
+from django.conf import settings
+from django.test import SimpleTestCase
+from mongoengine.connection import get_db
+from pymongo.errors import PyMongoError
+
+from xtr import (
+    claims, compression, feed, metrics, scheduling, scratch, tasks, transcription, transcripts, write_buffer,
+)
+from xtr.extractors.ebook import extract_epub
+from xtr.extractors.opendocument import extract_odt
+from xtr.extractors.slides import extract_pptx
+from xtr.extractors.word import extract_docx
+from xtr.models import DocumentFile, SearchEntry, TranscriptCache
+
+# Claim tests run against this scratch database, never the one settings.py connects to
+TEST_MONGODB_URI = os.getenv("XTR_TEST_MONGODB_URI", "mongodb://localhost:27017/xtremand_test")
+
+
+def _zip(parts):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+# -----------------------------
+# DOCX
+# -----------------------------
+W_NS = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+        'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+        'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+        'xmlns:v="urn:schemas-microsoft-com:vml"')
+
+
+def _docx(body, **parts):
+    return _zip({"word/document.xml": f"<w:document {W_NS}><w:body>{body}</w:body></w:document>", **parts})
+
+
+def _p(text):
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+class WordExtractorTests(SimpleTestCase):
+    def test_paragraphs_and_table_rows(self):
+        body = (_p("Intro") +
+                "<w:tbl><w:tr><w:tc>" + _p("a") + "</w:tc><w:tc>" + _p("b") + "</w:tc></w:tr></w:tbl>" +
+                _p("Outro"))
+        text, counts = extract_docx(_docx(body))
+        self.assertEqual(text, "Intro\na\tb\nOutro")
+        self.assertEqual(counts, {"body": 3})
+
+    def test_text_box_read_once_after_its_paragraph(self):
+        # Word writes a DrawingML text box with a VML copy in mc:Fallback
+        box = ("<w:r><mc:AlternateContent>"
+               "<mc:Choice Requires=\"wps\"><w:drawing><wps:txbx><w:txbxContent>" + _p("BOXTEXT") +
+               "</w:txbxContent></wps:txbx></w:drawing></mc:Choice>"
+               "<mc:Fallback><w:pict><v:textbox><w:txbxContent>" + _p("BOXTEXT") +
+               "</w:txbxContent></v:textbox></w:pict></mc:Fallback>"
+               "</mc:AlternateContent></w:r>")
+        body = f"<w:p><w:r><w:t>Before</w:t></w:r>{box}<w:r><w:t>After</w:t></w:r></w:p>" + _p("Next")
+        text, _ = extract_docx(_docx(body))
+        self.assertEqual(text, "BeforeAfter\nBOXTEXT\nNext")
+
+    def test_deleted_revisions_left_out(self):
+        body = ("<w:p><w:r><w:t xml:space=\"preserve\">kept </w:t></w:r>"
+                "<w:del><w:r><w:delText>removed</w:delText></w:r></w:del>"
+                "<w:ins><w:r><w:t>added</w:t></w:r></w:ins></w:p>")
+        text, _ = extract_docx(_docx(body))
+        self.assertEqual(text, "kept added")
+
+    def test_headers_deduplicated_and_notes_kept(self):
+        header = f"<w:hdr {W_NS}>" + _p("Confidential") + "</w:hdr>"
+        notes = f"<w:footnotes {W_NS}><w:footnote w:id=\"1\">" + _p("A note") + "</w:footnote></w:footnotes>"
+        text, counts = extract_docx(_docx(_p("Body"), **{
+            "word/header1.xml": header, "word/header2.xml": header, "word/footnotes.xml": notes}))
+        self.assertEqual(text, "Confidential\n\nBody\n\nA note")
+        self.assertEqual(counts, {"header": 1, "body": 1, "footnote": 1})
+
+
+# -----------------------------
+# PPTX
+# -----------------------------
+class SlidesExtractorTests(SimpleTestCase):
+    def _deck(self):
+        from pptx import Presentation
+        from pptx.util import Inches
+        prs = Presentation()
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = "Quarterly"
+        slide.placeholders[1].text = "Revenue up"
+        slide.notes_slide.notes_text_frame.text = "Say thanks"
+        table = slide.shapes.add_table(2, 2, Inches(1), Inches(4), Inches(4), Inches(1)).table
+        for r, row in enumerate([("k", "v"), ("a", "1")]):
+            for c, value in enumerate(row):
+                table.cell(r, c).text = value
+        group = slide.shapes.add_group_shape()
+        group.shapes.add_textbox(Inches(1), Inches(6), Inches(2), Inches(1)).text_frame.text = "grouped"
+        hidden = prs.slides.add_slide(prs.slide_layouts[5])
+        hidden.shapes.title.text = "Backup"
+        hidden._element.set("show", "0")
+        buf = io.BytesIO()
+        prs.save(buf)
+        buf.seek(0)
+        return buf
+
+    def test_slide_records(self):
+        text, slides = extract_pptx(self._deck())
+        first, second = slides
+        self.assertEqual(first["title"], "Quarterly")
+        self.assertEqual(first["text"], "Revenue up\nk\tv\na\t1\ngrouped")
+        self.assertEqual(first["notes"], "Say thanks")
+        self.assertEqual(first["table_rows"], 2)
+        self.assertFalse(first["hidden"])
+        self.assertEqual((second["slide"], second["title"], second["hidden"]), (2, "Backup", True))
+        self.assertEqual(text.split("\n\n")[1], "[Slide 2] Backup")
+        self.assertIn("Notes: Say thanks", text)
+
+
+# -----------------------------
+# EPUB
+# -----------------------------
+def _epub(chapters, spine):
+    opf = (
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0"><manifest>'
+        + "".join(f'<item id="{name}" href="text/{name}.xhtml" media-type="application/xhtml+xml"/>'
+                  for name in chapters)
+        + '<item id="css" href="style.css" media-type="text/css"/></manifest><spine>'
+        + "".join(f'<itemref idref="{name}"/>' for name in spine)
+        + "</spine></package>"
+    )
+    container = (
+        '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container" version="1.0"><rootfiles>'
+        '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+        "</rootfiles></container>"
+    )
+    parts = {"mimetype": "application/epub+zip", "META-INF/container.xml": container, "OEBPS/content.opf": opf}
+    for name, body in chapters.items():
+        parts[f"OEBPS/text/{name}.xhtml"] = (
+            '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>ignored</title>'
+            f"<style>p {{}}</style></head><body>{body}</body></html>"
+        )
+    return _zip(parts)
+
+
+class EbookExtractorTests(SimpleTestCase):
+    def test_spine_order_and_chapter_breaks(self):
+        book = _epub({"b": "<h1>Second</h1><p>two</p>", "a": "<h1>First</h1><p>one<br/>line</p>"},
+                     spine=["a", "b"])
+        text, meta = extract_epub(book)
+        self.assertEqual(text, "First\none line\n\nSecond\ntwo")
+        self.assertEqual(meta, {"chapters": 2, "headings": 2})
+
+    def test_blocks_lists_and_tables(self):
+        body = ("<nav><p>contents</p></nav>"
+                "<ul><li>Item <b>A</b><ul><li>A1</li></ul></li><li>B</li></ul>"
+                "<div>loose<p>inner</p>tail</div>"
+                "<table><tr><th>k</th><th>v</th></tr><tr><td><p>x</p></td><td>1</td></tr></table>")
+        text, _ = extract_epub(_epub({"c": body}, spine=["c"]))
+        self.assertEqual(text.split("\n"), ["Item A", "A1", "B", "loose", "inner", "tail", "k\tv", "x\t1"])
+
+
+# -----------------------------
+# ODT
+# -----------------------------
+ODF_NS = ('xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+          'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+          'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+          'xmlns:dc="http://purl.org/dc/elements/1.1/"')
+
+
+def _odt(body):
+    return _zip({"content.xml": f"<office:document-content {ODF_NS}><office:body><office:text>"
+                                f"{body}</office:text></office:body></office:document-content>"})
+
+
+class OpenDocumentExtractorTests(SimpleTestCase):
+    def test_whitespace_elements_restored(self):
+        body = ('<text:p>a<text:s text:c="3"/>b<text:tab/>c<text:line-break/>d  \n  e</text:p>')
+        text, _ = extract_odt(_odt(body))
+        self.assertEqual(text, "a   b\tc\nd e")
+
+    def test_notes_follow_their_paragraph_and_revisions_are_skipped(self):
+        body = (
+            '<text:tracked-changes><text:changed-region><text:deletion>'
+            "<text:p>deleted</text:p></text:deletion></text:changed-region></text:tracked-changes>"
+            '<text:p>Claim<text:note text:note-class="footnote"><text:note-citation>1</text:note-citation>'
+            "<text:note-body><text:p>Source</text:p></text:note-body></text:note> holds"
+            "<office:annotation><dc:creator>me</dc:creator><text:p>comment</text:p></office:annotation></text:p>"
+        )
+        text, _ = extract_odt(_odt(body))
+        self.assertEqual(text, "Claim holds\nSource")
+
+    def test_headings_lists_and_tables(self):
+        body = (
+            '<text:h text:outline-level="1">Intro</text:h><text:p>first</text:p>'
+            "<text:list><text:list-item><text:p>item</text:p></text:list-item></text:list>"
+            '<table:table><table:table-row><table:table-cell><text:p>a</text:p></table:table-cell>'
+            "<table:table-cell><text:p>b</text:p></table:table-cell><table:table-cell/></table:table-row>"
+            "</table:table>"
+            '<text:h text:outline-level="1">Next</text:h>'
+        )
+        text, meta = extract_odt(_odt(body))
+        self.assertEqual(text, "Intro\nfirst\nitem\na\tb\n\nNext")
+        self.assertEqual(meta, {"paragraphs": 2, "headings": 2, "table_rows": 1})
+
+
+# -----------------------------
+# Compression
+# -----------------------------
+@mock.patch.object(compression, "ENABLED", True)
+class CompressionTests(SimpleTestCase):
+    text = "Überblick: " + "the quick brown fox jumps over the lazy dog. " * 40
+
+    @mock.patch.object(compression, "latest_dict", return_value=None)
+    def test_round_trip(self, _):
+        stored = compression.encode("document", self.text)
+        self.assertTrue(compression.is_compressed(stored))
+        self.assertLess(len(stored), len(self.text.encode("utf-8")))
+        self.assertEqual(compression.decode(stored), self.text)
+
+    def test_round_trip_with_dictionary(self):
+        import zstandard
+        samples = [f"Invoice {i}: total {i * 7} EUR, due in {i % 30} days. " * 20 for i in range(200)]
+        zdict = zstandard.train_dictionary(4096, [s.encode("utf-8") for s in samples])
+        with mock.patch.object(compression, "latest_dict", return_value=zdict), \
+                mock.patch.object(compression, "_dict_by_id", return_value=zdict) as by_id:
+            stored = compression.encode("document", samples[0])
+            self.assertEqual(compression.decode(stored), samples[0])
+        by_id.assert_called_once_with(zdict.dict_id())
+
+    def test_small_or_disabled_values_stay_plain(self):
+        self.assertEqual(compression.encode("document", "short"), "short")
+        self.assertIsNone(compression.encode("document", None))
+        with mock.patch.object(compression, "ENABLED", False):
+            self.assertEqual(compression.encode("document", self.text), self.text)
+        self.assertEqual(compression.decode("plain"), "plain")
+
+    @mock.patch.object(compression, "latest_dict", return_value=None)
+    def test_field_decodes_on_access(self, _):
+        stored = compression.encode("document", self.text)
+        doc = DocumentFile._from_son({"filename": "a.txt", "status": "completed", "content": stored})
+        self.assertEqual(doc.content, self.text)
+        self.assertEqual(DocumentFile._from_son({"filename": "b.txt", "content": "legacy"}).content, "legacy")
+        self.assertTrue(compression.is_compressed(DocumentFile.content.to_mongo(self.text)))
+
+
+# -----------------------------
+# Write buffer
+# -----------------------------
+class FakeModel:
+    """Stands in for a mongoengine document class: just enough for WriteBuffer."""
+
+    def __init__(self, name, bulk_result=None, error=None, finished=()):
+        self.__name__ = name
+        self.collection = mock.Mock()
+        if error is not None:
+            self.collection.bulk_write.side_effect = error
+        self.collection.bulk_write.return_value = bulk_result
+        self.collection.find.return_value = list(finished)
+
+    def _get_collection(self):
+        return self.collection
+
+    def _get_collection_name(self):
+        return self.__name__
+
+
+def _matched(n):
+    return SimpleNamespace(matched_count=n, upserted_count=0)
+
+
+@mock.patch.object(feed, "publish")
+@mock.patch.object(metrics, "record_result")
+class WriteBufferTests(SimpleTestCase):
+    def _add(self, buffer, model, filename, status="completed"):
+        buffer.add(model, {"filename": filename}, {"$set": {"status": status}},
+                   status=status, event=f"{model.__name__}:{filename}")
+
+    def test_flush_writes_one_batch_per_collection(self, record_result, publish):
+        docs, audio = FakeModel("docs", _matched(2)), FakeModel("audio", _matched(1))
+        buffer = write_buffer.WriteBuffer(max_pending=10)
+        self._add(buffer, docs, "a")
+        self._add(buffer, docs, "b")
+        self._add(buffer, audio, "c", status="failed")
+        buffer.flush()
+        self.assertEqual(len(docs.collection.bulk_write.call_args.args[0]), 2)
+        self.assertEqual(len(audio.collection.bulk_write.call_args.args[0]), 1)
+        self.assertCountEqual([c.args for c in record_result.call_args_list],
+                              [(docs, "completed"), (docs, "completed"), (audio, "failed")])
+        self.assertCountEqual([c.args[0] for c in publish.call_args_list], [["docs:a", "docs:b"], ["audio:c"]])
+        buffer.flush()
+        self.assertEqual(docs.collection.bulk_write.call_count, 1)
+
+    def test_failed_collection_does_not_hold_back_others(self, record_result, publish):
+        docs, audio = FakeModel("docs", error=PyMongoError("down")), FakeModel("audio", _matched(1))
+        buffer = write_buffer.WriteBuffer(max_pending=10)
+        self._add(buffer, docs, "a")
+        self._add(buffer, audio, "c")
+        buffer.flush()
+        record_result.assert_called_once_with(audio, "completed")
+        publish.assert_called_once_with(["audio:c"])
+
+    def test_partial_match_counts_applied_updates_only(self, record_result, publish):
+        docs = FakeModel("docs", _matched(1), finished=[{"filename": "a", "status": "completed"}])
+        buffer = write_buffer.WriteBuffer(max_pending=10)
+        self._add(buffer, docs, "a")
+        self._add(buffer, docs, "b")
+        buffer.flush()
+        record_result.assert_called_once_with(docs, "completed")
+        publish.assert_called_once_with(["docs:a"])
+
+    def test_dependent_upserts_follow_applied_updates_only(self, record_result, publish):
+        docs = FakeModel("docs", _matched(1), finished=[{"filename": "a", "status": "completed"}])
+        index = FakeModel("search_index", _matched(1))
+        buffer = write_buffer.WriteBuffer(max_pending=10)
+        for name in ("a", "b"):
+            buffer.add(docs, {"filename": name}, {"$set": {"status": "completed"}}, status="completed",
+                       after=[(index, {"filename": name}, {"$set": {"text": name}})])
+        buffer.flush()
+        ops = index.collection.bulk_write.call_args.args[0]
+        self.assertEqual([op._filter for op in ops], [{"filename": "a"}])
+
+    def test_full_buffer_flushes_from_add(self, record_result, publish):
+        docs = FakeModel("docs", _matched(2))
+        buffer = write_buffer.WriteBuffer(max_pending=2)
+        self._add(buffer, docs, "a")
+        docs.collection.bulk_write.assert_not_called()
+        self._add(buffer, docs, "b")
+        docs.collection.bulk_write.assert_called_once()
+
+    def test_sync_write_reports_whether_it_applied(self, record_result, publish):
+        self.assertTrue(write_buffer.add(FakeModel("docs", _matched(1)), {"filename": "a"}, {}, sync=True,
+                                         status="failed"))
+        self.assertFalse(write_buffer.add(FakeModel("docs", _matched(0)), {"filename": "a"}, {}, sync=True,
+                                          status="failed"))
+        self.assertFalse(write_buffer.add(FakeModel("docs", error=PyMongoError("down")), {"filename": "a"}, {},
+                                          sync=True, status="failed"))
+        record_result.assert_called_once()
+
+
+# -----------------------------
+# Transcription profiles
+# -----------------------------
+class TranscriptionChoiceTests(SimpleTestCase):
+    def test_language_hint_checked_against_faster_whisper(self):
+        meta = {"X-Amz-Meta-Language": " YUE "}
+        self.assertEqual(transcription.choose("talk.mp3", meta), (transcription.DEFAULT_PROFILE, "yue"))
+        self.assertEqual(transcription.choose("talk.mp3", {"x-amz-meta-language": "klingon"})[1], None)
+
+    def test_language_list_unavailable_ignores_hint(self):
+        with mock.patch.dict("sys.modules", {"faster_whisper.tokenizer": None}):
+            self.assertIsNone(transcription.choose("talk.mp3", {"x-amz-meta-language": "en"})[1])
+
+    def test_profile_from_metadata(self):
+        profile, _ = transcription.choose("talk.mp3", {"x-amz-meta-transcription-profile": "Fast"})
+        self.assertEqual(profile, "fast")
+
+
+# -----------------------------
+# Dispatch
+# -----------------------------
+class DiscoveryTests(SimpleTestCase):
+    def _discover(self, filename, stat_size=None, **kwargs):
+        """Run auto_discover_and_process for one new file; returns (apply_async, reject_too_large, stat_object)."""
+        handler = tasks.get_handler(tasks.detect_file_type(filename))
+        collection = mock.Mock()
+        collection.find.return_value = []
+        with mock.patch.object(handler.model, "_get_collection", return_value=collection), \
+                mock.patch.object(handler.task, "apply_async") as apply_async, \
+                mock.patch.object(tasks, "reject_too_large") as reject_too_large, \
+                mock.patch.object(tasks.minio_client, "stat_object",
+                                  return_value=SimpleNamespace(size=stat_size)) as stat_object:
+            tasks.auto_discover_and_process("processing", filename, **kwargs)
+        return apply_async, reject_too_large, stat_object
+
+    def test_single_file_is_sized_from_stat(self):
+        apply_async, reject_too_large, _ = self._discover("talk.mp4", stat_size=4096 * scheduling.MB)
+        apply_async.assert_called_once_with(args=("processing", "talk.mp4"), queue=scheduling.LARGE_MEDIA_QUEUE,
+                                            priority=scheduling.PRIORITY_BY_CLASS["large"])
+        reject_too_large.assert_not_called()
+
+    def test_single_file_uses_the_size_it_was_given(self):
+        apply_async, _, stat_object = self._discover("notes.json", size=1024)
+        stat_object.assert_not_called()
+        self.assertEqual(apply_async.call_args.kwargs["priority"], scheduling.PRIORITY_BY_CLASS["small"])
+
+    def test_single_file_over_the_type_limit_is_rejected(self):
+        handler = tasks.get_handler("image")
+        apply_async, reject_too_large, _ = self._discover("scan.png", stat_size=handler.max_size + 1)
+        apply_async.assert_not_called()
+        reject_too_large.assert_called_once_with(handler.model, "scan.png", handler.max_size + 1, handler.max_size)
+
+
+class ScratchAdmissionTests(SimpleTestCase):
+    def test_type_size_limit_checked_in_the_task(self):
+        handler = tasks.get_handler("video")
+        size = handler.max_size + 1
+        with mock.patch.object(tasks.minio_client, "stat_object", return_value=SimpleNamespace(size=size)), \
+                mock.patch.object(claims, "reject_too_large") as reject_too_large:
+            self.assertIsNone(scratch.admit_scratch(mock.Mock(), "processing", "long.mp4", "video"))
+        reject_too_large.assert_called_once_with(handler.model, "long.mp4", size, handler.max_size)
+
+    def test_small_document_needs_no_reservation(self):
+        with mock.patch.object(tasks.minio_client, "stat_object", return_value=SimpleNamespace(size=1024)):
+            reservation = scratch.admit_scratch(mock.Mock(), "processing", "a.pdf", "document")
+        self.assertIsNone(reservation.token)
+
+
+# -----------------------------
+# Event feed
+# -----------------------------
+class FeedStreamTests(SimpleTestCase):
+    def test_event_ids(self):
+        self.assertTrue(feed.valid_id("$"))
+        self.assertTrue(feed.valid_id("1718000000000-3"))
+        for bad in ("", "0", "abc", "1-2-3", "1-0\n"):
+            self.assertFalse(feed.valid_id(bad), bad)
+
+    @mock.patch.object(feed, "_redis")
+    def test_open_streams_are_capped(self, redis):
+        redis.return_value.xrevrange.return_value = []
+        with mock.patch.object(feed, "_streams", feed.threading.BoundedSemaphore(1)):
+            stream = feed.open_stream()
+            self.assertIsNone(feed.open_stream())
+            self.assertEqual(next(iter(stream)), "retry: 1000\n\n")
+            stream.close()
+            stream.close()
+            self.assertIsNotNone(feed.open_stream())
+
+# -----------------------------
+# Claims (MongoDB)
+# -----------------------------
+class MongoTestCase(SimpleTestCase):
+    """Points mongoengine at TEST_MONGODB_URI for the class; skipped when it isn't reachable."""
+    models = ()
+
+    @classmethod
+    def setUpClass(cls):
+        mongoengine.disconnect()
+        mongoengine.connect(host=TEST_MONGODB_URI, serverSelectionTimeoutMS=2000)
+        try:
+            get_db().command("ping")
+        except PyMongoError as e:
+            cls._reconnect()
+            raise unittest.SkipTest(f"MongoDB not reachable at {TEST_MONGODB_URI}: {e}")
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        get_db().client.drop_database(get_db().name)
+        cls._reconnect()
+
+    @classmethod
+    def _reconnect(cls):
+        mongoengine.disconnect()
+        mongoengine.connect(db="xtremand_db", host=settings.MONGODB_URI, connectTimeoutMS=5000)
+
+    def setUp(self):
+        for model in self.models:
+            model.drop_collection()
+            model.ensure_indexes()
+
+
+class ClaimTests(MongoTestCase):
+    models = (DocumentFile, SearchEntry)
+
+    def tearDown(self):
+        claims.discard_usage()
+
+    def _record(self, filename, **fields):
+        return DocumentFile._get_collection().insert_one({"filename": filename, **fields})
+
+    def _get(self, filename):
+        return DocumentFile._get_collection().find_one({"filename": filename})
+
+    def test_claim_creates_and_leases(self):
+        self.assertTrue(claims.claim(DocumentFile, "a.pdf"))
+        doc = self._get("a.pdf")
+        self.assertEqual(doc["status"], "processing")
+        self.assertEqual(doc["claimed_by"], claims.worker_id())
+        self.assertGreater(doc["lease_expires_at"].replace(tzinfo=None), doc["created_at"].replace(tzinfo=None))
+
+    def test_claim_lost_while_leased_or_completed(self):
+        self.assertTrue(claims.claim(DocumentFile, "a.pdf"))
+        self.assertFalse(claims.claim(DocumentFile, "a.pdf"))
+        self._record("b.pdf", status="completed")
+        self.assertFalse(claims.claim(DocumentFile, "b.pdf"))
+        self.assertEqual(self._get("b.pdf")["status"], "completed")
+
+    def test_claimable_statuses_and_expired_leases(self):
+        for status in claims.CLAIMABLE_STATUSES:
+            self._record(f"{status}.pdf", status=status)
+            self.assertTrue(claims.claim(DocumentFile, f"{status}.pdf"), status)
+        self._record("stuck.pdf", status="processing", claimed_by="dead:1",
+                     lease_expires_at=claims._now() - timedelta(seconds=1))
+        self.assertTrue(claims.claim(DocumentFile, "stuck.pdf"))
+        self.assertEqual(self._get("stuck.pdf")["claimed_by"], claims.worker_id())
+
+    def test_release_expired(self):
+        expired = claims._now() - timedelta(seconds=1)
+        self._record("late.pdf", status="processing", claimed_by="dead:1", lease_expires_at=expired)
+        self._record("alive.pdf", status="processing", claimed_by="w:2",
+                     lease_expires_at=claims._now() + timedelta(minutes=5))
+        self.assertEqual([f for f, _ in claims.expired_claims(DocumentFile)], ["late.pdf"])
+
+        self.assertEqual(claims.release_expired(DocumentFile, "late.pdf"), "requeue")
+        doc = self._get("late.pdf")
+        self.assertEqual((doc["status"], doc["reap_count"]), ("pending", 1))
+        self.assertNotIn("claimed_by", doc)
+        self.assertIsNone(claims.release_expired(DocumentFile, "late.pdf"))
+        self.assertIsNone(claims.release_expired(DocumentFile, "alive.pdf"))
+
+    def test_release_expired_gives_up_after_max_reaps(self):
+        self._record("crashy.pdf", status="processing", claimed_by="dead:1", reap_count=claims.MAX_REAPS,
+                     lease_expires_at=claims._now() - timedelta(seconds=1))
+        self.assertEqual(claims.release_expired(DocumentFile, "crashy.pdf"), "failed")
+        self.assertEqual(self._get("crashy.pdf")["status"], "failed")
+
+    def test_complete_releases_the_lease(self):
+        self.assertTrue(claims.claim(DocumentFile, "done.pdf"))
+        with mock.patch.object(feed, "publish"), mock.patch.object(write_buffer._BUFFER, "max_pending", 1):
+            self.assertTrue(claims.complete(DocumentFile, "done.pdf", content="text", meta_data={}))
+        doc = self._get("done.pdf")
+        self.assertEqual(doc["status"], "completed")
+        self.assertNotIn("lease_expires_at", doc)
+        # The lease is gone: a late duplicate can no longer overwrite the result
+        self.assertFalse(claims.fail(DocumentFile, "done.pdf", RuntimeError("late")))
+        self.assertEqual(self._get("done.pdf")["status"], "completed")
+
+    def test_lost_lease_writes_no_search_entry(self):
+        self.assertTrue(claims.claim(DocumentFile, "taken.pdf"))
+        DocumentFile._get_collection().update_one({"filename": "taken.pdf"}, {"$set": {"claimed_by": "other:1"}})
+        with mock.patch.object(feed, "publish"), mock.patch.object(write_buffer._BUFFER, "max_pending", 1):
+            self.assertFalse(claims.complete(DocumentFile, "taken.pdf", content="late text", meta_data={}))
+        self.assertEqual(SearchEntry._get_collection().count_documents({"filename": "taken.pdf"}), 0)
+
+    def test_failed_rerun_keeps_previous_result(self):
+        ref = {"bucket": "results", "key": "old.pdf"}
+        self._record("old.pdf", status="completed", content="old text", content_ref=ref,
+                     extractor_version=1, meta_data={"ext": ".pdf"})
+        self.assertEqual(claims.mark_stale(DocumentFile, ["old.pdf"], 2, "archive"), ["old.pdf"])
+        self.assertTrue(claims.claim(DocumentFile, "old.pdf"))
+        with mock.patch.object(feed, "publish"):
+            self.assertTrue(claims.fail(DocumentFile, "old.pdf", RuntimeError("bad zip"), content=""))
+        doc = self._get("old.pdf")
+        self.assertEqual(doc["status"], "completed")
+        self.assertEqual((doc["content"], doc["content_ref"], doc["extractor_version"]), ("old text", ref, 1))
+        self.assertEqual(doc["meta_data"], {"ext": ".pdf", "reprocess_error": "bad zip"})
+        self.assertNotIn("source_bucket", doc)
+        self.assertNotIn("claimed_by", doc)
+
+    def test_failed_first_run_is_recorded_as_failed(self):
+        self.assertTrue(claims.claim(DocumentFile, "new.pdf"))
+        with mock.patch.object(feed, "publish"):
+            self.assertTrue(claims.fail(DocumentFile, "new.pdf", RuntimeError("bad zip"), content=""))
+        doc = self._get("new.pdf")
+        self.assertEqual((doc["status"], doc["content"], doc["meta_data"]), ("failed", "", {"error": "bad zip"}))
+
+    def test_reaper_gives_up_on_rerun_without_losing_result(self):
+        self._record("crashy.pdf", status="processing", claimed_by="dead:1", reap_count=claims.MAX_REAPS,
+                     source_bucket="archive", content="old text", meta_data={},
+                     lease_expires_at=claims._now() - timedelta(seconds=1))
+        self.assertEqual(claims.release_expired(DocumentFile, "crashy.pdf"), "failed")
+        doc = self._get("crashy.pdf")
+        self.assertEqual((doc["status"], doc["content"]), ("completed", "old text"))
+        self.assertIn("reprocess_error", doc["meta_data"])
+        self.assertNotIn("source_bucket", doc)
+
+    def test_reject_too_large_existing_records(self):
+        self._record("reaped.pdf", status="pending")
+        self._record("done.pdf", status="completed", content="text")
+        self._record("old.pdf", status="stale", source_bucket="archive", content="old text", meta_data={})
+        with mock.patch.object(feed, "publish"), mock.patch.object(metrics, "record_result"):
+            for name in ("reaped.pdf", "done.pdf", "old.pdf"):
+                claims.reject_too_large(DocumentFile, name, 10, 5)
+        self.assertEqual(self._get("reaped.pdf")["status"], "too_large")
+        self.assertEqual(self._get("done.pdf")["status"], "completed")
+        old = self._get("old.pdf")
+        self.assertEqual((old["status"], old["content"]), ("completed", "old text"))
+        self.assertEqual(old["meta_data"], {"reprocess_error": "File exceeds size limit"})
+        self.assertNotIn("source_bucket", old)
+
+    def test_reject_too_large_counts_once(self):
+        with mock.patch.object(feed, "publish"), mock.patch.object(metrics, "record_result") as record_result:
+            claims.reject_too_large(DocumentFile, "huge.pdf", 10, 5)
+            claims.reject_too_large(DocumentFile, "huge.pdf", 10, 5)
+        record_result.assert_called_once_with(DocumentFile, "too_large")
+        self.assertEqual(self._get("huge.pdf")["status"], "too_large")
+
+
+class TranscriptCacheTests(MongoTestCase):
+    models = (TranscriptCache,)
+
+    def setUp(self):
+        super().setUp()
+        transcripts._totals().drop()
+
+    def _store(self, n, text="x" * 100):
+        transcripts.store(f"fp{n}", "small", "int8", None, [{"text": text}], "en", 1.0)
+
+    def test_fingerprint_skipped_when_cache_is_off(self):
+        with mock.patch.object(transcripts, "CACHE_ENABLED", False):
+            self.assertIsNone(transcripts.fingerprint("/nonexistent"))
+
+    def test_running_total_and_lru_eviction(self):
+        self._store(0)
+        self.assertEqual(transcripts.total_bytes(), 100)
+        for n in range(1, 4):
+            self._store(n)
+            TranscriptCache._get_collection().update_one({"fingerprint": f"fp{n}"}, {"$set": {
+                "last_used_at": claims._now() + timedelta(seconds=n)}})
+        self.assertEqual(transcripts.total_bytes(), 400)
+        self.assertEqual(transcripts.evict(max_bytes=250), 2)
+        self.assertEqual(transcripts.total_bytes(), 200)
+        self.assertEqual(sorted(d["fingerprint"] for d in TranscriptCache._get_collection().find()), ["fp2", "fp3"])
+        self.assertEqual(transcripts.evict(max_entries=1), 1)
+        self.assertEqual(transcripts.total_bytes(), 100)
 
-# Create your tests here.
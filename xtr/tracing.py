@@ -0,0 +1,227 @@
+# xtr/tracing.py
+
+import os
+import json
+import time
+import socket
+import secrets
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+# Spans are appended to this file, one OTLP/JSON ExportTraceServiceRequest per
+# line (the format the OpenTelemetry collector's otlpjsonfile receiver reads).
+# Tracing is off when unset.
+TRACE_FILE = os.getenv("XTR_TRACE_FILE")
+SERVICE_NAME = os.getenv("XTR_SERVICE_NAME", "xtremand")
+
+# Celery message headers used to carry the context between tasks
+TRACE_HEADER = "xtr_trace"
+PUBLISHED_HEADER = "xtr_published_at"
+
+# (trace_id, span_id, filename) of the innermost open span
+_current = contextvars.ContextVar("xtr_trace", default=None)
+_write_lock = threading.Lock()
+
+
+def _new_id(nbytes):
+    return secrets.token_hex(nbytes)
+
+
+def enabled():
+    return bool(TRACE_FILE)
+
+
+def current_trace_id():
+    ctx = _current.get()
+    return ctx[0] if ctx else None
+
+
+# -----------------------------
+# Spans
+# -----------------------------
+class Span:
+    def __init__(self, name, attributes=None, start_ns=None):
+        parent = _current.get()
+        if parent:
+            self.trace_id, self.parent_id, self.filename = parent
+        else:
+            self.trace_id, self.parent_id, self.filename = _new_id(16), None, None
+        self.filename = (attributes or {}).get("file", self.filename)
+        self.span_id = _new_id(8)
+        self.name = name
+        self.attributes = dict(attributes or {})
+        if self.filename:
+            self.attributes.setdefault("file", self.filename)
+        self.start_ns = start_ns or time.time_ns()
+        self._token = _current.set((self.trace_id, self.span_id, self.filename))
+
+    def end(self, error=None, end_ns=None):
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                # Ended from a different context (e.g. Celery postrun); just clear it
+                _current.set(None)
+            self._token = None
+        if error is not None:
+            self.attributes["error"] = str(error)
+        _export(self, end_ns or time.time_ns(), error is None)
+
+
+@contextmanager
+def span(name, **attributes):
+    """``with span("download", type="pdf"): ...`` — nests under the current span."""
+    if not enabled():
+        yield None
+        return
+    s = Span(name, attributes)
+    try:
+        yield s
+    except BaseException as e:
+        s.end(error=e)
+        raise
+    else:
+        s.end()
+
+
+@contextmanager
+def file_trace(filename):
+    """
+    Make sure work for ``filename`` runs inside that file's trace: continue
+    the current trace if it was started for this file (e.g. by the webhook),
+    otherwise start a new one. Used when one task fans out to many files.
+    """
+    ctx = _current.get()
+    if ctx and ctx[2] not in (None, filename):
+        token = _current.set(None)
+        try:
+            with span("dispatch", file=filename):
+                yield
+        finally:
+            _current.reset(token)
+    else:
+        with span("dispatch", file=filename):
+            yield
+
+
+def record_span(name, start_ns, end_ns, **attributes):
+    """Emit an already-finished span (e.g. time spent waiting in the queue)."""
+    if not enabled():
+        return
+    s = Span(name, attributes, start_ns=start_ns)
+    s.end(end_ns=end_ns)
+
+
+# -----------------------------
+# Celery propagation
+# -----------------------------
+def inject(headers):
+    """Copy the current context into outgoing Celery message headers."""
+    if not enabled() or headers is None:
+        return
+    ctx = _current.get()
+    if ctx:
+        headers[TRACE_HEADER] = list(ctx)
+    headers[PUBLISHED_HEADER] = time.time_ns()
+
+
+def extract(request):
+    """Read the trace context and publish time from a Celery task request."""
+    headers = getattr(request, "headers", None) or {}
+    ctx = getattr(request, TRACE_HEADER, None) or headers.get(TRACE_HEADER)
+    published = getattr(request, PUBLISHED_HEADER, None) or headers.get(PUBLISHED_HEADER)
+    return (tuple(ctx) if ctx else None), published
+
+
+def activate(ctx):
+    _current.set(tuple(ctx) if ctx else None)
+
+
+_TASK_SPANS = {}
+
+
+def task_started(task_id, task, args):
+    """task_prerun hook: resume the caller's trace, record queue wait, open the task span."""
+    if not enabled():
+        return
+    ctx, published = extract(task.request)
+    activate(ctx)
+    attributes = {"task": task.name, "task_id": task_id}
+    if len(args or ()) >= 2 and isinstance(args[1], str):
+        attributes["bucket"], attributes["file"] = args[0], args[1]
+    now = time.time_ns()
+    if published:
+        record_span("queue_wait", int(published), now, **attributes)
+    _TASK_SPANS[task_id] = Span(f"task:{task.name}", attributes, start_ns=now)
+
+
+def task_finished(task_id, state=None):
+    """task_postrun hook: close the task span opened by task_started."""
+    s = _TASK_SPANS.pop(task_id, None)
+    if s is not None:
+        s.attributes["state"] = state
+        s.end(error=state if state == "FAILURE" else None)
+    activate(None)
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def _attr(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _export(s, end_ns, ok):
+    record = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [_attr(k, v) for k, v in s.attributes.items()],
+        "status": {"code": 1 if ok else 2},
+    }
+    if s.parent_id:
+        record["parentSpanId"] = s.parent_id
+    line = json.dumps({"resourceSpans": [{
+        "resource": {"attributes": [
+            _attr("service.name", SERVICE_NAME),
+            _attr("host.name", socket.gethostname()),
+            _attr("process.pid", os.getpid()),
+        ]},
+        "scopeSpans": [{"scope": {"name": "xtr"}, "spans": [record]}],
+    }]})
+    try:
+        with _write_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logger.warning("⚠️ Could not write trace span: %s", e)
+
+
+def read_spans(path=None):
+    """Yield flat span dicts from a trace file written by this module."""
+    with open(path or TRACE_FILE, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for rs in json.loads(line).get("resourceSpans", []):
+                for ss in rs.get("scopeSpans", []):
+                    for sp in ss.get("spans", []):
+                        sp["attributes"] = {
+                            a["key"]: next(iter(a["value"].values())) for a in sp.get("attributes", [])
+                        }
+                        yield sp
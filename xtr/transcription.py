@@ -0,0 +1,75 @@
+# xtr/transcription.py
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Profiles
+# -----------------------------
+# "default" keeps WHISPER_MODEL and the library's decoding defaults. "fast" is
+# for bulk backlog: small int8 model, greedy decoding, no temperature fallback,
+# silence skipped by VAD. "accurate" is for priority files: a larger model with
+# beam search. model/compute_type None mean "use the WHISPER_* settings".
+PROFILES = {
+    "default": {"model": None, "compute_type": None, "options": {}},
+    "fast": {
+        "model": os.getenv("WHISPER_FAST_MODEL", "tiny"),
+        "compute_type": os.getenv("WHISPER_FAST_COMPUTE_TYPE", "int8"),
+        "options": {"beam_size": 1, "best_of": 1, "temperature": 0.0,
+                    "word_timestamps": False, "vad_filter": True},
+    },
+    "accurate": {
+        "model": os.getenv("WHISPER_ACCURATE_MODEL", "small"),
+        "compute_type": os.getenv("WHISPER_ACCURATE_COMPUTE_TYPE"),
+        "options": {"beam_size": 5, "best_of": 5},
+    },
+}
+DEFAULT_PROFILE = os.getenv("WHISPER_PROFILE", "default")
+
+# Object key prefix → profile, e.g. "backlog/=fast,priority/=accurate"
+PROFILE_PREFIXES = [
+    tuple(item.split("=", 1))
+    for item in os.getenv("WHISPER_PROFILE_PREFIXES", "").split(",")
+    if "=" in item
+]
+
+# User metadata set at upload time (mc cp --attr / x-amz-meta-*)
+PROFILE_METADATA = "x-amz-meta-transcription-profile"
+LANGUAGE_METADATA = "x-amz-meta-language"
+
+
+def _known_language(code):
+    """Whether faster-whisper, the engine that gets the hint, knows the language code."""
+    try:
+        from faster_whisper.tokenizer import _LANGUAGE_CODES
+    except Exception as e:
+        # Unable to check: better to detect the language than to fail the file
+        logger.warning(f"⚠️ Could not load faster-whisper's language list: {e}")
+        return False
+    return code in _LANGUAGE_CODES
+
+
+def choose(object_name, metadata=None):
+    """
+    Pick (profile, language) for one object: the profile from its metadata,
+    else from the longest matching key prefix, else DEFAULT_PROFILE; the
+    language hint from its metadata, so detection can be skipped.
+    """
+    meta = {k.lower(): v for k, v in (metadata or {}).items()}
+
+    profile = (meta.get(PROFILE_METADATA) or "").strip().lower()
+    if not profile:
+        matches = [p for p in PROFILE_PREFIXES if object_name.startswith(p[0])]
+        profile = max(matches, key=lambda p: len(p[0]))[1] if matches else DEFAULT_PROFILE
+    if profile not in PROFILES:
+        logger.warning(f"⚠️ Unknown transcription profile '{profile}' for {object_name}, using {DEFAULT_PROFILE}")
+        profile = DEFAULT_PROFILE
+
+    language = (meta.get(LANGUAGE_METADATA) or "").strip().lower() or None
+    if language and not _known_language(language):
+        logger.warning(f"⚠️ Ignoring unknown language hint '{language}' for {object_name}")
+        language = None
+
+    return profile, language
@@ -0,0 +1,146 @@
+# xtr/transcripts.py
+
+import os
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from .models import TranscriptCache
+from .metrics import TRANSCRIPT_CACHE
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+CACHE_ENABLED = os.getenv("XTR_TRANSCRIPT_CACHE", "1") == "1"
+# Bounds for LRU eviction (size counts the stored segment text)
+MAX_ENTRIES = int(os.getenv("XTR_TRANSCRIPT_CACHE_MAX_ENTRIES", "20000"))
+MAX_BYTES = int(float(os.getenv("XTR_TRANSCRIPT_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+EVICT_BATCH = 500
+# Running size of the cache, so eviction doesn't re-sum every entry on each insert
+TOTALS_COLLECTION = "transcript_cache_totals"
+
+CHUNK = 1024 * 1024
+
+
+def fingerprint(path):
+    """
+    sha256 of the file's bytes: the same recording under any name hashes the
+    same. None when the cache is off, which then has nothing to key.
+    """
+    if not CACHE_ENABLED:
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(fp, model, compute_type, language=None, profile="default"):
+    return f"{fp}:{profile}:{model}:{compute_type}:{language or 'auto'}"
+
+
+def lookup(fp, model, compute_type, language=None, profile="default"):
+    """
+    Return (text, detected_language, duration, segments) for a cached
+    transcript, or None. A hit also refreshes the entry's LRU timestamp.
+    """
+    if not CACHE_ENABLED:
+        return None
+    doc = TranscriptCache._get_collection().find_one_and_update(
+        {"key": cache_key(fp, model, compute_type, language, profile)},
+        {"$set": {"last_used_at": datetime.now(timezone.utc)}, "$inc": {"hits": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        TRANSCRIPT_CACHE.labels("miss").inc()
+        return None
+    TRANSCRIPT_CACHE.labels("hit").inc()
+    segments = doc.get("segments") or []
+    text = " ".join(s.get("text", "") for s in segments).strip()
+    logger.info(f"♻️ Transcript cache hit for {fp[:12]} ({model}/{compute_type}, {doc.get('hits')} hits)")
+    return text, doc.get("detected_language"), doc.get("duration"), segments
+
+
+def store(fp, model, compute_type, language, segments, detected_language, duration, profile="default"):
+    if not CACHE_ENABLED:
+        return
+    size = sum(len(s.get("text", "").encode("utf-8")) for s in segments)
+    now = datetime.now(timezone.utc)
+    try:
+        TranscriptCache._get_collection().insert_one({
+            "key": cache_key(fp, model, compute_type, language, profile),
+            "fingerprint": fp,
+            "profile": profile,
+            "model": model,
+            "compute_type": compute_type,
+            "language": language,
+            "detected_language": detected_language,
+            "duration": duration,
+            "segments": segments,
+            "size_bytes": size,
+            "hits": 0,
+            "created_at": now,
+            "last_used_at": now,
+        })
+    except DuplicateKeyError:
+        # Another worker transcribed the same content concurrently
+        return
+    # No upsert: until evict() has counted the cache once there is no total to add to
+    _totals().update_one({"_id": "size"}, {"$inc": {"bytes": size}})
+    try:
+        evict()
+    except Exception as e:
+        logger.warning(f"⚠️ Transcript cache eviction failed: {e}")
+
+
+def _totals():
+    return TranscriptCache._get_collection().database[TOTALS_COLLECTION]
+
+
+def total_bytes():
+    """Stored segment bytes: the running total, summed from the entries the first time."""
+    doc = _totals().find_one({"_id": "size"})
+    if doc is not None:
+        return doc["bytes"]
+    coll = TranscriptCache._get_collection()
+    total = next(coll.aggregate([{"$group": {"_id": None, "b": {"$sum": "$size_bytes"}}}]), {}).get("b", 0)
+    _totals().update_one({"_id": "size"}, {"$setOnInsert": {"bytes": total}}, upsert=True)
+    return total
+
+
+def evict(max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+    """
+    Drop least recently used entries, up to EVICT_BATCH per round, until both
+    the entry and size bounds hold. Checking the bounds costs two counter reads.
+    """
+    coll = TranscriptCache._get_collection()
+    count = coll.estimated_document_count()
+    total = total_bytes()
+    removed = 0
+    while count > max_entries or total > max_bytes:
+        oldest = coll.find({}, {"_id": 1, "size_bytes": 1}).sort("last_used_at", 1).limit(EVICT_BATCH)
+        # Just enough of the oldest entries to bring both bounds back
+        docs, size = [], 0
+        for d in oldest:
+            if count - len(docs) <= max_entries and total - size <= max_bytes:
+                break
+            docs.append(d)
+            size += d.get("size_bytes", 0)
+        if not docs:
+            break
+        deleted = coll.delete_many({"_id": {"$in": [d["_id"] for d in docs]}}).deleted_count
+        # A worker evicting the same batch concurrently deletes the rest: count only our share
+        freed = size * deleted // len(docs)
+        _totals().update_one({"_id": "size"}, {"$inc": {"bytes": -freed}})
+        removed += deleted
+        count -= len(docs)
+        total -= freed
+    if removed:
+        logger.info(f"🧹 Evicted {removed} transcript cache entries")
+    return removed
@@ -0,0 +1,107 @@
+# xtr/transfer.py
+
+import os
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .registry import MB
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+# Objects at least this big are fetched with concurrent ranged GETs
+PARALLEL_THRESHOLD_BYTES = int(float(os.getenv("XTR_PARALLEL_DOWNLOAD_MB", "64")) * MB)
+PART_SIZE = int(float(os.getenv("XTR_DOWNLOAD_PART_MB", "16")) * MB)
+# Keep at or below the MinIO client's connection pool size (10)
+CONCURRENCY = int(os.getenv("XTR_DOWNLOAD_CONCURRENCY", "4"))
+# Re-read the file and compare its MD5 with the ETag (single-part uploads only)
+VERIFY_MD5 = os.getenv("XTR_DOWNLOAD_VERIFY_MD5", "0") == "1"
+
+CHUNK = 1 * MB
+
+
+class DownloadError(Exception):
+    """A download finished but doesn't match the object it was fetched from."""
+
+
+def _preallocate(fd, size):
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        # Not supported by every filesystem; a sparse file works too
+        os.ftruncate(fd, size)
+
+
+def _fetch_part(client, bucket_name, object_name, fd, offset, length, etag, version_id):
+    # If-Match pins every part to the version we stat'ed: an overwrite mid-download fails with 412
+    response = client.get_object(
+        bucket_name, object_name, offset=offset, length=length,
+        request_headers={"If-Match": etag}, version_id=version_id,
+    )
+    written = 0
+    try:
+        for chunk in response.stream(CHUNK):
+            os.pwrite(fd, chunk, offset + written)
+            written += len(chunk)
+    finally:
+        response.close()
+        response.release_conn()
+    if written != length:
+        raise DownloadError(f"part at {offset}: got {written} of {length} bytes")
+    return written
+
+
+def _md5_of(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parallel_download(client, bucket_name, object_name, path,
+                      part_size=PART_SIZE, concurrency=CONCURRENCY, stat=None, verify_md5=VERIFY_MD5):
+    """
+    Download an object into ``path`` with ``concurrency`` ranged GETs of
+    ``part_size`` bytes each, written with pwrite() into a preallocated
+    file. The result is checked against the object's size, and optionally
+    against its ETag when that is a plain MD5 (not a multipart upload).
+    Returns the number of bytes written.
+    """
+    stat = stat or client.stat_object(bucket_name, object_name)
+    size, etag = stat.size, stat.etag
+    ranges = [(offset, min(part_size, size - offset)) for offset in range(0, size, part_size)]
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        _preallocate(fd, size)
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(ranges)))) as pool:
+            futures = [
+                pool.submit(_fetch_part, client, bucket_name, object_name, fd,
+                            offset, length, etag, stat.version_id)
+                for offset, length in ranges
+            ]
+            total = sum(f.result() for f in futures)
+    finally:
+        os.close(fd)
+
+    if total != size or os.path.getsize(path) != size:
+        raise DownloadError(f"{object_name}: wrote {total} bytes, expected {size}")
+    if verify_md5 and etag and "-" not in etag and _md5_of(path) != etag.strip('"'):
+        raise DownloadError(f"{object_name}: MD5 does not match ETag {etag}")
+
+    logger.info("⬇️ Downloaded %s (%.1f MB) in %s parts × %s streams",
+                object_name, size / MB, len(ranges), concurrency)
+    return total
+
+
+def download_object(client, bucket_name, object_name, path):
+    """fget_object for small objects, parallel ranged GETs above PARALLEL_THRESHOLD_BYTES."""
+    stat = client.stat_object(bucket_name, object_name)
+    if stat.size < PARALLEL_THRESHOLD_BYTES:
+        client.fget_object(bucket_name, object_name, path)
+        return stat.size
+    return parallel_download(client, bucket_name, object_name, path, stat=stat)
@@ -58,6 +58,32 @@ LOG_EXTENSIONS = frozenset({'.log'})
 # ✅ ARCHIVE
 ARCHIVE_EXTENSIONS = frozenset({'.zip', '.tar', '.gz', '.rar', '.7z'})
 
+# ✅ Extension → file type lookup (single dict hit instead of an if/elif chain).
+# Handlers registered in xtr.registry add their own extensions here.
+_EXTENSION_TYPES = {}
+
+
+def register_extensions(file_type, extensions):
+    for ext in extensions:
+        _EXTENSION_TYPES[ext.lower()] = file_type
+
+
+for _file_type, _extensions in (
+    ('audio', AUDIO_EXTENSIONS),
+    ('video', VIDEO_EXTENSIONS),
+    ('image', IMAGE_EXTENSIONS),
+    ('document', DOCUMENT_EXTENSIONS),
+    ('presentation', PRESENTATION_EXTENSIONS),
+    ('spreadsheet', SPREADSHEET_EXTENSIONS),
+    ('html', HTML_EXTENSIONS),
+    ('json', JSON_EXTENSIONS),
+    ('xml', XML_EXTENSIONS),
+    ('log', LOG_EXTENSIONS),
+    ('archive', ARCHIVE_EXTENSIONS),
+    ('yaml', YAML_EXTENSIONS),
+):
+    register_extensions(_file_type, _extensions)
+
 
 def detect_file_type(filename, debug=False):
     filename = filename.strip()
@@ -71,42 +97,14 @@ def detect_file_type(filename, debug=False):
     if debug:
         print(f"🔍 EXT: '{ext}' from filename: '{filename}'")
 
-    if ext in AUDIO_EXTENSIONS:
-        return 'audio'
-    elif ext in VIDEO_EXTENSIONS:
-        return 'video'
-    elif ext in IMAGE_EXTENSIONS:
-        return 'image'
-    elif ext in DOCUMENT_EXTENSIONS:
-        return 'document'
-    elif ext in PRESENTATION_EXTENSIONS:
-        return 'presentation'
-    elif ext in SPREADSHEET_EXTENSIONS:
-        return 'spreadsheet'
-    elif ext in HTML_EXTENSIONS:
-        return 'html'
-    elif ext in JSON_EXTENSIONS:
-        return 'json'
-    elif ext in XML_EXTENSIONS:
-        return 'xml'
-    elif ext in LOG_EXTENSIONS:
-        return 'log'
-    elif ext in ARCHIVE_EXTENSIONS:
-        return 'archive'
-    elif ext in YAML_EXTENSIONS:
-        return 'yaml'
-    else:
-        return 'unknown'
+    return _EXTENSION_TYPES.get(ext, 'unknown')
 
 
 def extract_ppt_text(file_path):
-    prs = Presentation(file_path)
-    slides_text = []
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                slides_text.append(shape.text)
-    return "\n".join(slides_text), len(prs.slides)
+    """Text and slide count of a .pptx (path or file object), with notes, tables and groups."""
+    from xtr.extractors.slides import extract_pptx
+    text, slides = extract_pptx(file_path)
+    return text, len(slides)
 
 
 def extract_text_file(file_path):
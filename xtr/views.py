@@ -1,7 +1,8 @@
 import json
+import time
 from celery import shared_task
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from .models import HtmlFile
 
 def start_auto_processing(request):
@@ -14,6 +15,113 @@ def process_files_from_minio(request):
     auto_discover_and_process.delay()
     return HttpResponse("Task triggered!")
 
+def metrics(request):
+    from .metrics import render
+    from prometheus_client import CONTENT_TYPE_LATEST
+    return HttpResponse(render(), content_type=CONTENT_TYPE_LATEST)
+
+def search(request):
+    """
+    GET /search/?q=...&type=document,presentation&page=1&page_size=20
+    Ranked full-text search over extracted content of every file type.
+    """
+    from . import search as search_index
+    q = request.GET.get("q", "").strip()
+    if not q:
+        return JsonResponse({"error": "Missing query parameter 'q'"}, status=400)
+    types = [t for t in request.GET.get("type", "").split(",") if t]
+    try:
+        page = int(request.GET.get("page", 1))
+        page_size = int(request.GET.get("page_size", search_index.PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "page and page_size must be integers"}, status=400)
+    started = time.perf_counter()
+    results, has_more = search_index.query(q, types, page, page_size)
+    return JsonResponse({
+        "query": q,
+        "page": page,
+        "has_more": has_more,
+        "took_ms": round((time.perf_counter() - started) * 1000, 1),
+        "results": results,
+    })
+
+def _etag_json(request, data, status=200):
+    """JSON response with an ETag; answers 304 when the client already has this body."""
+    from .records import etag
+    body = json.dumps(data).encode()
+    tag = etag(body)
+    response = HttpResponse(body, status=status, content_type="application/json")
+    if status == 200 and tag in [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]:
+        response = HttpResponse(status=304)
+    response["ETag"] = tag
+    return response
+
+def _fields_param(request):
+    return [f for f in request.GET.get("fields", "").split(",") if f]
+
+def list_files(request, file_type):
+    """
+    GET /api/files/<type>/?status=completed,failed&fields=filename,meta_data&limit=100&after=<cursor>
+    Records in (created_at, _id) order; pass next_cursor back as ``after``
+    for the next page. ``content`` is only returned when listed in fields.
+    """
+    from . import records
+    try:
+        model = records.model_for(file_type)
+        docs, next_cursor = records.page(
+            model,
+            status=[s for s in request.GET.get("status", "").split(",") if s],
+            after=request.GET.get("after"),
+            limit=int(request.GET.get("limit", records.DEFAULT_LIMIT)),
+            fields=_fields_param(request),
+        )
+    except LookupError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return _etag_json(request, {"type": file_type, "results": docs, "next_cursor": next_cursor})
+
+def file_detail(request, file_type, filename):
+    """GET /api/files/<type>/<filename>?fields=... (content included unless fields says otherwise)"""
+    from . import records
+    try:
+        model = records.model_for(file_type)
+        fields = _fields_param(request) or [f for f in model._fields if f != "id"]
+        doc = records.get(model, filename, fields)
+    except LookupError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if doc is None:
+        return JsonResponse({"error": f"No {file_type} record for '{filename}'"}, status=404)
+    return _etag_json(request, doc)
+
+def events(request):
+    """
+    GET /events/?type=document,audio  (text/event-stream)
+    Push feed of finished files: type, filename, status, meta_data and
+    content_ref. Reconnects resume from Last-Event-ID (or ?since=<id>).
+    A stream ends after XTR_FEED_STREAM_SECONDS (the client reconnects),
+    and each web process serves at most XTR_FEED_MAX_STREAMS at once.
+    """
+    from . import feed
+    if not feed.ENABLED:
+        return JsonResponse({"error": "Feed disabled (XTR_FEED=0)"}, status=404)
+    types = {t for t in request.GET.get("type", "").split(",") if t}
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("since") or "$"
+    if not feed.valid_id(last_id):
+        return JsonResponse({"error": f"Invalid event id '{last_id}' (expected <ms>-<seq>)"}, status=400)
+    body = feed.open_stream(last_id, types)
+    if body is None:
+        response = JsonResponse({"error": "Too many open event streams, retry later"}, status=503)
+        response["Retry-After"] = "5"
+        return response
+    response = StreamingHttpResponse(body, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Let nginx pass events through instead of buffering them
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 def home(request):
     return HttpResponse("<h2>Welcome! 🎉</h2><p>Go to <a href='/process/'>/process/</a> to start the task.</p>")
 
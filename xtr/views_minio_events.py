@@ -2,6 +2,8 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 import json
 from .tasks import process_minio_file
+from .tracing import span
+from .utils import normalize_filename
 
 # @csrf_exempt
 # def minio_event_webhook(request):
@@ -34,7 +36,9 @@ def minio_event_webhook(request):
                 bucket = s3_info.get('bucket', {}).get('name')
                 object_key = s3_info.get('object', {}).get('key')
                 if bucket and object_key:
-                    process_minio_file.delay(bucket, object_key)
+                    # Each uploaded file gets its own trace, started here
+                    with span("webhook", file=normalize_filename(object_key), bucket=bucket):
+                        process_minio_file.delay(bucket, object_key)
             return JsonResponse({"status": "success"})
         except Exception as e:
             print("[WEBHOOK] Error:", e)
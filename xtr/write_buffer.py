@@ -0,0 +1,185 @@
+# xtr/write_buffer.py
+
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from pymongo import UpdateOne
+
+from xtr import metrics, feed
+from xtr.registry import file_type_for_model
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Environment
+# -----------------------------
+# Results are flushed once this many are queued, or when the oldest has waited
+# FLUSH_SECONDS. XTR_WRITE_BUFFER_SIZE=1 makes every write synchronous again.
+MAX_PENDING = int(os.getenv("XTR_WRITE_BUFFER_SIZE", "50"))
+FLUSH_SECONDS = float(os.getenv("XTR_WRITE_BUFFER_SECONDS", "1.0"))
+
+
+class WriteBuffer:
+    """
+    Per-process write-behind buffer for result updates. Each finished task
+    queues one UpdateOne; the buffer sends them as one unordered bulk_write
+    per collection, from the task that fills it or from a background thread
+    once FLUSH_SECONDS have passed. Result metrics, feed events
+    (xtr/feed.py) and dependent upserts such as search entries
+    (xtr/search.py) queued with the updates are recorded per collection,
+    and only for the updates that were actually applied.
+
+    A result is only in memory until the flush, at most FLUSH_SECONDS, while
+    the task has usually moved its object to the archive bucket already. If
+    the process dies in that window, or the bulk write fails, the record
+    keeps its lease; once it expires the reaper re-queues the file from the
+    archive (tasks.reap_expired_leases). Pool children flush on
+    worker_process_shutdown (web_project/celery.py), including when they are
+    recycled by --max-memory-per-child.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING, flush_seconds=FLUSH_SECONDS):
+        self.max_pending = max_pending
+        self.flush_seconds = flush_seconds
+        # model → [(UpdateOne, filename, status, event, after)]
+        self._ops = defaultdict(list)
+        self._count = 0
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._flusher_pid = None
+
+    def add(self, model, filter_, update, upsert=False, status=None, event=None, after=()):
+        with self._lock:
+            self._ops[model].append(_entry(filter_, update, upsert, status, event, after))
+            self._count += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = self._count >= self.max_pending
+        if full:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def flush(self):
+        with self._lock:
+            batches, self._ops = self._ops, defaultdict(list)
+            self._count, self._oldest = 0, None
+        for model, entries in batches.items():
+            self._write(model, entries)
+
+    def _write(self, model, entries):
+        """
+        Send one collection's updates. Records the result metric, publishes
+        the feed event and writes the dependent upserts of each update that
+        applied, and returns those entries ([] if the write failed).
+        """
+        try:
+            with metrics.stage(file_type_for_model(model), "mongo_write"):
+                result = model._get_collection().bulk_write([e[0] for e in entries], ordered=False)
+        except Exception as e:
+            # Nothing retries these: the leases expire and the reaper re-queues the files
+            logger.error("[WRITE] ❌ Bulk write of %s results to %s failed: %s",
+                         len(entries), model._get_collection_name(), e)
+            return []
+        written = entries
+        if result.matched_count + result.upserted_count < len(entries):
+            written = _applied(model, entries)
+            logger.warning("[WRITE] ⚠️ %s of %s results for %s no longer matched a lease held by this worker",
+                           len(entries) - len(written), len(entries), model._get_collection_name())
+        for _, _, status, _, _ in written:
+            if status is not None:
+                metrics.record_result(model, status)
+        feed.publish([event for _, _, _, event, _ in written if event is not None])
+        _write_after(written)
+        return written
+
+    def _ensure_flusher(self):
+        # Threads don't survive fork(): start one per worker process, lazily
+        if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+        self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(target=self._run, name="write-buffer-flusher", daemon=True)
+        self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds / 2)
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.flush_seconds
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error("[WRITE] ❌ Background flush failed: %s", e)
+
+
+def _entry(filter_, update, upsert, status, event, after=()):
+    return UpdateOne(filter_, update, upsert=upsert), filter_.get("filename"), status, event, tuple(after)
+
+
+def _write_after(entries):
+    """
+    Upsert the (model, filter, update) records that depend on updates which
+    applied, one unordered bulk_write per collection. A failure is logged:
+    the result itself is already stored.
+    """
+    batches = defaultdict(list)
+    for *_, after in entries:
+        for model, filter_, update in after:
+            batches[model].append(UpdateOne(filter_, update, upsert=True))
+    for model, ops in batches.items():
+        try:
+            model._get_collection().bulk_write(ops, ordered=False)
+        except Exception as e:
+            logger.error("[WRITE] ❌ Bulk write of %s records to %s failed: %s",
+                         len(ops), model._get_collection_name(), e)
+
+
+def _applied(model, entries):
+    """
+    Which updates of a partly matched batch applied. bulk_write only reports
+    counts, so look the records up: a result update applied if its record now
+    has the status it set and is no longer leased. (A record another worker
+    finished with the same status counts too; either way that result stands.)
+    """
+    names = [name for _, name, status, _, _ in entries if status is not None]
+    finished = {
+        (doc["filename"], doc.get("status"))
+        for doc in model._get_collection().find(
+            {"filename": {"$in": names}, "claimed_by": {"$exists": False}}, {"filename": 1, "status": 1})
+    } if names else set()
+    return [e for e in entries if e[2] is None or (e[1], e[2]) in finished]
+
+
+_BUFFER = WriteBuffer()
+
+
+def add(model, filter_, update, sync=False, upsert=False, status=None, event=None, after=()):
+    """
+    Queue one result update; written at once with ``sync`` or when the
+    buffer size is 1. Once the update has applied, ``status`` is counted in
+    the result metrics, ``event`` published to the feed and each
+    (model, filter, update) in ``after`` upserted.
+
+    Returns whether the update applied when written at once, True once it
+    is queued otherwise.
+    """
+    if sync or _BUFFER.max_pending <= 1:
+        return bool(_BUFFER._write(model, [_entry(filter_, update, upsert, status, event, after)]))
+    _BUFFER.add(model, filter_, update, upsert=upsert, status=status, event=event, after=after)
+    return True
+
+
+def flush():
+    """Write everything queued in this process now (worker shutdown, benchmarks)."""
+    _BUFFER.flush()
+
+
+# Management commands and the bench; pool children exit through os._exit and
+# flush from worker_process_shutdown instead (web_project/celery.py)
+atexit.register(flush)